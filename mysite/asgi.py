@@ -13,4 +13,16 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mysite.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after Django is set up; serves /polls/<id>/stream/ without a thread per client.
+# Those streams are answered before the Django middleware, so ALLOWED_HOSTS and throttling do not apply to them.
+from polls.streams import stream_application  # noqa: E402
+
+application = stream_application(django_application)
+
+from django.conf import settings  # noqa: E402
+
+if settings.POLLS_LIFECYCLE_SCHEDULER:
+    from polls.lifecycle import get_scheduler
+    get_scheduler()
@@ -50,21 +50,32 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'polls.staticfiles.StaticFilesMiddleware',
+    'polls.middleware.RequestProfileMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'polls.throttling.ThrottleMiddleware',
+    'polls.routers.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
 ROOT_URLCONF = 'mysite.urls'
 
+# Production template profile: keep compiled templates in memory instead of parsing them on every render.
+# On by default when DEBUG is off; turn it off to see template edits without a restart.
+POLLS_TEMPLATE_CACHE = env.bool('POLLS_TEMPLATE_CACHE', default=not DEBUG)
+template_loaders = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -72,6 +83,8 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            'loaders': [('django.template.loaders.cached.Loader', template_loaders)] if POLLS_TEMPLATE_CACHE
+            else template_loaders,
         },
     },
 ]
@@ -81,13 +94,132 @@ WSGI_APPLICATION = 'mysite.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
+# DB_PROFILE=production turns on the tuned SQLite pragmas and persistent connections.
+DB_PROFILE = env('DB_PROFILE', default='development')
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': env.int('CONN_MAX_AGE', default=600 if DB_PROFILE == 'production' else 0),
+    }
+}
+
+# Read replicas of the default database, as a comma separated list of SQLite files.
+# They become the aliases replica1, replica2, ... used by polls.routers.ReadReplicaRouter.
+for number, name in enumerate(env.list('DATABASE_REPLICAS', default=[]), start=1):
+    DATABASES[f'replica{number}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': name,
+        'CONN_MAX_AGE': DATABASES['default']['CONN_MAX_AGE'],
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['polls.routers.ReadReplicaRouter']
+
+# Aliases that the poll pages in POLLS_REPLICA_VIEWS read from.
+POLLS_READ_DATABASES = [alias for alias in DATABASES if alias != 'default']
+POLLS_REPLICA_VIEWS = [
+    'polls:index', 'polls:detail', 'polls:results', 'polls:results_json', 'polls:batch_results_json',
+    'polls:questions_json',
+]
+# Seconds after a vote during which the user reads from the primary.
+POLLS_READ_YOUR_WRITES_SECONDS = env.int('POLLS_READ_YOUR_WRITES_SECONDS', default=10)
+
+# PRAGMA statements for concurrent writers: WAL lets readers run during a write,
+# and busy_timeout makes a writer wait for the lock instead of failing at once.
+SQLITE_TUNED_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': env.int('SQLITE_BUSY_TIMEOUT', default=5000),
+    'mmap_size': env.int('SQLITE_MMAP_SIZE', default=256 * 1024 * 1024),
+    'cache_size': env.int('SQLITE_CACHE_SIZE', default=-64000),
+    'temp_store': 'MEMORY',
+}
+# Pragmas run on every new SQLite connection by polls.db.
+SQLITE_PRAGMAS = SQLITE_TUNED_PRAGMAS if DB_PROFILE == 'production' else {}
+
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+# Use django.core.cache.backends.filebased.FileBasedCache with a directory
+# as CACHE_LOCATION to share the cache between worker processes.
+
+CACHES = {
+    'default': {
+        'BACKEND': env('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': env('CACHE_LOCATION', default='ku-polls'),
     }
 }
 
+# Seconds to keep the results of a question version in the cache.
+POLLS_RESULTS_CACHE_TIMEOUT = env.int('POLLS_RESULTS_CACHE_TIMEOUT', default=300)
+# Seconds to keep a results, choice list or index version key; when one expires its entries just miss.
+POLLS_CACHE_VERSION_TIMEOUT = env.int('POLLS_CACHE_VERSION_TIMEOUT', default=86400)
+
+# Seconds to keep the choice list fragment of a detail page version; a choice change makes a new version.
+POLLS_CHOICES_CACHE_TIMEOUT = env.int('POLLS_CHOICES_CACHE_TIMEOUT', default=3600)
+# Questions whose choices each process keeps in its least recently used choice map.
+POLLS_CHOICE_MAP_SIZE = env.int('POLLS_CHOICE_MAP_SIZE', default=1000)
+# Seconds a question's choices stay in the choice map before they are read again.
+POLLS_CHOICE_MAP_TTL = env.int('POLLS_CHOICE_MAP_TTL', default=300)
+
+# Most question ids accepted by one batch results request.
+POLLS_BATCH_RESULTS_LIMIT = env.int('POLLS_BATCH_RESULTS_LIMIT', default=100)
+
+# Longest time to keep the index fragment when no poll publishes or closes sooner.
+POLLS_INDEX_CACHE_MAX_TIMEOUT = env.int('POLLS_INDEX_CACHE_MAX_TIMEOUT', default=3600)
+
+# Buffered vote ingestion: queue votes and write them in batches from a background thread.
+POLLS_VOTE_BUFFER = env.bool('POLLS_VOTE_BUFFER', default=False)
+POLLS_VOTE_BUFFER_SIZE = env.int('POLLS_VOTE_BUFFER_SIZE', default=500)
+POLLS_VOTE_BUFFER_INTERVAL = env.float('POLLS_VOTE_BUFFER_INTERVAL', default=0.5)
+# Retries of a batch that fails to write before its votes are dropped and counted.
+POLLS_VOTE_BUFFER_RETRIES = env.int('POLLS_VOTE_BUFFER_RETRIES', default=3)
+
+# Requests allowed per client IP and per user on each view, as count/period (s, m, h or d).
+# An empty rate turns throttling off for the view.
+POLLS_THROTTLE_RATES = {
+    'polls:vote': env('POLLS_THROTTLE_VOTE_RATE', default='30/m'),
+    'login': env('POLLS_THROTTLE_LOGIN_RATE', default='10/m'),
+}
+
+# Change the stored status of questions from a background thread of the web process;
+# otherwise run `manage.py run_lifecycle` or `manage.py run_lifecycle --once` from cron.
+POLLS_LIFECYCLE_SCHEDULER = env.bool('POLLS_LIFECYCLE_SCHEDULER', default=False)
+# Seconds of upcoming status transitions the scheduler keeps in memory at a time.
+POLLS_LIFECYCLE_HORIZON = env.int('POLLS_LIFECYCLE_HORIZON', default=300)
+
+# Questions per page of the index, and the default and largest page of questions.json.
+POLLS_INDEX_PAGE_SIZE = env.int('POLLS_INDEX_PAGE_SIZE', default=5)
+POLLS_LIST_PAGE_SIZE = env.int('POLLS_LIST_PAGE_SIZE', default=20)
+POLLS_LIST_PAGE_MAX = env.int('POLLS_LIST_PAGE_MAX', default=100)
+
+# Full-text search index: 'fts5' (SQLite FTS5 table), 'python' (in-process inverted index), or 'auto'.
+POLLS_SEARCH_BACKEND = env('POLLS_SEARCH_BACKEND', default='auto')
+# Most questions listed by the search page.
+POLLS_SEARCH_LIMIT = env.int('POLLS_SEARCH_LIMIT', default=20)
+
+# Counter rows per choice on questions with sharded vote counters.
+POLLS_VOTE_SHARDS = env.int('POLLS_VOTE_SHARDS', default=8)
+# Votes a second on one question above which its counters are sharded; 0 leaves it to the admin flag.
+POLLS_SHARD_VOTE_RATE = env.int('POLLS_SHARD_VOTE_RATE', default=50)
+
+# Serve the poll views with their async versions (for uvicorn or another ASGI server).
+POLLS_ASYNC_VIEWS = env.bool('POLLS_ASYNC_VIEWS', default=False)
+# Threads that run the database work of the async views.
+POLLS_ASYNC_DB_THREADS = env.int('POLLS_ASYNC_DB_THREADS', default=8)
+
+# Requests slower or with more SQL queries than these are logged by RequestProfileMiddleware.
+POLLS_SLOW_REQUEST_MS = env.int('POLLS_SLOW_REQUEST_MS', default=500)
+POLLS_SLOW_REQUEST_QUERIES = env.int('POLLS_SLOW_REQUEST_QUERIES', default=50)
+# Number of recent requests per view kept for the statistics at /admin/profile/.
+POLLS_PROFILE_WINDOW = env.int('POLLS_PROFILE_WINDOW', default=1000)
+
+# Most results updates per second sent on the /polls/<id>/stream/ server-sent events,
+# and the seconds between keep-alive comments on an idle stream.
+POLLS_STREAM_MAX_RATE = env.float('POLLS_STREAM_MAX_RATE', default=2)
+POLLS_STREAM_HEARTBEAT = env.int('POLLS_STREAM_HEARTBEAT', default=15)
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -112,27 +244,49 @@ AUTHENTICATION_BACKENDS = [
 ]
 LOGIN_REDIRECT_URL = '/polls/'
 
+# Log through a queue drained by a background thread, so requests never wait on the stream.
+POLLS_LOG_QUEUE = env.bool('POLLS_LOG_QUEUE', default=True)
+# Records kept waiting for the log thread; more are dropped.
+POLLS_LOG_QUEUE_SIZE = env.int('POLLS_LOG_QUEUE_SIZE', default=10000)
+# 'text' or 'json'; JSON lines carry the request id and the milliseconds since the request started.
+POLLS_LOG_FORMAT = env('POLLS_LOG_FORMAT', default='text')
+
 LOGGING = {
     'version': 1,                       # the dictConfig format version
     'disable_existing_loggers': False,  # retain the default loggers
+    'filters': {
+        'request_context': {
+            '()': 'polls.log.RequestContextFilter',
+        },
+    },
     'formatters': {
         'console': {
             'format': '%(asctime)s %(name)s %(levelname)s: %(message)s'
         },
+        'json': {
+            '()': 'polls.log.JsonFormatter',
+        },
     },
     'handlers': {
         'console': {
             'class': 'logging.StreamHandler',
-            'formatter': 'console',
+            'formatter': 'json' if POLLS_LOG_FORMAT == 'json' else 'console',
+            'filters': ['request_context'],
+        },
+        'queue': {
+            '()': 'polls.log.BackgroundQueueHandler',
+            'handlers': ['console'],
+            'queue_size': POLLS_LOG_QUEUE_SIZE,
+            'filters': ['request_context'],
         },
     },
     'root': {
-        'handlers': ['console'],
+        'handlers': ['queue' if POLLS_LOG_QUEUE else 'console'],
         'level': 'INFO',
     },
     'loggers': {
         'polls': {
-            'handlers': ['console'],
+            'handlers': ['queue' if POLLS_LOG_QUEUE else 'console'],
             'level': os.getenv('DJANGO_LOG_LEVEL', 'INFO'),
             'propagate': False,
         },
@@ -157,6 +311,16 @@ USE_TZ = True
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 
+# Production static pipeline: collectstatic writes content-hashed names in a manifest, with gzip
+# and brotli copies, and the templates link the hashed names. Needs collectstatic before serving.
+POLLS_STATIC_MANIFEST = env.bool('POLLS_STATIC_MANIFEST', default=False)
+if POLLS_STATIC_MANIFEST:
+    STATICFILES_STORAGE = 'polls.staticfiles.CompressedManifestStaticFilesStorage'
+# Seconds clients cache a collected static file without a content hash; hashed files are cached for a year.
+POLLS_STATIC_MAX_AGE = env.int('POLLS_STATIC_MAX_AGE', default=60)
+# Widths of the resized variants that optimize_images makes of the static images.
+POLLS_IMAGE_WIDTHS = env.list('POLLS_IMAGE_WIDTHS', cast=int, default=[640, 1280, 1920])
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -16,14 +16,15 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import include, path
 from django.shortcuts import redirect
-from django.conf.urls.static import static
-from django.conf import settings
 from mysite import views
+from polls.views import export_data, profile_stats
 
 urlpatterns = [
-                  path('', lambda request: redirect('polls/')),
-                  path('polls/', include('polls.urls')),
-                  path('admin/', admin.site.urls),
-                  path('accounts/', include('django.contrib.auth.urls')),
-                  path('signup/', views.signup, name='signup'),
-              ] + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
+    path('', lambda request: redirect('polls/')),
+    path('polls/', include('polls.urls')),
+    path('admin/profile/', profile_stats, name='profile_stats'),
+    path('admin/export/', export_data, name='export_data'),
+    path('admin/', admin.site.urls),
+    path('accounts/', include('django.contrib.auth.urls')),
+    path('signup/', views.signup, name='signup'),
+]
@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mysite.settings')
 
 application = get_wsgi_application()
+
+from django.conf import settings  # noqa: E402
+
+if settings.POLLS_LIFECYCLE_SCHEDULER:
+    from polls.lifecycle import get_scheduler
+    get_scheduler()
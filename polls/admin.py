@@ -1,7 +1,15 @@
 """System management in the admin section."""
+import datetime
+
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import BooleanField, Case, Q, Value, When
+from django.utils import timezone
+from django.utils.functional import cached_property
 
-from .models import Choice, Question
+from . import search
+from .models import STATUS_CHOICES, STATUS_OPEN, STATUS_UPCOMING, Choice, Question
 
 
 class ChoiceInline(admin.TabularInline):
@@ -11,17 +19,124 @@ class ChoiceInline(admin.TabularInline):
     extra = 3
 
 
+class StatusListFilter(admin.SimpleListFilter):
+    """Filter questions on their status with conditions on the indexed dates."""
+
+    title = 'status'
+    parameter_name = 'status'
+
+    def lookups(self, request, model_admin):
+        """Return: the upcoming, open and closed choices."""
+        return STATUS_CHOICES
+
+    def queryset(self, request, queryset):
+        """Keep the questions with the selected status."""
+        if self.value() in dict(STATUS_CHOICES):
+            return queryset.filter_status(self.value(), timezone.now())
+        return queryset
+
+
+def estimated_count(queryset):
+    """Return: a cheap estimate of the rows of an unfiltered queryset, or None if there is none.
+
+    PostgreSQL keeps the estimate in pg_class; on SQLite the largest rowid is
+    close to the row count while few rows are deleted.
+    """
+    if queryset.query.where:
+        return None
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples FROM pg_class WHERE relname = %s', [table])
+        elif connection.vendor == 'sqlite':
+            cursor.execute(f'SELECT MAX(rowid) FROM {connection.ops.quote_name(table)}')
+        else:
+            return None
+        row = cursor.fetchone()
+    return int(row[0]) if row and row[0] is not None else None
+
+
+def status_flag(condition):
+    """Return: a boolean SQL expression of `condition`, a Q on the annotated current_status."""
+    return Case(When(condition, then=Value(True)), default=Value(False), output_field=BooleanField())
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that uses an estimated count instead of COUNT(*) on large unfiltered tables."""
+
+    exact_count_limit = 10000
+
+    @cached_property
+    def count(self):
+        """Return: the estimated count above exact_count_limit rows, otherwise the exact count."""
+        estimate = estimated_count(self.object_list)
+        if estimate is not None and estimate > self.exact_count_limit:
+            return estimate
+        # Count the primary keys alone so the annotations are not computed for every row.
+        return self.object_list.values('pk').order_by().count()
+
+
 class QuestionAdmin(admin.ModelAdmin):
     """Register Question model in the Admin page."""
 
     fieldsets = [
         (None, {'fields': ['question_text']}),
         ('Date information', {'fields': ['pub_date', 'end_date'], 'classes': ['collapse']}),
+        ('Vote counters', {'fields': ['sharded_votes'], 'classes': ['collapse']}),
     ]
     inlines = [ChoiceInline]
-    list_display = ('question_text', 'pub_date', 'was_published_recently', 'is_published', 'can_vote')
-    list_filter = ['pub_date']
+    list_display = ('question_text', 'pub_date', 'end_date', 'was_published_recently', 'is_published', 'can_vote',
+                    'status', 'total_votes')
+    list_filter = [StatusListFilter, 'pub_date']
     search_fields = ['question_text']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def save_model(self, request, obj, form, change):
+        """Save the question; when its counters stop being sharded, fold the shards into the tallies."""
+        super().save_model(request, obj, form, change)
+        if change and 'sharded_votes' in form.changed_data and not obj.sharded_votes:
+            Choice.fold_shards(obj.choice_set.all())
+
+    def get_queryset(self, request):
+        """Annotate the status, recent publication and total votes of each question with one current time."""
+        now = timezone.now()
+        return super().get_queryset(request).with_status(now).with_total_votes().annotate(
+            published_recently=status_flag(
+                ~Q(current_status=STATUS_UPCOMING) & Q(pub_date__gte=now - datetime.timedelta(days=1))),
+        )
+
+    def get_search_results(self, request, queryset, search_term):
+        """Filter on the full-text search index instead of a LIKE scan of question_text."""
+        if not search_term.strip():
+            return queryset, False
+        return search.get_backend().filter(queryset, search_term), False
+
+    @admin.display(ordering='current_status', description='STATUS')
+    def status(self, question):
+        """Return: the label of the status annotated in SQL."""
+        return dict(STATUS_CHOICES)[question.current_status]
+
+    @admin.display(boolean=True, ordering='published_recently', description='Published recently ?')
+    def was_published_recently(self, question):
+        """Return: True if the question was published within 1 day, as annotated in SQL."""
+        return question.published_recently
+
+    @admin.display(boolean=True, ordering=status_flag(~Q(current_status=STATUS_UPCOMING)), description='IS PUBLISHED')
+    def is_published(self, question):
+        """Return: True if the annotated status is open or closed."""
+        return question.current_status != STATUS_UPCOMING
+
+    @admin.display(boolean=True, ordering=status_flag(Q(current_status=STATUS_OPEN)), description='CAN VOTE')
+    def can_vote(self, question):
+        """Return: True if the annotated status is open."""
+        return question.current_status == STATUS_OPEN
+
+    @admin.display(ordering='total_votes', description='TOTAL VOTES')
+    def total_votes(self, question):
+        """Return: the total votes annotated in SQL."""
+        return question.total_votes
 
 
 admin.site.register(Question, QuestionAdmin)
@@ -7,3 +7,7 @@ class PollsConfig(AppConfig):
 
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'polls'
+
+    def ready(self):
+        """Connect the cache invalidation, choice map, lifecycle, search index and database tuning signal handlers."""
+        from . import caching, choicemap, db, lifecycle, search  # noqa: F401
@@ -0,0 +1,111 @@
+"""Asynchronous versions of the poll views for serving through ASGI.
+
+Django 3.2 has no asynchronous ORM, so every database step runs through
+sync_to_async on a bounded thread pool while the event loop keeps the connection.
+"""
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.db import close_old_connections
+from django.contrib.auth.views import redirect_to_login
+from django.core.exceptions import BadRequest
+from django.http import HttpResponseRedirect
+from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
+from django.utils import timezone
+
+from . import caching, choicemap, routers
+from .middleware import profiled_queries
+from .models import STATUS_CHOICES, Choice, Question
+from .views import detail_context, question_page, save_vote
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'POLLS_ASYNC_DB_THREADS', 8),
+    thread_name_prefix='polls-db',
+)
+
+
+def run_sync(func):
+    """Return: an awaitable version of `func` that runs on the bounded thread pool.
+
+    Each call closes the connection of its pool thread before and after it runs
+    when the connection is unusable or older than CONN_MAX_AGE, as Django does at
+    the start and end of a request, so the pool keeps at most one connection per
+    thread and none past its age. Its queries count toward the request profile.
+    """
+    @functools.wraps(func)
+    def call(*args, **kwargs):
+        close_old_connections()
+        try:
+            with profiled_queries():
+                return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return sync_to_async(call, thread_sensitive=False, executor=_executor)
+
+
+def _index_context(request, now):
+    status = request.GET.get('status', '')
+    cursor = request.GET.get('cursor', '')
+    try:
+        page = question_page(status, cursor, now, getattr(settings, 'POLLS_INDEX_PAGE_SIZE', 5))
+    except ValueError as error:
+        raise BadRequest(error)
+    return {
+        'latest_question_list': page,
+        'status': status,
+        'cursor': cursor,
+        'statuses': STATUS_CHOICES,
+        'index_version': caching.index_version(),
+        'index_cache_timeout': caching.index_cache_timeout(now),
+    }
+
+
+async def index(request):
+    """Display a page of published questions, newest first."""
+    context = await run_sync(_index_context)(request, timezone.now())
+    return await run_sync(render)(request, 'polls/index.html', context)
+
+
+async def detail(request, question_id):
+    """Display the detail of a question, or redirect to the index if it can not be voted on."""
+    question = await run_sync(get_object_or_404)(Question, pk=question_id)
+    if not question.can_vote():
+        messages.error(request, "This question is not allowed to vote.")
+        return redirect(reverse('polls:index'))
+    context = await run_sync(detail_context)(question)
+    return await run_sync(render)(request, 'polls/detail.html', context)
+
+
+async def results(request, pk):
+    """Display the vote totals of a question."""
+    question = await run_sync(get_object_or_404)(Question, pk=pk)
+    context = {
+        'object': question,
+        'question': question,
+        'results': await run_sync(caching.get_results)(question),
+    }
+    return await run_sync(render)(request, 'polls/results.html', context)
+
+
+async def vote(request, question_id):
+    """Record a vote and redirect to the results, or redisplay the form if no choice is selected."""
+    user = await run_sync(lambda: request.user if request.user.is_authenticated else None)()
+    if user is None:
+        return redirect_to_login(request.get_full_path(), '/accounts/login/')
+    question = await run_sync(get_object_or_404)(Question, pk=question_id)
+    try:
+        selected_choice = await run_sync(choicemap.get_choice)(question, request.POST['choice'])
+    except (KeyError, Choice.DoesNotExist):
+        context = await run_sync(detail_context)(question, error_message="You didn't select a choice.")
+        return await run_sync(render)(request, 'polls/detail.html', context)
+    await run_sync(save_vote)(user, question, selected_choice)
+    await run_sync(routers.pin_to_primary)(request)
+    logger.info('User %s submit a vote for question %s', user.username, question.id)
+    return HttpResponseRedirect(reverse('polls:results', args=(question.id,)))
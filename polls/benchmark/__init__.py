@@ -0,0 +1 @@
+"""Dataset seeding and load testing of the polls app."""
@@ -0,0 +1,40 @@
+"""Compare concurrent votes on one hot question with a single and with sharded counters per choice."""
+from django.db.models import Count
+from django.test import override_settings
+
+from polls.models import STATUS_OPEN, Choice, Question, Vote
+
+from .runner import BenchmarkRunner
+from .seed import QUESTION_PREFIX
+
+
+def hot_question():
+    """Return: the open benchmark question with the most choices, or None."""
+    return Question.objects.filter(
+        question_text__startswith=QUESTION_PREFIX, status=STATUS_OPEN,
+    ).annotate(choices=Count('choice')).order_by('-choices', 'pk').first()
+
+
+def compare_counter_modes(writers=16, requests=400, shards=8, seed=None):
+    """Return: the vote endpoint statistics on one question with single and with sharded counters.
+
+    Each mode is run with `writers` concurrent clients voting on the same question,
+    and reports whether the tallies still match the Vote rows afterwards.
+    """
+    question = hot_question()
+    if question is None:
+        raise ValueError('No open benchmark question found; run seed_polls first.')
+    report = {'question': question.pk}
+    try:
+        for mode, sharded in (('single', False), ('sharded', True)):
+            Question.objects.filter(pk=question.pk).update(sharded_votes=sharded)
+            with override_settings(POLLS_VOTE_SHARDS=shards, POLLS_SHARD_VOTE_RATE=0):
+                runner = BenchmarkRunner(requests=requests, concurrency=writers, seed=seed, question_ids=[question.pk])
+                report[mode] = runner.run(['vote'])['vote']
+            results = Question.objects.get(pk=question.pk).get_results()
+            report[mode]['tallies_match_votes'] = results['total_votes'] == Vote.objects.filter(
+                question=question).count()
+    finally:
+        Question.objects.filter(pk=question.pk).update(sharded_votes=False)
+        Choice.fold_shards(question.choice_set.all())
+    return report
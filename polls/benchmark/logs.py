@@ -0,0 +1,71 @@
+"""Compare vote latency with synchronous and queued log handlers writing to a slow stream."""
+import logging
+import threading
+import time
+
+from polls.log import BackgroundQueueHandler
+from polls.profiling import percentile
+
+from .runner import BenchmarkRunner
+
+
+class SlowStream:
+    """A stream that takes `delay` seconds for every write, like a busy disk or a full pipe."""
+
+    def __init__(self, delay):
+        """Set the seconds each write takes."""
+        self.delay = delay
+        self.writes = 0
+        self._lock = threading.Lock()
+
+    def write(self, text):
+        """Wait, then count the write and discard the text."""
+        time.sleep(self.delay)
+        with self._lock:
+            self.writes += 1
+
+    def flush(self):
+        """Do nothing; the writes are not kept."""
+
+
+def time_handle(handler):
+    """Return: a list that collects the seconds each call of handler.handle() takes in the request threads."""
+    durations = []
+    handle = handler.handle
+
+    def timed_handle(record):
+        started = time.perf_counter()
+        try:
+            return handle(record)
+        finally:
+            durations.append(time.perf_counter() - started)
+    handler.handle = timed_handle
+    return durations
+
+
+def compare_handlers(writers=8, requests=200, write_delay_ms=2.0, seed=None):
+    """Return: the vote endpoint statistics with a synchronous and with a queued handler on the polls logger.
+
+    Both handlers write to a SlowStream taking `write_delay_ms` per record. Besides
+    the request latency, the report has the time the request threads spent logging.
+    """
+    polls_logger = logging.getLogger('polls')
+    saved = polls_logger.handlers[:]
+    report = {}
+    try:
+        for name in ('sync', 'queue'):
+            stream_handler = logging.StreamHandler(SlowStream(write_delay_ms / 1000))
+            handler = stream_handler if name == 'sync' else BackgroundQueueHandler([stream_handler])
+            durations = time_handle(handler)
+            polls_logger.handlers = [handler]
+            runner = BenchmarkRunner(requests=requests, concurrency=writers, seed=seed)
+            report[name] = runner.run(['vote'])['vote']
+            handler.close()
+            report[name].update({
+                'log_p50_ms': round(percentile(durations, 50) * 1000, 3) if durations else None,
+                'log_p99_ms': round(percentile(durations, 99) * 1000, 3) if durations else None,
+                'records_written': stream_handler.stream.writes,
+            })
+    finally:
+        polls_logger.handlers = saved
+    return report
@@ -0,0 +1,42 @@
+"""Time keyset and offset pagination of the question listing at increasing depths."""
+import statistics
+import time
+
+from django.utils import timezone
+
+from polls.pagination import encode_cursor
+from polls.views import question_page
+
+
+def _median_ms(fetch, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fetch()
+        timings.append(time.perf_counter() - started)
+    return round(statistics.median(timings) * 1000, 3)
+
+
+def measure_depths(depths=(0, 1000, 10000, 100000, 500000), size=20, status='', repeat=5):
+    """Return: the median milliseconds to fetch one page at each depth, with a cursor and with OFFSET.
+
+    Depths past the end of the listing are left out.
+    """
+    now = timezone.now()
+    first = question_page(status, None, now, size)
+    ordered = first.queryset
+    report = []
+    for depth in depths:
+        cursor = None
+        if depth:
+            previous = ordered.only('pk', 'pub_date')[depth - 1:depth].first()
+            if previous is None:
+                continue
+            cursor = encode_cursor(previous)
+        page = question_page(status, cursor, now, size)
+        keyset_ms = _median_ms(lambda: list(question_page(status, cursor, now, size)), repeat)
+        offset_ms = _median_ms(lambda: list(ordered[depth:depth + size]), repeat)
+        if [question.pk for question in page] != [question.pk for question in ordered[depth:depth + size]]:
+            raise AssertionError(f'The keyset and offset pages differ at depth {depth}.')
+        report.append({'depth': depth, 'keyset_ms': keyset_ms, 'offset_ms': offset_ms})
+    return report
@@ -0,0 +1,157 @@
+"""Drive the poll endpoints with concurrent clients and report latency statistics."""
+import random
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from polls.models import Question
+from polls.profiling import QueryProfiler, TemplateProfiler, percentile
+
+from .seed import QUESTION_PREFIX, USERNAME_PREFIX
+
+ENDPOINTS = ('index', 'detail', 'results', 'vote')
+
+
+def summarize(latencies, errors, queries, elapsed, renders=()):
+    """Return: the JSON-ready statistics of one endpoint run; `renders` are the template seconds of each request."""
+    count = len(latencies)
+    return {
+        'requests': count,
+        'errors': errors,
+        'rps': round(count / elapsed, 2) if elapsed else None,
+        'mean_ms': round(statistics.mean(latencies) * 1000, 3) if latencies else None,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3) if latencies else None,
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3) if latencies else None,
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3) if latencies else None,
+        'queries_per_request': round(sum(queries) / len(queries), 2) if queries else None,
+        'render_mean_ms': round(statistics.mean(renders) * 1000, 3) if renders else None,
+        'render_p95_ms': round(percentile(renders, 95) * 1000, 3) if renders else None,
+    }
+
+
+class BenchmarkRunner:
+    """Send requests to the poll endpoints and collect per-endpoint statistics.
+
+    Requests go through the Django test client in this process, or through HTTP
+    to a running server when `base_url` is given. Over HTTP the query counts are
+    unknown and vote requests are anonymous, so they measure the login redirect.
+    In this process the vote and login throttling is off, as every client shares one address,
+    and the time spent loading and rendering templates is reported for each endpoint.
+    """
+
+    def __init__(self, requests=100, concurrency=1, base_url=None, seed=None, question_ids=None):
+        """Set the number of requests per endpoint and the number of concurrent clients.
+
+        With `question_ids`, every request goes to one of those questions.
+        """
+        self.question_ids = question_ids
+        self.requests = requests
+        self.concurrency = concurrency
+        self.base_url = base_url.rstrip('/') if base_url else None
+        self.rng = random.Random(seed)
+        self.templates = TemplateProfiler()
+        self._local = threading.local()
+
+    def load_targets(self):
+        """Load the questions, choices and users that the requests use."""
+        now = timezone.now()
+        questions = Question.objects.filter(question_text__startswith=QUESTION_PREFIX)
+        if self.question_ids:
+            questions = questions.filter(pk__in=self.question_ids)
+        self.all_questions = list(questions.values_list('pk', flat=True))
+        self.open_choices = {}
+        for question_id, choice_id in questions.filter(pub_date__lte=now, end_date__gte=now).values_list(
+                'pk', 'choice__pk'):
+            if choice_id is not None:
+                self.open_choices.setdefault(question_id, []).append(choice_id)
+        self.open_questions = list(self.open_choices)
+        self.users = list(User.objects.filter(username__startswith=USERNAME_PREFIX)[:max(self.concurrency, 1)])
+        if not self.all_questions or not self.open_questions:
+            raise ValueError('No benchmark questions found; run seed_polls first.')
+
+    def request_for(self, endpoint):
+        """Return: the method, path and data of a random request to `endpoint`."""
+        if endpoint == 'index':
+            return 'get', reverse('polls:index'), None
+        if endpoint == 'results':
+            return 'get', reverse('polls:results', args=(self.rng.choice(self.all_questions),)), None
+        question_id = self.rng.choice(self.open_questions)
+        if endpoint == 'detail':
+            return 'get', reverse('polls:detail', args=(question_id,)), None
+        return 'post', reverse('polls:vote', args=(question_id,)), {
+            'choice': self.rng.choice(self.open_choices[question_id])}
+
+    def _client(self, endpoint):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = Client(raise_request_exception=False, SERVER_NAME='localhost')
+            self._local.client = client
+            self._local.counter = QueryProfiler()
+        if endpoint == 'vote' and not getattr(self._local, 'logged_in', False) and self.users:
+            client.force_login(self.users[threading.get_ident() % len(self.users)])
+            self._local.logged_in = True
+        return client
+
+    def _send(self, endpoint, method, path, data):
+        """Send one request and return its latency, error flag, query count and template seconds."""
+        if self.base_url:
+            return self._send_http(method, path, data)
+        client = self._client(endpoint)
+        counter = self._local.counter
+        counter.reset()
+        self.templates.reset()
+        with connection.execute_wrapper(counter):
+            started = time.perf_counter()
+            response = getattr(client, method)(path, data or {})
+            latency = time.perf_counter() - started
+        return latency, response.status_code >= 400, counter.count, self.templates.seconds
+
+    def _send_http(self, method, path, data):
+        body = None
+        if method == 'post':
+            body = urllib.parse.urlencode(data).encode()
+        request = urllib.request.Request(self.base_url + path, data=body, method=method.upper())
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request) as response:
+                response.read()
+                error = response.status >= 400
+        except urllib.error.URLError:
+            error = True
+        return time.perf_counter() - started, error, None, None
+
+    def run_endpoint(self, endpoint):
+        """Send `requests` requests to `endpoint` and return their statistics."""
+        planned = [self.request_for(endpoint) for _ in range(self.requests)]
+
+        def send(request):
+            return self._send(endpoint, *request)
+
+        started = time.perf_counter()
+        if self.concurrency > 1:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                outcomes = list(executor.map(send, planned))
+        else:
+            outcomes = [send(request) for request in planned]
+        elapsed = time.perf_counter() - started
+        latencies = [latency for latency, _, _, _ in outcomes]
+        errors = sum(1 for _, error, _, _ in outcomes if error)
+        queries = [count for _, _, count, _ in outcomes if count is not None]
+        renders = [seconds for _, _, _, seconds in outcomes if seconds is not None]
+        return summarize(latencies, errors, queries, elapsed, renders)
+
+    def run(self, endpoints=ENDPOINTS):
+        """Return: the statistics of every endpoint in `endpoints`."""
+        self.load_targets()
+        with override_settings(POLLS_THROTTLE_RATES={}), self.templates:
+            return {endpoint: self.run_endpoint(endpoint) for endpoint in endpoints}
@@ -0,0 +1,89 @@
+"""Seed a benchmark dataset of questions, choices, users and votes."""
+import datetime
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from polls import search
+from polls.models import Choice, Question, Vote, status_at
+
+USERNAME_PREFIX = 'bench-user-'
+QUESTION_PREFIX = 'Benchmark question'
+PASSWORD = 'Bench4me!'
+
+
+def choice_weights(choices, skew):
+    """Return: Zipf-like weights so the first choices get most of the votes.
+
+    A skew of 0 spreads the votes evenly.
+    """
+    return [1 / (rank ** skew) for rank in range(1, choices + 1)]
+
+
+def clear_dataset():
+    """Delete the questions and users made by an earlier seed."""
+    Question.objects.filter(question_text__startswith=QUESTION_PREFIX).delete()
+    User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+
+
+def seed_dataset(questions, choices, votes, skew=1.0, open_ratio=0.8, batch_size=1000, seed=None):
+    """Create `questions` × `choices` with `votes` votes per question.
+
+    Every vote of a question comes from a different user, so `votes` users are made.
+    Return: a dict with the number of rows created of each model.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    weights = choice_weights(choices, skew)
+    password = make_password(PASSWORD)
+    with transaction.atomic():
+        users = User.objects.bulk_create(
+            [User(username=f'{USERNAME_PREFIX}{n}', password=password) for n in range(votes)],
+            batch_size=batch_size,
+        )
+        if not users or users[0].pk is None:
+            users = list(User.objects.filter(username__startswith=USERNAME_PREFIX).order_by('pk'))
+        question_rows = []
+        for n in range(questions):
+            pub_date = now - datetime.timedelta(minutes=rng.randint(1, 60 * 24 * 30))
+            if rng.random() < open_ratio:
+                end_date = now + datetime.timedelta(days=rng.randint(1, 30))
+            else:
+                end_date = pub_date + datetime.timedelta(minutes=1)
+            question_rows.append(Question(question_text=f'{QUESTION_PREFIX} {n}', pub_date=pub_date,
+                                          end_date=end_date, status=status_at(pub_date, end_date, now)))
+        Question.objects.bulk_create(question_rows, batch_size=batch_size)
+        question_ids = list(Question.objects.filter(
+            question_text__startswith=QUESTION_PREFIX).order_by('pk').values_list('pk', flat=True))
+        Choice.objects.bulk_create(
+            [Choice(question_id=question_id, choice_text=f'Choice {n}')
+             for question_id in question_ids for n in range(1, choices + 1)],
+            batch_size=batch_size,
+        )
+        choice_ids = {}
+        for question_id, choice_id in Choice.objects.filter(
+                question_id__in=question_ids).order_by('pk').values_list('question_id', 'pk'):
+            choice_ids.setdefault(question_id, []).append(choice_id)
+        vote_rows = []
+        vote_count = 0
+        for question_id in question_ids:
+            picks = rng.choices(choice_ids[question_id], weights=weights, k=len(users))
+            for user, choice_id in zip(users, picks):
+                vote_rows.append(Vote(user_id=user.pk, question_id=question_id, choice_id=choice_id))
+            if len(vote_rows) >= batch_size:
+                Vote.objects.bulk_create(vote_rows, batch_size=batch_size)
+                vote_count += len(vote_rows)
+                vote_rows = []
+        Vote.objects.bulk_create(vote_rows, batch_size=batch_size)
+        vote_count += len(vote_rows)
+        Choice.rebuild_vote_counts(Choice.objects.filter(question_id__in=question_ids))
+        search.get_backend().update(question_ids)
+    return {
+        'users': len(users),
+        'questions': len(question_ids),
+        'choices': len(question_ids) * choices,
+        'votes': vote_count,
+    }
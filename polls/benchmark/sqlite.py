@@ -0,0 +1,38 @@
+"""Compare vote throughput with the default and the tuned SQLite settings."""
+from django.conf import settings
+from django.db import connection, connections
+
+from .runner import BenchmarkRunner
+
+BASELINE_PRAGMAS = {'journal_mode': 'DELETE', 'synchronous': 'FULL'}
+
+
+def apply_profile(pragmas, conn_max_age):
+    """Use `pragmas` and `conn_max_age` for every connection opened from now on."""
+    connections.close_all()
+    settings.SQLITE_PRAGMAS = pragmas
+    for alias in connections:
+        connections[alias].settings_dict['CONN_MAX_AGE'] = conn_max_age
+
+
+def compare_profiles(writers=8, requests=200, seed=None):
+    """Return: the vote endpoint statistics under the baseline and the tuned profile.
+
+    Each profile is run with `writers` concurrent clients on the seeded dataset.
+    """
+    if connection.vendor != 'sqlite':
+        raise ValueError('The SQLite benchmark needs an SQLite default database.')
+    saved = (settings.SQLITE_PRAGMAS, connection.settings_dict['CONN_MAX_AGE'])
+    profiles = {
+        'baseline': (BASELINE_PRAGMAS, 0),
+        'tuned': (settings.SQLITE_TUNED_PRAGMAS, 600),
+    }
+    report = {}
+    try:
+        for name, (pragmas, conn_max_age) in profiles.items():
+            apply_profile(pragmas, conn_max_age)
+            runner = BenchmarkRunner(requests=requests, concurrency=writers, seed=seed)
+            report[name] = runner.run(['vote'])['vote']
+    finally:
+        apply_profile(*saved)
+    return report
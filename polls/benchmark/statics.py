@@ -0,0 +1,68 @@
+"""Measure the static bytes a client downloads before and after the hashed, compressed pipeline."""
+import json
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.test import Client
+
+# The background image each viewport of style.css downloads with the pipeline: the WebP variant of its width.
+VIEWPORT_IMAGES = {
+    'wide': 'polls/images/bg5.webp',
+    'max_1280px': 'polls/images/bg5-1280w.webp',
+    'max_640px': 'polls/images/bg5-640w.webp',
+}
+# The stylesheet and background image of the poll pages, as they were served before the pipeline.
+ORIGINAL_ASSETS = ('polls/style.css', 'polls/images/bg5.jpg')
+
+
+def load_manifest(root=None):
+    """Return: the manifest of the collected files, {name: hashed name}.
+
+    Raise: FileNotFoundError if collectstatic has not written a manifest.
+    """
+    with open(os.path.join(root or settings.STATIC_ROOT, ManifestStaticFilesStorage.manifest_name)) as manifest:
+        return json.load(manifest)['paths']
+
+
+def fetch(client, name, accept_encoding=''):
+    """Return: the body bytes, Content-Encoding and Cache-Control of a GET of the static file `name`."""
+    headers = {'HTTP_ACCEPT_ENCODING': accept_encoding} if accept_encoding else {}
+    response = client.get(settings.STATIC_URL + name, **headers)
+    if response.status_code != 200:
+        raise FileNotFoundError(f'{name} is not served: {response.status_code}')
+    return {
+        'bytes': sum(len(chunk) for chunk in response.streaming_content),
+        'encoding': response.get('Content-Encoding'),
+        'cache_control': response.get('Cache-Control'),
+    }
+
+
+def measure_transfer(prefix='polls/', accept_encoding='br, gzip'):
+    """Return: the bytes of each static file under `prefix` and of a first page view, before and after.
+
+    Before is the file under its original name without compression, as the
+    static() view sent it; after is the hashed name with the best encoding
+    the client accepts, and for the page the WebP background of each viewport.
+    """
+    manifest = load_manifest()
+    client = Client(SERVER_NAME='localhost')
+    files = {}
+    for name, hashed in sorted(manifest.items()):
+        if not name.startswith(prefix):
+            continue
+        before, after = fetch(client, name), fetch(client, hashed, accept_encoding)
+        files[name] = {
+            'before': before['bytes'],
+            'after': after['bytes'],
+            'encoding': after['encoding'],
+            'cache_control': after['cache_control'],
+        }
+    stylesheet = ORIGINAL_ASSETS[0]
+    before = sum(fetch(client, name)['bytes'] for name in ORIGINAL_ASSETS)
+    page = {}
+    for viewport, variant in VIEWPORT_IMAGES.items():
+        after = (fetch(client, manifest[stylesheet], accept_encoding)['bytes']
+                 + fetch(client, manifest[variant])['bytes'])
+        page[viewport] = {'before': before, 'after': after, 'saved_pct': round(100 * (1 - after / before), 1)}
+    return {'files': files, 'page': page}
@@ -0,0 +1,79 @@
+"""Load test of the server-sent events results stream with many idle subscribers."""
+import asyncio
+import time
+import tracemalloc
+
+from asgiref.sync import sync_to_async
+
+from polls import caching, streams
+from polls.profiling import percentile
+
+
+class StreamClient:
+    """An in-process ASGI client that reads one results stream."""
+
+    def __init__(self, stop):
+        """Disconnect when the `stop` event is set."""
+        self.stop = stop
+        self.events = 0
+        self.status = None
+        self.connected = asyncio.Event()
+        self.received = asyncio.Event()
+
+    async def receive(self):
+        """Report the client disconnect once `stop` is set."""
+        await self.stop.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(self, message):
+        """Count the results events sent to the client."""
+        if message['type'] == 'http.response.start':
+            self.status = message['status']
+        elif message.get('body', b'').startswith(b'event: results'):
+            self.events += 1
+            if self.events == 1:
+                self.connected.set()
+            else:
+                self.received.set()
+
+
+async def run_stream_load(question_id, subscribers=1000, updates=5):
+    """Return: connection time, memory and update fan-out statistics for `subscribers` clients.
+
+    Every client subscribes to the stream of `question_id`, then the results
+    version is bumped `updates` times and the time until every client has the
+    new results is measured.
+    """
+    application = streams.stream_application(None)
+    scope = {'type': 'http', 'method': 'GET', 'path': f'/polls/{question_id}/stream/'}
+    stop = asyncio.Event()
+    clients = [StreamClient(stop) for _ in range(subscribers)]
+    tracemalloc.start()
+    memory_before = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    tasks = [asyncio.ensure_future(application(scope, client.receive, client.send)) for client in clients]
+    await asyncio.gather(*(client.connected.wait() for client in clients))
+    connect_seconds = time.perf_counter() - started
+    memory_per_subscriber = (tracemalloc.get_traced_memory()[0] - memory_before) / subscribers
+    tracemalloc.stop()
+    fanout = []
+    for _ in range(updates):
+        for client in clients:
+            client.received.clear()
+        bumped = time.perf_counter()
+        await sync_to_async(caching.bump_results_version, thread_sensitive=False)(question_id)
+        await asyncio.gather(*(client.received.wait() for client in clients))
+        fanout.append(time.perf_counter() - bumped)
+    broadcaster = streams.get_broadcaster(question_id, None)
+    stop.set()
+    await asyncio.gather(*tasks)
+    return {
+        'subscribers': subscribers,
+        'updates': updates,
+        'connect_seconds': round(connect_seconds, 3),
+        'memory_kib_per_subscriber': round(memory_per_subscriber / 1024, 2),
+        'fanout_p50_ms': round(percentile(fanout, 50) * 1000, 3),
+        'fanout_max_ms': round(max(fanout) * 1000, 3),
+        'broadcaster_checks': broadcaster.checks,
+        'broadcaster_updates': broadcaster.updates,
+    }
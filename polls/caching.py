@@ -0,0 +1,224 @@
+"""Cache layer for the per-question results and the index page of the polls."""
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import routers
+from .lifecycle import status_changed
+from .models import Choice, Question
+
+_MISSING = object()
+INDEX_VERSION_KEY = 'polls:index-version'
+
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0}
+
+
+def _count(name):
+    """Add one to the hit or miss counter."""
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def cache_stats():
+    """Return: a copy of the results cache hit and miss counters."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_cache_stats():
+    """Set the results cache hit and miss counters back to zero."""
+    with _stats_lock:
+        for name in _stats:
+            _stats[name] = 0
+
+
+def _version_timeout():
+    """Return: the seconds a version key is kept; an expired one only makes its entries miss."""
+    return getattr(settings, 'POLLS_CACHE_VERSION_TIMEOUT', 86400)
+
+
+def _get_version(key):
+    """Return: the version stored at `key`, creating it when missing."""
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock so a lost version key never reuses an old version.
+        cache.add(key, time.time_ns(), _version_timeout())
+        version = cache.get(key)
+    return version
+
+
+def _bump_version(key):
+    """Move the version stored at `key` to a new value."""
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), _version_timeout())
+
+
+def _version_key(question_id):
+    return f'polls:results-version:{question_id}'
+
+
+def results_version(question_id):
+    """Return: the current results version of a question."""
+    return _get_version(_version_key(question_id))
+
+
+def bump_results_version(question_id):
+    """Invalidate the cached results of a question by moving to a new version."""
+    _bump_version(_version_key(question_id))
+
+
+def _choices_version_key(question_id):
+    return f'polls:choices-version:{question_id}'
+
+
+def choices_version(question_id):
+    """Return: the current version of the choice list of a question, which votes do not change."""
+    return _get_version(_choices_version_key(question_id))
+
+
+def bump_choices_version(question_id):
+    """Invalidate the cached choice list fragment of a question."""
+    _bump_version(_choices_version_key(question_id))
+
+
+def choices_cache_context(question_id):
+    """Return: the version and timeout of the cached choice list fragment of the detail page."""
+    return {
+        'choices_version': choices_version(question_id),
+        'choices_cache_timeout': getattr(settings, 'POLLS_CHOICES_CACHE_TIMEOUT', 3600),
+    }
+
+
+def index_version():
+    """Return: the current version of the index page fragment."""
+    return _get_version(INDEX_VERSION_KEY)
+
+
+def bump_index_version():
+    """Invalidate the cached index page fragment."""
+    _bump_version(INDEX_VERSION_KEY)
+
+
+def index_cache_timeout(now):
+    """Return: the seconds the index fragment stays valid, until the next poll publishes or closes."""
+    max_timeout = getattr(settings, 'POLLS_INDEX_CACHE_MAX_TIMEOUT', 3600)
+    key = f'polls:index-next-change:{index_version()}'
+    next_change = cache.get(key, _MISSING)
+    if next_change is _MISSING or (next_change is not None and next_change <= now):
+        next_change = Question.objects.next_status_change(now)
+        cache.set(key, next_change, max_timeout)
+    if next_change is None:
+        return max_timeout
+    return max(1, min(max_timeout, math.ceil((next_change - now).total_seconds())))
+
+
+def get_results(question):
+    """Return: the results of a question, computed from the primary only when the cache misses."""
+    key = f'polls:results:{question.id}:{results_version(question.id)}'
+    results = cache.get(key)
+    if results is not None:
+        _count('hits')
+        return results
+    _count('misses')
+    with routers.read_from_primary():
+        results = question.get_results()
+    cache.set(key, results, getattr(settings, 'POLLS_RESULTS_CACHE_TIMEOUT', 300))
+    return results
+
+
+def results_versions(question_ids):
+    """Return: the current results version of each existing question in `question_ids`, by id.
+
+    The questions without a version key are looked up first, so an id that is not
+    a question gets no key and is left out.
+    """
+    version_keys = {_version_key(question_id): question_id for question_id in question_ids}
+    versions = {version_keys[key]: version for key, version in cache.get_many(version_keys).items()}
+    unversioned = [question_id for question_id in question_ids if question_id not in versions]
+    if unversioned:
+        with routers.read_from_primary():
+            existing = list(Question.objects.filter(pk__in=unversioned).values_list('pk', flat=True))
+        for question_id in existing:
+            versions[question_id] = results_version(question_id)
+    return versions
+
+
+def get_many_results(question_ids, versions=None):
+    """Return: the results of the existing questions in `question_ids`, by id.
+
+    Cached results are read in one cache round trip and the misses are
+    computed together in one query on the primary. `versions` are the
+    results_versions() of the ids when the caller already has them.
+    """
+    if versions is None:
+        versions = results_versions(question_ids)
+    question_ids = [question_id for question_id in question_ids if question_id in versions]
+    result_keys = {f'polls:results:{question_id}:{versions[question_id]}': question_id
+                   for question_id in question_ids}
+    results = {result_keys[key]: value for key, value in cache.get_many(result_keys).items()}
+    missing = [question_id for question_id in question_ids if question_id not in results]
+    with _stats_lock:
+        _stats['hits'] += len(results)
+        _stats['misses'] += len(missing)
+    if missing:
+        with routers.read_from_primary():
+            computed = Question.objects.results_for(missing)
+        cache.set_many(
+            {f'polls:results:{question_id}:{versions[question_id]}': value for question_id, value in computed.items()},
+            getattr(settings, 'POLLS_RESULTS_CACHE_TIMEOUT', 300),
+        )
+        results.update(computed)
+    return results
+
+
+def results_etag(question_ids, versions=None):
+    """Return: a strong ETag value for the current results of `question_ids`, or None if none exists."""
+    if versions is None:
+        versions = results_versions(question_ids)
+    if not versions:
+        return None
+    tag = ','.join(f'{question_id}:{versions.get(question_id, "-")}' for question_id in question_ids)
+    return hashlib.sha1(tag.encode()).hexdigest()
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def on_question_change(instance, using, **kwargs):
+    """Invalidate the cached results and index once a saved or deleted question commits.
+
+    A bump before the commit would let a reader cache the old rows under the new version.
+    """
+    question_id = instance.id
+
+    def invalidate():
+        bump_results_version(question_id)
+        bump_index_version()
+    transaction.on_commit(invalidate, using=using)
+
+
+@receiver(post_save, sender=Choice)
+@receiver(post_delete, sender=Choice)
+def on_choice_change(instance, using, **kwargs):
+    """Invalidate the cached results and choice list once a saved or deleted choice commits."""
+    question_id = instance.question_id
+
+    def invalidate():
+        bump_results_version(question_id)
+        bump_choices_version(question_id)
+    transaction.on_commit(invalidate, using=using)
+
+
+@receiver(status_changed, sender=Question)
+def on_status_change(question_ids, **kwargs):
+    """Invalidate the cached index when questions publish or close."""
+    bump_index_version()
@@ -0,0 +1,122 @@
+"""Process-local LRU map of the choices of each question, shared by the detail and vote views."""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import caching
+from .models import Choice, Question
+
+
+class ChoiceMap:
+    """Least recently used map of question id to its choices, an {id: text} dict in id order.
+
+    An entry keeps the choices version it was read at, so a choice saved by
+    another process, which bumps the shared version, is read again on the next
+    lookup. Changes saved in this process evict the entry once they commit. An
+    entry older than `ttl` seconds is read again, which bounds how long a
+    missed eviction or version bump can serve stale choices.
+    """
+
+    def __init__(self, max_size=1000, ttl=300):
+        """Keep the choices of at most `max_size` questions for at most `ttl` seconds."""
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, question_id, version):
+        """Return: the choices of a question at `version`, read from the database on a miss.
+
+        The dict is shared by every caller and must not be changed.
+        """
+        with self._lock:
+            entry = self._entries.get(question_id)
+            if entry is not None and entry[0] == version and time.monotonic() < entry[1]:
+                self._entries.move_to_end(question_id)
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+        choices = dict(Choice.objects.filter(question_id=question_id).order_by('pk').values_list('pk', 'choice_text'))
+        with self._lock:
+            self._entries[question_id] = (version, time.monotonic() + self.ttl, choices)
+            self._entries.move_to_end(question_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return choices
+
+    def evict(self, question_id):
+        """Forget the choices of a question."""
+        with self._lock:
+            self._entries.pop(question_id, None)
+
+    def clear(self):
+        """Forget every question and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        """Return: the number of questions held, the size bound and the hit and miss counters."""
+        with self._lock:
+            return {'size': len(self._entries), 'max_size': self.max_size, 'hits': self.hits, 'misses': self.misses}
+
+
+_choice_map = None
+_choice_map_lock = threading.Lock()
+
+
+def get_choice_map():
+    """Return: the choice map of this process, holding at most POLLS_CHOICE_MAP_SIZE questions."""
+    global _choice_map
+    with _choice_map_lock:
+        if _choice_map is None:
+            _choice_map = ChoiceMap(getattr(settings, 'POLLS_CHOICE_MAP_SIZE', 1000),
+                                    getattr(settings, 'POLLS_CHOICE_MAP_TTL', 300))
+        return _choice_map
+
+
+def question_choices(question_id, version=None):
+    """Return: the {id: text} choices of a question, at `version` or the current choices version."""
+    if version is None:
+        version = caching.choices_version(question_id)
+    return get_choice_map().get(question_id, version)
+
+
+def get_choice(question, choice_id):
+    """Return: the choice `choice_id` of `question`, built from the choice map without a query.
+
+    Raise: Choice.DoesNotExist if `choice_id` is not the id of one of its choices.
+    """
+    try:
+        choice_id = int(choice_id)
+    except (TypeError, ValueError):
+        raise Choice.DoesNotExist(f'{choice_id!r} is not a choice id.')
+    choices = question_choices(question.id)
+    if choice_id not in choices:
+        raise Choice.DoesNotExist(f'Question {question.id} has no choice {choice_id}.')
+    return Choice(id=choice_id, question=question, choice_text=choices[choice_id])
+
+
+@receiver(post_save, sender=Choice)
+@receiver(post_delete, sender=Choice)
+def on_choice_change(instance, using, **kwargs):
+    """Evict the question of a saved or deleted choice once the change commits.
+
+    An eviction before the commit would let a lookup read the old choices back in.
+    """
+    question_id = instance.question_id
+    transaction.on_commit(lambda: get_choice_map().evict(question_id), using=using)
+
+
+@receiver(post_delete, sender=Question)
+def on_question_delete(instance, using, **kwargs):
+    """Evict a deleted question once the delete commits."""
+    question_id = instance.id
+    transaction.on_commit(lambda: get_choice_map().evict(question_id), using=using)
@@ -0,0 +1,41 @@
+"""Automatic sharding of the vote counters of questions with many votes a second."""
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Choice, Question
+
+logger = logging.getLogger(__name__)
+
+
+def note_vote(question, count=1):
+    """Count `count` votes on `question` in the current second, and shard its counters above POLLS_SHARD_VOTE_RATE.
+
+    Return: True if the question was switched to sharded counters by these votes.
+    """
+    threshold = getattr(settings, 'POLLS_SHARD_VOTE_RATE', 0)
+    if not threshold or question.sharded_votes:
+        return False
+    key = f'polls:vote-rate:{question.id}:{int(time.time())}'
+    cache.add(key, 0, 2)
+    try:
+        rate = cache.incr(key, count)
+    except ValueError:
+        return False
+    if rate <= threshold:
+        return False
+    if not Question.objects.filter(pk=question.id, sharded_votes=False).update(sharded_votes=True):
+        return False
+    logger.info('Sharding the vote counters of question %s at %d votes/s', question.id, rate)
+    question.sharded_votes = True
+    return True
+
+
+def add_votes(question, choice_id, amount=1):
+    """Add `amount` votes to the tally of a choice of `question`, over shard rows when it has sharded_votes.
+
+    Used by the vote view and the buffered vote writer alike.
+    """
+    Choice.add_vote(choice_id, amount, shards=question.vote_shards())
@@ -0,0 +1,129 @@
+"""Streaming export of votes and per-choice results as CSV or NDJSON."""
+import csv
+import datetime
+import json
+import logging
+import time
+
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Choice, Vote, shard_votes
+
+logger = logging.getLogger(__name__)
+
+KINDS = ('votes', 'results')
+FORMATS = ('csv', 'ndjson')
+CONTENT_TYPES = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+# Exported columns of each kind, as (column name, queryset field).
+COLUMNS = {
+    'votes': (
+        ('vote_id', 'id'),
+        ('question_id', 'question_id'),
+        ('choice_id', 'choice_id'),
+        ('choice_text', 'choice__choice_text'),
+        ('username', 'user__username'),
+    ),
+    'results': (
+        ('question_id', 'question_id'),
+        ('question_text', 'question__question_text'),
+        ('pub_date', 'question__pub_date'),
+        ('choice_id', 'id'),
+        ('choice_text', 'choice_text'),
+        ('votes', 'tally'),
+    ),
+}
+
+
+def parse_boundary(value, end=False):
+    """Return: an aware datetime for a date or datetime string, or None for an empty value.
+
+    A plain date is the start of that day, or the end of it when `end` is True.
+    """
+    if not value:
+        return None
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f'{value!r} is not a date or a datetime.')
+        moment = datetime.datetime.combine(day, datetime.time.max if end else datetime.time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def export_rows(kind, question_ids=None, since=None, until=None, chunk_size=2000):
+    """Return: an iterator over the rows of `kind`, read from the database `chunk_size` at a time.
+
+    The rows can be limited to some questions and to questions published between
+    `since` and `until`, since votes have no time of their own.
+    """
+    if kind == 'votes':
+        queryset = Vote.objects.all()
+    else:
+        queryset = Choice.objects.annotate(tally=F('vote_count') + shard_votes())
+    if question_ids:
+        queryset = queryset.filter(question_id__in=question_ids)
+    if since:
+        queryset = queryset.filter(question__pub_date__gte=since)
+    if until:
+        queryset = queryset.filter(question__pub_date__lte=until)
+    fields = [field for _, field in COLUMNS[kind]]
+    return queryset.order_by('question_id', 'id').values_list(*fields).iterator(chunk_size=chunk_size)
+
+
+class _Echo:
+    """File-like object whose write returns the text, for csv.writer in a generator."""
+
+    def write(self, value):
+        return value
+
+
+def render(kind, fmt, rows):
+    """Return: an iterator over the lines of `rows` in the `fmt` format, header first for CSV."""
+    columns = [column for column, _ in COLUMNS[kind]]
+    if fmt == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(columns)
+        for row in rows:
+            yield writer.writerow(row)
+    else:
+        for row in rows:
+            yield json.dumps(dict(zip(columns, row)), default=str) + '\n'
+
+
+class ThroughputMeter:
+    """Count the lines of an export as they pass and time them."""
+
+    def __init__(self, lines, header=False):
+        """Wrap the `lines` iterator; a header line is not counted as a row."""
+        self.lines = lines
+        self.header = header
+        self.rows = 0
+        self.seconds = 0.0
+
+    def __iter__(self):
+        """Yield every line, then log the rows per second."""
+        started = time.perf_counter()
+        for line in self.lines:
+            if self.header:
+                self.header = False
+            else:
+                self.rows += 1
+            yield line
+        self.seconds = time.perf_counter() - started
+        logger.info('Exported %d rows in %.2f s (%.0f rows/s)', self.rows, self.seconds, self.rows_per_second)
+
+    @property
+    def rows_per_second(self):
+        """Return: the export throughput, or 0 before any time has passed."""
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def stream_export(kind, fmt, question_ids=None, since=None, until=None, chunk_size=2000):
+    """Return: a ThroughputMeter over the exported lines of `kind` in the `fmt` format."""
+    rows = export_rows(kind, question_ids, since, until, chunk_size)
+    return ThroughputMeter(render(kind, fmt, rows), header=fmt == 'csv')
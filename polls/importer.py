@@ -0,0 +1,186 @@
+"""Bulk import of poll questions and choices from CSV, JSON or YAML files."""
+import csv
+import json
+import os
+
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import caching, search
+from .models import Choice, Question, status_at
+
+FORMATS = ('csv', 'json', 'yaml')
+
+# CSV files have one question per row; the choices column separates choices with this.
+CSV_CHOICE_SEPARATOR = '|'
+
+
+class PollImportError(ValueError):
+    """The import file can not be read or has invalid questions."""
+
+
+def detect_format(path):
+    """Return: the import format named by the extension of `path`."""
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+    if extension == 'yml':
+        extension = 'yaml'
+    if extension not in FORMATS:
+        raise PollImportError(f'Can not tell the format of {path}; use --format.')
+    return extension
+
+
+def load_records(path, fmt):
+    """Return: the list of question records in the file at `path`."""
+    with open(path, newline='') as source:
+        if fmt == 'csv':
+            records = []
+            for row in csv.DictReader(source):
+                row['choices'] = [text for text in (row.get('choices') or '').split(CSV_CHOICE_SEPARATOR) if text]
+                records.append(row)
+            return records
+        if fmt == 'yaml':
+            try:
+                import yaml
+            except ImportError:
+                raise PollImportError('Importing YAML needs PyYAML: pip install pyyaml') from None
+            records = yaml.safe_load(source)
+        else:
+            records = json.load(source)
+    if not isinstance(records, list):
+        raise PollImportError('The file must hold a list of questions.')
+    return records
+
+
+def _parse_date(value, name, errors, position, parsed):
+    """Return: `value` as an aware datetime, reusing `parsed` for values seen before."""
+    if isinstance(value, str) and value in parsed:
+        return parsed[value]
+    moment = parse_datetime(value) if isinstance(value, str) else value
+    if moment is None or not hasattr(moment, 'tzinfo'):
+        errors.append(f'Question {position}: {name} {value!r} is not a datetime.')
+        return None
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    if isinstance(value, str):
+        parsed[value] = moment
+    return moment
+
+
+def validate(records):
+    """Return: the records as (Question, [choice texts]) pairs.
+
+    Raise PollImportError listing every invalid record.
+    """
+    questions = []
+    errors = []
+    parsed = {}
+    max_length = Question._meta.get_field('question_text').max_length
+    for position, record in enumerate(records, start=1):
+        if not isinstance(record, dict):
+            errors.append(f'Question {position}: is not a mapping.')
+            continue
+        text = (record.get('question_text') or '').strip()
+        if not text or len(text) > max_length:
+            errors.append(f'Question {position}: question_text must have 1 to {max_length} characters.')
+        pub_date = _parse_date(record.get('pub_date'), 'pub_date', errors, position, parsed)
+        end_date = _parse_date(record.get('end_date'), 'end_date', errors, position, parsed)
+        if pub_date and end_date and end_date < pub_date:
+            errors.append(f'Question {position}: end_date is before pub_date.')
+        choices = record.get('choices')
+        if not isinstance(choices, list) or not all(isinstance(choice, str) for choice in choices):
+            errors.append(f'Question {position}: choices must be a list of strings.')
+            choices = []
+        else:
+            choices = [choice.strip() for choice in choices]
+            if not choices or not all(choices) or any(len(choice) > max_length for choice in choices):
+                errors.append(f'Question {position}: needs 1 or more choices of 1 to {max_length} characters.')
+        questions.append((Question(question_text=text, pub_date=pub_date, end_date=end_date), choices))
+    if errors:
+        raise PollImportError('\n'.join(errors))
+    return questions
+
+
+def _create(questions, batch_size):
+    """Insert new questions and their choices; return the number of choices made."""
+    last_pk = Question.objects.aggregate(last=Max('pk'))['last'] or 0
+    now = timezone.now()
+    for question, _ in questions:
+        question.status = status_at(question.pub_date, question.end_date, now)
+    created = Question.objects.bulk_create([question for question, _ in questions], batch_size=batch_size)
+    if created and created[0].pk is None:
+        # SQLite does not return the new keys; the write lock keeps them in insert order.
+        for question, pk in zip(created, Question.objects.filter(pk__gt=last_pk).order_by('pk').values_list(
+                'pk', flat=True)):
+            question.pk = pk
+    choices = [Choice(question_id=question.pk, choice_text=text) for question, texts in questions for text in texts]
+    Choice.objects.bulk_create(choices, batch_size=batch_size)
+    # bulk_create() sends no signals, so the search index is updated here.
+    search.get_backend().update([question.pk for question, _ in questions])
+    return len(choices)
+
+
+def _update(questions, existing, batch_size):
+    """Update the dates of existing questions and add their missing choices; return the choices made."""
+    updated = []
+    by_dates = {}
+    for question, _ in questions:
+        current = existing[question.question_text]
+        updated.append(current)
+        if (current.pub_date, current.end_date) != (question.pub_date, question.end_date):
+            by_dates.setdefault((question.pub_date, question.end_date), []).append(current.pk)
+    # One UPDATE per distinct pair of dates is much cheaper than bulk_update's CASE per row.
+    now = timezone.now()
+    for (pub_date, end_date), pks in by_dates.items():
+        Question.objects.filter(pk__in=pks).update(pub_date=pub_date, end_date=end_date,
+                                                   status=status_at(pub_date, end_date, now))
+    known = set(Choice.objects.filter(question__in=updated).values_list('question_id', 'choice_text'))
+    choices = [
+        Choice(question_id=existing[question.question_text].pk, choice_text=text)
+        for question, texts in questions for text in texts
+        if (existing[question.question_text].pk, text) not in known
+    ]
+    Choice.objects.bulk_create(choices, batch_size=batch_size)
+    search.get_backend().update([question.pk for question in updated])
+    pks = [question.pk for question in updated]
+
+    def invalidate():
+        # After the commit, so no reader caches the old rows under the new versions.
+        for pk in pks:
+            caching.bump_results_version(pk)
+            caching.bump_choices_version(pk)
+    transaction.on_commit(invalidate)
+    return len(choices)
+
+
+def import_questions(questions, batch_size=1000, upsert=False, dry_run=False):
+    """Insert `questions` in batches of `batch_size`, one transaction per batch.
+
+    With `upsert`, a question whose text already exists has its dates updated and
+    its missing choices added instead of being inserted again. With `dry_run`
+    nothing is written.
+    Return: the number of questions created and updated and of choices created.
+    """
+    stats = {'created': 0, 'updated': 0, 'choices': 0}
+    if upsert:
+        # The last record of a repeated question text wins, as it would across two imports.
+        questions = list({question.question_text: (question, texts) for question, texts in questions}.values())
+    for start in range(0, len(questions), batch_size):
+        batch = questions[start:start + batch_size]
+        with transaction.atomic():
+            existing = {}
+            if upsert:
+                existing = {question.question_text: question for question in Question.objects.filter(
+                    question_text__in=[question.question_text for question, _ in batch])}
+            new = [(question, texts) for question, texts in batch if question.question_text not in existing]
+            old = [(question, texts) for question, texts in batch if question.question_text in existing]
+            stats['created'] += len(new)
+            stats['updated'] += len(old)
+            if dry_run:
+                stats['choices'] += sum(len(texts) for _, texts in new)
+                continue
+            stats['choices'] += _create(new, batch_size) + (_update(old, existing, batch_size) if old else 0)
+    if not dry_run and questions:
+        transaction.on_commit(caching.bump_index_version)
+    return stats
@@ -0,0 +1,220 @@
+"""Buffered vote ingestion that writes votes in batches from a background thread."""
+import atexit
+import logging
+import queue
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+
+from . import caching, counters
+from .models import Question, Vote
+
+logger = logging.getLogger(__name__)
+
+
+class VoteWriter:
+    """Collect submitted votes in a queue and write them in batches.
+
+    Repeated votes of a user on the same question inside one batch are coalesced,
+    so only the last choice is written. A batch that fails is written again up to
+    `retries` times, waiting `retry_delay` seconds and twice as long after each
+    failure; after that its votes are dropped and counted in votes_dropped.
+    """
+
+    def __init__(self, batch_size=500, interval=0.5, retries=3, retry_delay=0.1):
+        """Set the largest batch, the longest wait in seconds before a flush and the retries of a failed batch."""
+        self.batch_size = batch_size
+        self.interval = interval
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.queue = queue.Queue()
+        self._stop_event = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'batches': 0,
+            'votes_received': 0,
+            'votes_batched': 0,
+            'votes_written': 0,
+            'votes_dropped': 0,
+            'retries': 0,
+            'failed_batches': 0,
+            'max_batch_size': 0,
+            'flush_seconds': 0.0,
+            'max_flush_seconds': 0.0,
+            'max_latency_seconds': 0.0,
+        }
+
+    def submit(self, user_id, question_id, choice_id):
+        """Queue a validated vote for the next batch."""
+        with self._stats_lock:
+            self._stats['votes_received'] += 1
+        self.queue.put((user_id, question_id, choice_id, time.monotonic()))
+
+    def start(self):
+        """Start the background writer thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='polls-vote-writer', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the writer thread and write every vote still in the queue."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+        logger.info('Vote writer stopped: %s', self.stats())
+
+    def flush(self):
+        """Write every queued vote now, in the calling thread."""
+        while True:
+            batch = self._take(block=False)
+            if not batch:
+                return
+            self._write(batch)
+
+    def stats(self):
+        """Return: the batch size and latency statistics of the writer."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        batches = stats['batches']
+        stats['avg_batch_size'] = stats['votes_batched'] / batches if batches else 0.0
+        stats['avg_flush_seconds'] = stats['flush_seconds'] / batches if batches else 0.0
+        stats['queued'] = self.queue.qsize()
+        return stats
+
+    def _run(self):
+        try:
+            while not self._stop_event.is_set():
+                batch = self._take(block=True)
+                if batch:
+                    self._write(batch)
+        finally:
+            connection.close()
+
+    def _take(self, block):
+        """Return: up to batch_size queued votes, waiting at most interval seconds for them."""
+        batch = []
+        deadline = time.monotonic() + self.interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                if block and timeout > 0:
+                    batch.append(self.queue.get(timeout=timeout))
+                else:
+                    batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        """Write one batch of votes, retrying it when it fails, and drop it when the retries run out.
+
+        The batch is retried in place rather than queued again, so a later vote
+        of the same user is never overwritten by this older one.
+        """
+        delay = self.retry_delay
+        for attempt in range(self.retries + 1):
+            try:
+                self._write_batch(batch)
+                return
+            except Exception:
+                if attempt == self.retries:
+                    logger.exception('Vote writer dropped a batch of %d votes after %d attempts',
+                                     len(batch), attempt + 1)
+                    with self._stats_lock:
+                        self._stats['failed_batches'] += 1
+                        self._stats['votes_dropped'] += len(batch)
+                    return
+                logger.warning('Vote writer failed to write a batch of %d votes, retrying in %.2fs',
+                               len(batch), delay, exc_info=True)
+                with self._stats_lock:
+                    self._stats['retries'] += 1
+                if not connection.in_atomic_block:
+                    close_old_connections()
+                time.sleep(delay)
+                delay *= 2
+
+    def _write_batch(self, batch):
+        """Write one batch of votes and their tallies in a single transaction.
+
+        The tallies go through counters.add_votes(), as in the vote view, so sharded
+        questions count in their shard rows and busy questions become sharded.
+        """
+        started = time.monotonic()
+        pending = {}
+        for user_id, question_id, choice_id, _ in batch:
+            pending[(user_id, question_id)] = choice_id
+        with self._flush_lock, transaction.atomic():
+            existing = {
+                (vote.user_id, vote.question_id): vote
+                for vote in Vote.objects.select_for_update().filter(
+                    user_id__in={user_id for user_id, _ in pending},
+                    question_id__in={question_id for _, question_id in pending},
+                )
+            }
+            questions = Question.objects.in_bulk({question_id for _, question_id in pending})
+            for question_id, count in Counter(question_id for _, question_id, _, _ in batch).items():
+                if question_id in questions:
+                    counters.note_vote(questions[question_id], count)
+            tallies = Counter()
+            created, changed = [], []
+            for (user_id, question_id), choice_id in pending.items():
+                vote = existing.get((user_id, question_id))
+                if vote is None:
+                    created.append(Vote(user_id=user_id, question_id=question_id, choice_id=choice_id))
+                    tallies[question_id, choice_id] += 1
+                elif vote.choice_id != choice_id:
+                    tallies[question_id, vote.choice_id] -= 1
+                    tallies[question_id, choice_id] += 1
+                    vote.choice_id = choice_id
+                    changed.append(vote)
+            Vote.objects.bulk_create(created, batch_size=self.batch_size)
+            Vote.objects.bulk_update(changed, ['choice'], batch_size=self.batch_size)
+            for (question_id, choice_id), amount in tallies.items():
+                if amount:
+                    counters.add_votes(questions[question_id], choice_id, amount)
+            for question_id in questions:
+                transaction.on_commit(lambda pk=question_id: caching.bump_results_version(pk))
+        finished = time.monotonic()
+        with self._stats_lock:
+            self._stats['batches'] += 1
+            self._stats['votes_batched'] += len(batch)
+            self._stats['votes_written'] += len(created) + len(changed)
+            self._stats['max_batch_size'] = max(self._stats['max_batch_size'], len(batch))
+            self._stats['flush_seconds'] += finished - started
+            self._stats['max_flush_seconds'] = max(self._stats['max_flush_seconds'], finished - started)
+            self._stats['max_latency_seconds'] = max(
+                self._stats['max_latency_seconds'], finished - min(item[3] for item in batch)
+            )
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    """Return: the process-wide vote writer, started on first use and drained at exit."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = VoteWriter(
+                batch_size=getattr(settings, 'POLLS_VOTE_BUFFER_SIZE', 500),
+                interval=getattr(settings, 'POLLS_VOTE_BUFFER_INTERVAL', 0.5),
+                retries=getattr(settings, 'POLLS_VOTE_BUFFER_RETRIES', 3),
+            )
+            _writer.start()
+            atexit.register(_writer.stop)
+        return _writer
+
+
+def writer_stats():
+    """Return: the statistics of the vote writer, or None when buffered voting has not started it."""
+    with _writer_lock:
+        writer = _writer
+    return writer.stats() if writer is not None else None
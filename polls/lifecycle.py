@@ -0,0 +1,172 @@
+"""Stored lifecycle status of questions, changed when they publish and close."""
+import atexit
+import datetime
+import heapq
+import logging
+import threading
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models.signals import post_save
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+from .models import STATUS_OPEN, STATUS_UPCOMING, Question, next_transition, status_at
+
+logger = logging.getLogger(__name__)
+
+# Sent with `question_ids`, `old_status` and `status` after questions change status.
+status_changed = Signal()
+
+
+def apply_transitions(now=None, question_ids=None):
+    """Store the status at `now` of the questions whose stored status is stale.
+
+    Only the questions in `question_ids` are checked when it is given.
+    status_changed is sent once per kind of transition after the transaction commits.
+    Return: the number of questions changed.
+    """
+    if now is None:
+        now = timezone.now()
+    stale = Question.objects.stale_status(now)
+    if question_ids is not None:
+        stale = stale.filter(pk__in=question_ids)
+    changes = {}
+    with transaction.atomic():
+        for pk, old_status, pub_date, end_date in stale.select_for_update().values_list(
+                'pk', 'status', 'pub_date', 'end_date'):
+            changes.setdefault((old_status, status_at(pub_date, end_date, now)), []).append(pk)
+        for (old_status, new_status), pks in changes.items():
+            Question.objects.filter(pk__in=pks, status=old_status).update(status=new_status)
+            transaction.on_commit(lambda pks=pks, old_status=old_status, new_status=new_status: status_changed.send(
+                sender=Question, question_ids=pks, old_status=old_status, status=new_status))
+    changed = sum(len(pks) for pks in changes.values())
+    if changed:
+        logger.info('Changed the status of %d questions', changed)
+    return changed
+
+
+class LifecycleScheduler:
+    """Apply status transitions when they are due, from a min-heap of (due time, question id).
+
+    The heap only holds the transitions due in the next `horizon` seconds and is
+    reloaded from the database when that window ends, so questions written in bulk
+    are picked up too. Saved questions are scheduled right away.
+    """
+
+    def __init__(self, horizon=300):
+        """Set the seconds of transitions loaded in the heap at a time."""
+        self.horizon = horizon
+        self._heap = []
+        self._loaded_until = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def schedule(self, question):
+        """Add the next transition of a saved question if it is due inside the loaded window."""
+        due = next_transition(question.status, question.pub_date, question.end_date)
+        with self._lock:
+            if due is None or self._loaded_until is None or due >= self._loaded_until:
+                return
+            heapq.heappush(self._heap, (due, question.pk))
+        self._wakeup.set()
+
+    def load(self, now):
+        """Fill the heap with every transition due before `now` plus the horizon."""
+        until = now + datetime.timedelta(seconds=self.horizon)
+        rows = Question.objects.filter(
+            Q(status=STATUS_UPCOMING, pub_date__lt=until) | Q(status=STATUS_OPEN, end_date__lt=until)
+        ).values_list('pk', 'status', 'pub_date', 'end_date')
+        heap = [(next_transition(status, pub_date, end_date), pk) for pk, status, pub_date, end_date in rows]
+        heapq.heapify(heap)
+        with self._lock:
+            self._heap = heap
+            self._loaded_until = until
+
+    def next_due(self):
+        """Return: the time of the earliest transition in the heap or the end of the window, or None."""
+        with self._lock:
+            if self._heap:
+                return min(self._heap[0][0], self._loaded_until)
+            return self._loaded_until
+
+    def run_pending(self, now=None):
+        """Apply the transitions due at `now`, reloading the heap when its window has passed.
+
+        Return: the number of questions changed.
+        """
+        if now is None:
+            now = timezone.now()
+        if self._loaded_until is None or now >= self._loaded_until:
+            # Catch up on anything missed while the heap was empty or the process was down.
+            changed = apply_transitions(now)
+            self.load(now)
+            return changed
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                due.append(heapq.heappop(self._heap)[1])
+        if not due:
+            return 0
+        changed = apply_transitions(now, due)
+        # Questions that just opened now wait for their close.
+        for question in Question.objects.filter(pk__in=due, status=STATUS_OPEN).only(
+                'pk', 'status', 'pub_date', 'end_date'):
+            self.schedule(question)
+        return changed
+
+    def run_forever(self):
+        """Apply transitions as they fall due until stop() is called."""
+        try:
+            while not self._stop_event.is_set():
+                self._wakeup.clear()
+                try:
+                    self.run_pending()
+                except Exception:
+                    logger.exception('Lifecycle scheduler failed to apply status transitions')
+                next_due = self.next_due()
+                timeout = self.horizon
+                if next_due is not None:
+                    timeout = max(0.0, (next_due - timezone.now()).total_seconds())
+                self._wakeup.wait(timeout)
+        finally:
+            connection.close()
+
+    def start(self):
+        """Start the scheduler in a background thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run_forever, name='polls-lifecycle', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the scheduler thread."""
+        self._stop_event.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """Return: the process-wide lifecycle scheduler, started on first use and stopped at exit."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = LifecycleScheduler(horizon=getattr(settings, 'POLLS_LIFECYCLE_HORIZON', 300))
+            _scheduler.start()
+            atexit.register(_scheduler.stop)
+        return _scheduler
+
+
+@receiver(post_save, sender=Question)
+def schedule_saved_question(instance, **kwargs):
+    """Schedule the next transition of a saved question on the running scheduler."""
+    if _scheduler is not None:
+        _scheduler.schedule(instance)
@@ -0,0 +1,138 @@
+"""Non-blocking log handling: a queue handler drained by a listener thread, and a JSON formatter."""
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import threading
+import time
+import uuid
+
+# The id and start time of the request handled by the current thread or task.
+_request = contextvars.ContextVar('polls_request', default=None)
+
+
+def start_request(request_id=None):
+    """Mark the start of a request for the log records; return: a token for end_request()."""
+    return _request.set((request_id or uuid.uuid4().hex, time.perf_counter()))
+
+
+def end_request(token):
+    """Forget the request started with `token`."""
+    _request.reset(token)
+
+
+def current_request_id():
+    """Return: the id of the current request, or None outside a request."""
+    current = _request.get()
+    return current[0] if current else None
+
+
+class RequestContextFilter(logging.Filter):
+    """Add `request_id` and `latency_ms`, the time since the request started, to every record.
+
+    Fields already set in the request thread are kept when the record reaches the listener thread.
+    """
+
+    def filter(self, record):
+        """Return: True, after setting the request fields of `record`."""
+        if hasattr(record, 'request_id'):
+            return True
+        current = _request.get()
+        if current is None:
+            record.request_id, record.latency_ms = None, None
+        else:
+            record.request_id = current[0]
+            record.latency_ms = round((time.perf_counter() - current[1]) * 1000, 3)
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Format a record as one JSON object per line."""
+
+    FIELDS = ('request_id', 'latency_ms')
+
+    def format(self, record):
+        """Return: the time, level, logger, message, request fields and exception of `record` as JSON."""
+        data = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for field in self.FIELDS:
+            data[field] = getattr(record, field, None)
+        if record.exc_info:
+            data['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data['exception'] = record.exc_text
+        return json.dumps(data, default=str)
+
+
+class BackgroundQueueHandler(logging.handlers.QueueHandler):
+    """Put records on a bounded queue that a QueueListener thread writes to `handlers`.
+
+    `handlers` are handlers or names of handlers in the logging configuration. A name
+    is resolved as soon as its handler exists, because the configuration holds only a weak
+    reference to a handler that no logger uses; the names still unknown are looked up on
+    the first record. A request thread never waits for the stream: when the queue is full
+    the record is dropped and counted.
+    """
+
+    def __init__(self, handlers=(), queue_size=10000):
+        """Set the handlers that write the records and the size of the queue."""
+        super().__init__(queue.Queue(queue_size))
+        # logging._handlers maps the names of the configured handlers to the handlers.
+        self.targets = [logging._handlers.get(handler, handler) if isinstance(handler, str) else handler
+                        for handler in handlers]
+        self.listener = None
+        self.dropped = 0
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        """Start the listener thread on the named handlers."""
+        with self._start_lock:
+            if self.listener is not None:
+                return
+            handlers = [logging._handlers[handler] if isinstance(handler, str) else handler
+                        for handler in self.targets]
+            self.listener = logging.handlers.QueueListener(self.queue, *handlers, respect_handler_level=True)
+            self.listener.start()
+            atexit.register(self.stop)
+
+    def stop(self):
+        """Write the queued records and stop the listener thread."""
+        with self._start_lock:
+            if self.listener is not None:
+                self.listener.stop()
+                self.listener = None
+
+    def prepare(self, record):
+        """Return: a copy of `record` with its message and exception formatted as text.
+
+        The traceback can not cross to the listener thread, so it travels as
+        `exc_text`, which the formatters of the target handlers write out.
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        """Queue `record`, or drop it when the queue is full."""
+        if self.listener is None:
+            self.start()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        """Stop the listener before closing."""
+        self.stop()
+        super().close()
@@ -0,0 +1,36 @@
+"""Management command to compare single and sharded vote counters on one hot question."""
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from polls.benchmark.counters import compare_counter_modes
+
+
+class Command(BaseCommand):
+    """Report vote statistics on one question with single and sharded counters as JSON."""
+
+    help = 'Benchmark many concurrent voters on one seeded question with single and sharded vote counters.'
+
+    def add_arguments(self, parser):
+        """Add the load options."""
+        parser.add_argument('--writers', type=int, default=16, help='Concurrent voting clients.')
+        parser.add_argument('--requests', type=int, default=400, help='Votes per mode.')
+        parser.add_argument('--shards', type=int, default=8, help='Counter rows per choice in sharded mode.')
+        parser.add_argument('--seed', type=int, default=None, help='Random seed for the request mix.')
+
+    def handle(self, *args, **options):
+        """Run both modes and write the report."""
+        try:
+            modes = compare_counter_modes(options['writers'], options['requests'], options['shards'],
+                                          options['seed'])
+        except ValueError as error:
+            raise CommandError(error)
+        report = {
+            'timestamp': timezone.now().isoformat(),
+            'writers': options['writers'],
+            'requests': options['requests'],
+            'shards': options['shards'],
+            'modes': modes,
+        }
+        self.stdout.write(json.dumps(report, indent=2))
@@ -0,0 +1,37 @@
+"""Management command to compare vote latency with synchronous and queued logging."""
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from polls.benchmark.logs import compare_handlers
+
+
+class Command(BaseCommand):
+    """Report vote statistics with a synchronous and a queued log handler as JSON."""
+
+    help = 'Benchmark concurrent votes while the polls logger writes to a slow stream, with and without the queue.'
+
+    def add_arguments(self, parser):
+        """Add the load options."""
+        parser.add_argument('--writers', type=int, default=8, help='Concurrent voting clients.')
+        parser.add_argument('--requests', type=int, default=200, help='Votes per handler.')
+        parser.add_argument('--write-delay-ms', type=float, default=2.0,
+                            help='Milliseconds the log stream takes for each record.')
+        parser.add_argument('--seed', type=int, default=None, help='Random seed for the request mix.')
+
+    def handle(self, *args, **options):
+        """Run both handlers and write the report."""
+        try:
+            handlers = compare_handlers(options['writers'], options['requests'], options['write_delay_ms'],
+                                        options['seed'])
+        except ValueError as error:
+            raise CommandError(error)
+        report = {
+            'timestamp': timezone.now().isoformat(),
+            'writers': options['writers'],
+            'requests': options['requests'],
+            'write_delay_ms': options['write_delay_ms'],
+            'handlers': handlers,
+        }
+        self.stdout.write(json.dumps(report, indent=2))
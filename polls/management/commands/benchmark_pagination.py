@@ -0,0 +1,36 @@
+"""Management command to compare keyset and offset pagination of the question listing."""
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from polls.benchmark.pagination import measure_depths
+from polls.models import Question
+
+
+class Command(BaseCommand):
+    """Report the page fetch time at several depths as JSON."""
+
+    help = 'Time one page of the question listing at increasing depths with a keyset cursor and with OFFSET.'
+
+    def add_arguments(self, parser):
+        """Add the depth and page options."""
+        parser.add_argument('--depths', type=int, nargs='+', default=[0, 1000, 10000, 100000, 500000],
+                            help='Questions before the page.')
+        parser.add_argument('--size', type=int, default=20, help='Questions per page.')
+        parser.add_argument('--status', default='', choices=['', 'upcoming', 'open', 'closed'],
+                            help='List only the questions with this status.')
+        parser.add_argument('--repeat', type=int, default=5, help='Fetches per measurement; the median is kept.')
+
+    def handle(self, *args, **options):
+        """Measure every depth and write the report."""
+        if not Question.objects.exists():
+            raise CommandError('There are no questions; run seed_polls first.')
+        report = {
+            'timestamp': timezone.now().isoformat(),
+            'questions': Question.objects.count(),
+            'size': options['size'],
+            'status': options['status'] or 'published',
+            'pages': measure_depths(options['depths'], options['size'], options['status'], options['repeat']),
+        }
+        self.stdout.write(json.dumps(report, indent=2))
@@ -0,0 +1,53 @@
+"""Management command to load test the poll endpoints."""
+import json
+import platform
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from polls.benchmark.runner import ENDPOINTS, BenchmarkRunner
+
+
+class Command(BaseCommand):
+    """Report latency percentiles, throughput and query counts per endpoint as JSON."""
+
+    help = 'Benchmark the polls index, detail, results and vote endpoints on the seeded dataset.'
+
+    def add_arguments(self, parser):
+        """Add the load options."""
+        parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint.')
+        parser.add_argument('--concurrency', type=int, default=1, help='Concurrent clients.')
+        parser.add_argument('--endpoint', choices=ENDPOINTS, action='append', dest='endpoints',
+                            help='Endpoint to benchmark, may be repeated. Default: all.')
+        parser.add_argument('--base-url', default=None,
+                            help='Send HTTP requests to a running server instead of the test client.')
+        parser.add_argument('--seed', type=int, default=None, help='Random seed for the request mix.')
+        parser.add_argument('--output', default=None, help='Write the JSON report to this file.')
+
+    def handle(self, *args, **options):
+        """Run the benchmark and write the report."""
+        runner = BenchmarkRunner(
+            requests=options['requests'],
+            concurrency=options['concurrency'],
+            base_url=options['base_url'],
+            seed=options['seed'],
+        )
+        try:
+            endpoints = runner.run(options['endpoints'] or ENDPOINTS)
+        except ValueError as error:
+            raise CommandError(error)
+        report = {
+            'timestamp': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'requests': options['requests'],
+            'concurrency': options['concurrency'],
+            'transport': 'http' if options['base_url'] else 'test-client',
+            'template_cache': None if options['base_url'] else settings.POLLS_TEMPLATE_CACHE,
+            'endpoints': endpoints,
+        }
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as report_file:
+                report_file.write(output + '\n')
+        self.stdout.write(output)
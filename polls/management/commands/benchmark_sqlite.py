@@ -0,0 +1,33 @@
+"""Management command to compare vote throughput before and after the SQLite tuning."""
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from polls.benchmark.sqlite import compare_profiles
+
+
+class Command(BaseCommand):
+    """Report vote statistics with the baseline and the tuned SQLite profile as JSON."""
+
+    help = 'Benchmark concurrent votes with the default and the tuned SQLite settings on the seeded dataset.'
+
+    def add_arguments(self, parser):
+        """Add the load options."""
+        parser.add_argument('--writers', type=int, default=8, help='Concurrent voting clients.')
+        parser.add_argument('--requests', type=int, default=200, help='Votes per profile.')
+        parser.add_argument('--seed', type=int, default=None, help='Random seed for the request mix.')
+
+    def handle(self, *args, **options):
+        """Run both profiles and write the report."""
+        try:
+            profiles = compare_profiles(options['writers'], options['requests'], options['seed'])
+        except ValueError as error:
+            raise CommandError(error)
+        report = {
+            'timestamp': timezone.now().isoformat(),
+            'writers': options['writers'],
+            'requests': options['requests'],
+            'profiles': profiles,
+        }
+        self.stdout.write(json.dumps(report, indent=2))
@@ -0,0 +1,33 @@
+"""Management command to report the static bytes transferred before and after the static pipeline."""
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from polls.benchmark.statics import measure_transfer
+
+
+class Command(BaseCommand):
+    """Report the bytes of each static file and of a first page view as JSON."""
+
+    help = ('Compare the bytes of the static files under their original names, uncompressed, with their '
+            'hashed, compressed and WebP versions. Run collectstatic with POLLS_STATIC_MANIFEST=1 first.')
+
+    def add_arguments(self, parser):
+        """Add the file prefix and encoding options."""
+        parser.add_argument('--prefix', default='polls/', help='Only report the static files under this path.')
+        parser.add_argument('--accept-encoding', default='br, gzip',
+                            help='Accept-Encoding of the client after the pipeline.')
+
+    def handle(self, *args, **options):
+        """Fetch the files through the static middleware and write the report."""
+        try:
+            transfer = measure_transfer(options['prefix'], options['accept_encoding'])
+        except (FileNotFoundError, KeyError) as error:
+            raise CommandError(f'{error}; run collectstatic with POLLS_STATIC_MANIFEST=1 first.')
+        report = {
+            'timestamp': timezone.now().isoformat(),
+            'accept_encoding': options['accept_encoding'],
+            **transfer,
+        }
+        self.stdout.write(json.dumps(report, indent=2))
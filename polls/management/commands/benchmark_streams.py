@@ -0,0 +1,29 @@
+"""Management command to load test the results stream with many idle subscribers."""
+import asyncio
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from polls.benchmark.streams import run_stream_load
+from polls.models import Question
+
+
+class Command(BaseCommand):
+    """Report connection time, memory and fan-out latency of the results stream as JSON."""
+
+    help = 'Connect many in-process subscribers to one results stream and measure update fan-out.'
+
+    def add_arguments(self, parser):
+        """Add the load options."""
+        parser.add_argument('--subscribers', type=int, default=2000, help='Idle stream clients.')
+        parser.add_argument('--updates', type=int, default=5, help='Results updates to fan out.')
+        parser.add_argument('--question', type=int, default=None,
+                            help='Question id to stream. Default: the first question.')
+
+    def handle(self, *args, **options):
+        """Run the load test and write the report."""
+        question_id = options['question'] or Question.objects.order_by('pk').values_list('pk', flat=True).first()
+        if question_id is None:
+            raise CommandError('There is no question to stream; run seed_polls first.')
+        report = asyncio.run(run_stream_load(question_id, options['subscribers'], options['updates']))
+        self.stdout.write(json.dumps(report, indent=2))
@@ -0,0 +1,37 @@
+"""Management command to export votes or per-choice results as CSV or NDJSON."""
+from django.core.management.base import BaseCommand, CommandError
+
+from polls.export import FORMATS, KINDS, parse_boundary, stream_export
+
+
+class Command(BaseCommand):
+    """Stream the export to a file or stdout; the rows per second are logged by polls.export."""
+
+    help = 'Export all votes or per-choice results as CSV or NDJSON with constant memory use.'
+
+    def add_arguments(self, parser):
+        """Add the kind, format and filter options."""
+        parser.add_argument('--kind', choices=KINDS, default='votes', help='Export votes or per-choice results.')
+        parser.add_argument('--format', choices=FORMATS, default='csv', dest='fmt', help='Output format.')
+        parser.add_argument('--question', type=int, action='append', dest='questions',
+                            help='Only export this question id, may be repeated.')
+        parser.add_argument('--since', default=None, help='Only questions published on or after this date.')
+        parser.add_argument('--until', default=None, help='Only questions published on or before this date.')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows read from the database at a time.')
+        parser.add_argument('--output', default=None, help='Write to this file instead of stdout.')
+
+    def handle(self, *args, **options):
+        """Write the export."""
+        try:
+            since = parse_boundary(options['since'])
+            until = parse_boundary(options['until'], end=True)
+        except ValueError as error:
+            raise CommandError(error)
+        export = stream_export(options['kind'], options['fmt'], options['questions'], since, until,
+                               options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'w', newline='') as output:
+                output.writelines(export)
+        else:
+            for line in export:
+                self.stdout.write(line, ending='')
@@ -0,0 +1,36 @@
+"""Management command to bulk import poll questions and choices."""
+from django.core.management.base import BaseCommand, CommandError
+
+from polls.importer import FORMATS, detect_format, import_questions, load_records, validate
+
+
+class Command(BaseCommand):
+    """Validate and insert questions with their choices in batched transactions."""
+
+    help = ('Import questions, choices, pub_date and end_date from CSV, JSON or YAML files. '
+            'JSON and YAML hold a list of {question_text, pub_date, end_date, choices}; CSV has those '
+            'columns with the choices separated by "|".')
+
+    def add_arguments(self, parser):
+        """Add the file, format and mode options."""
+        parser.add_argument('files', nargs='+', help='Files to import.')
+        parser.add_argument('--format', choices=FORMATS, default=None, dest='fmt',
+                            help='Format of the files. Default: from the file extension.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Questions per insert transaction.')
+        parser.add_argument('--upsert', action='store_true',
+                            help='Update questions with the same text instead of adding them again.')
+        parser.add_argument('--dry-run', action='store_true', help='Validate and count without writing.')
+
+    def handle(self, *args, **options):
+        """Import every file and report what was written."""
+        for path in options['files']:
+            try:
+                questions = validate(load_records(path, options['fmt'] or detect_format(path)))
+            except (OSError, ValueError) as error:
+                raise CommandError(f'{path}: {error}')
+            stats = import_questions(questions, options['batch_size'], options['upsert'], options['dry_run'])
+            prefix = 'Would import' if options['dry_run'] else 'Imported'
+            self.stdout.write(self.style.SUCCESS(
+                '{prefix} {path}: {created} questions created, {updated} updated, {choices} choices created.'.format(
+                    prefix=prefix, path=path, **stats)
+            ))
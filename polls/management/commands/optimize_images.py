@@ -0,0 +1,42 @@
+"""Management command to write resized and WebP variants of the static images."""
+import os
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from polls.staticfiles import image_variants, is_source_image
+
+
+class Command(BaseCommand):
+    """Write the variants next to each image, to be committed and collected with it."""
+
+    help = ('Write <name>-<width>w.jpg and .webp variants of the JPEG and PNG images in a static directory, '
+            'and a full-size .webp of the images no wider than the largest width. Needs Pillow.')
+
+    def add_arguments(self, parser):
+        """Add the directory, width and quality options."""
+        parser.add_argument('directories', nargs='*',
+                            help='Directories of images. Default: the images of the polls static files.')
+        parser.add_argument('--widths', type=int, nargs='+', default=None,
+                            help='Widths of the resized variants. Default: POLLS_IMAGE_WIDTHS.')
+        parser.add_argument('--quality', type=int, default=80, help='JPEG and WebP quality, 1-100.')
+
+    def handle(self, *args, **options):
+        """Write the variants of every source image and report the bytes of each."""
+        try:
+            import PIL  # noqa: F401
+        except ImportError:
+            raise CommandError('Optimizing images needs Pillow: pip install pillow') from None
+        directories = options['directories'] or [
+            os.path.join(apps.get_app_config('polls').path, 'static', 'polls', 'images')]
+        widths = options['widths'] or getattr(settings, 'POLLS_IMAGE_WIDTHS', [640, 1280, 1920])
+        for directory in directories:
+            for name in sorted(os.listdir(directory)):
+                if not is_source_image(name):
+                    continue
+                path = os.path.join(directory, name)
+                for variant in image_variants(path, widths, options['quality']):
+                    self.stdout.write(self.style.SUCCESS(
+                        f'{name}: {os.path.getsize(path)} bytes -> '
+                        f'{os.path.basename(variant)}: {os.path.getsize(variant)} bytes'))
@@ -0,0 +1,19 @@
+"""Management command to rebuild the full-text search index of the questions."""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from polls import search
+
+
+class Command(BaseCommand):
+    """Index the text and choices of every question again."""
+
+    help = 'Rebuild the full-text search index of question and choice text.'
+
+    def handle(self, *args, **options):
+        """Rebuild the index of the configured backend inside one transaction."""
+        backend = search.get_backend()
+        with transaction.atomic():
+            indexed = backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {indexed} questions with the {type(backend).__name__} backend.'))
@@ -0,0 +1,25 @@
+"""Management command to rebuild the denormalized vote tally of each choice."""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from polls.models import Choice
+
+
+class Command(BaseCommand):
+    """Recount Choice.vote_count from the Vote table."""
+
+    help = 'Rebuild the vote tally of every choice from the Vote table.'
+
+    def add_arguments(self, parser):
+        """Add an option to limit the rebuild to some questions."""
+        parser.add_argument('--question', type=int, nargs='*', dest='questions',
+                            help='Only rebuild the choices of these question ids.')
+
+    def handle(self, *args, **options):
+        """Recount the tallies inside one transaction."""
+        queryset = Choice.objects.all()
+        if options['questions']:
+            queryset = queryset.filter(question_id__in=options['questions'])
+        with transaction.atomic():
+            updated = Choice.rebuild_vote_counts(queryset)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt vote counts for {updated} choices.'))
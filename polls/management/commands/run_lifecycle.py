@@ -0,0 +1,30 @@
+"""Management command to change the stored status of questions when they publish and close."""
+from django.core.management.base import BaseCommand
+
+from polls.lifecycle import LifecycleScheduler, apply_transitions
+
+
+class Command(BaseCommand):
+    """Run the lifecycle scheduler in the foreground, or apply the due transitions once."""
+
+    help = 'Change the status of questions exactly at their pub_date and end_date.'
+
+    def add_arguments(self, parser):
+        """Add the options to run once and to size the scheduling window."""
+        parser.add_argument('--once', action='store_true',
+                            help='Apply the transitions that are due now and exit (for cron).')
+        parser.add_argument('--horizon', type=int, default=300,
+                            help='Seconds of upcoming transitions kept in memory at a time.')
+
+    def handle(self, *args, **options):
+        """Apply the transitions once or until interrupted."""
+        if options['once']:
+            changed = apply_transitions()
+            self.stdout.write(self.style.SUCCESS(f'Changed the status of {changed} questions.'))
+            return
+        scheduler = LifecycleScheduler(horizon=options['horizon'])
+        self.stdout.write('Applying status transitions; press Ctrl-C to stop.')
+        try:
+            scheduler.run_forever()
+        except KeyboardInterrupt:
+            scheduler.stop()
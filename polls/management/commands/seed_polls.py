@@ -0,0 +1,37 @@
+"""Management command to seed a benchmark dataset."""
+from django.core.management.base import BaseCommand
+
+from polls.benchmark.seed import clear_dataset, seed_dataset
+
+
+class Command(BaseCommand):
+    """Replace the benchmark questions, choices, users and votes."""
+
+    help = 'Seed N questions x M choices x K votes for benchmarking, replacing an earlier seed.'
+
+    def add_arguments(self, parser):
+        """Add the dataset size options."""
+        parser.add_argument('--questions', type=int, default=100, help='Number of questions.')
+        parser.add_argument('--choices', type=int, default=4, help='Choices per question.')
+        parser.add_argument('--votes', type=int, default=100, help='Votes per question.')
+        parser.add_argument('--skew', type=float, default=1.0,
+                            help='Zipf exponent of the vote distribution over choices, 0 is uniform.')
+        parser.add_argument('--open-ratio', type=float, default=0.8, help='Share of questions open for voting.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per bulk insert.')
+        parser.add_argument('--seed', type=int, default=None, help='Random seed for a repeatable dataset.')
+
+    def handle(self, *args, **options):
+        """Clear the earlier seed and create the new dataset."""
+        clear_dataset()
+        created = seed_dataset(
+            questions=options['questions'],
+            choices=options['choices'],
+            votes=options['votes'],
+            skew=options['skew'],
+            open_ratio=options['open_ratio'],
+            batch_size=options['batch_size'],
+            seed=options['seed'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            'Seeded {questions} questions, {choices} choices, {users} users and {votes} votes.'.format(**created)
+        ))
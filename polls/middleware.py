@@ -0,0 +1,98 @@
+"""Middleware that measures the time and SQL queries of every request."""
+import contextlib
+import contextvars
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connection
+
+from . import log
+from .profiling import QueryProfiler, ViewStats
+
+logger = logging.getLogger(__name__)
+
+view_stats = ViewStats(window=getattr(settings, 'POLLS_PROFILE_WINDOW', 1000))
+
+# The query profiler of the request handled by the current thread or task.
+_profiler = contextvars.ContextVar('polls_query_profiler', default=None)
+
+
+@contextlib.contextmanager
+def profiled_queries():
+    """Count the queries of the current thread's connection toward the profile of the current request."""
+    profiler = _profiler.get()
+    if profiler is None:
+        yield
+        return
+    with connection.execute_wrapper(profiler):
+        yield
+
+
+class RequestProfileMiddleware:
+    """Record the view, wall time, query count, SQL time and slowest query of each request.
+
+    The measurements go into the rolling per-view statistics, and a request over
+    the time or query threshold is logged with its slowest query. Each request
+    gets an id for its log records, taken from X-Request-ID when the client sends one.
+    Under ASGI the middleware stays async; the queries counted there are those
+    the async views run through polls.async_views.run_sync.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        """Read the thresholds from the settings."""
+        self.get_response = get_response
+        self.slow_ms = getattr(settings, 'POLLS_SLOW_REQUEST_MS', 500)
+        self.max_queries = getattr(settings, 'POLLS_SLOW_REQUEST_QUERIES', 50)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        """Measure the request while the rest of the middleware and the view run."""
+        if iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        profiler = QueryProfiler()
+        token = log.start_request(request.headers.get('X-Request-ID'))
+        profiler_token = _profiler.set(profiler)
+        started = time.perf_counter()
+        try:
+            with profiled_queries():
+                response = self.get_response(request)
+            seconds = time.perf_counter() - started
+            self.record(request, response, profiler, seconds)
+        finally:
+            _profiler.reset(profiler_token)
+            log.end_request(token)
+        return response
+
+    async def __acall__(self, request):
+        """Measure the request without leaving the event loop."""
+        profiler = QueryProfiler()
+        token = log.start_request(request.headers.get('X-Request-ID'))
+        profiler_token = _profiler.set(profiler)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+            seconds = time.perf_counter() - started
+            self.record(request, response, profiler, seconds)
+        finally:
+            _profiler.reset(profiler_token)
+            log.end_request(token)
+        return response
+
+    def record(self, request, response, profiler, seconds):
+        """Add the request to the statistics, log it if it is slow and tag the response with its id."""
+        match = request.resolver_match
+        view_name = match.view_name if match else 'unresolved'
+        view_stats.record(view_name, seconds, profiler.count, profiler.seconds)
+        if seconds * 1000 > self.slow_ms or profiler.count > self.max_queries:
+            logger.warning(
+                'Slow request %s %s (%s): %.1f ms, %d queries, %.1f ms SQL, slowest %.1f ms: %s',
+                request.method, request.path, view_name, seconds * 1000, profiler.count,
+                profiler.seconds * 1000, profiler.slowest_seconds * 1000, profiler.slowest_sql,
+            )
+        response['X-Request-ID'] = log.current_request_id()
@@ -0,0 +1,31 @@
+# Generated by Django 3.2.25 on 2026-10-18 01:29
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_existing_votes(apps, schema_editor):
+    """Fill the new vote tally from the existing Vote rows."""
+    Choice = apps.get_model('polls', 'Choice')
+    Vote = apps.get_model('polls', 'Vote')
+    counts = Vote.objects.filter(
+        choice=OuterRef('pk')
+    ).order_by().values('choice').annotate(total=Count('pk')).values('total')
+    Choice.objects.update(vote_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0005_remove_vote_question'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='choice',
+            name='vote_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='vote count'),
+        ),
+        migrations.RunPython(count_existing_votes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 3.2.25 on 2026-10-18 01:30
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0006_choice_vote_count'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='question',
+            name='end_date',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='end date'),
+        ),
+        migrations.AlterField(
+            model_name='question',
+            name='pub_date',
+            field=models.DateTimeField(db_index=True, verbose_name='date published'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['pub_date', 'end_date'], name='polls_question_pub_end_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 3.2.25 on 2026-10-18 01:55
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def store_current_status(apps, schema_editor):
+    """Fill the new status from the dates of the existing questions."""
+    Question = apps.get_model('polls', 'Question')
+    now = timezone.now()
+    Question.objects.filter(pub_date__lte=now, end_date__gte=now).update(status='open')
+    Question.objects.filter(pub_date__lte=now, end_date__lt=now).update(status='closed')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0008_vote_question'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='status',
+            field=models.CharField(choices=[('upcoming', 'Upcoming'), ('open', 'Open'), ('closed', 'Closed')], db_index=True, default='upcoming', editable=False, max_length=8, verbose_name='status'),
+        ),
+        migrations.RunPython(store_current_status, migrations.RunPython.noop),
+    ]
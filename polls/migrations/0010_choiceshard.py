@@ -0,0 +1,32 @@
+# Generated by Django 3.2.25 on 2026-10-18 02:06
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0009_question_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='sharded_votes',
+            field=models.BooleanField(default=False, help_text='Spread the vote tally of each choice over several rows, for questions with many concurrent voters.', verbose_name='shard vote counters'),
+        ),
+        migrations.CreateModel(
+            name='ChoiceShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField()),
+                ('count', models.IntegerField(default=0)),
+                ('choice', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='polls.choice')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='choiceshard',
+            constraint=models.UniqueConstraint(fields=('choice', 'shard'), name='polls_choiceshard_unique_choice_shard'),
+        ),
+    ]
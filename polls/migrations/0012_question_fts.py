@@ -0,0 +1,38 @@
+from django.db import migrations
+from django.db.utils import OperationalError
+
+
+def create_fts_table(apps, schema_editor):
+    """Create and fill the FTS5 table of question and choice text, on SQLite builds with FTS5."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        try:
+            cursor.execute('CREATE VIRTUAL TABLE polls_question_fts USING fts5(question_text, choice_text)')
+        except OperationalError:
+            # SQLite without FTS5: polls.search falls back to its in-process index.
+            return
+        cursor.execute(
+            'INSERT INTO polls_question_fts (rowid, question_text, choice_text) '
+            "SELECT question.id, question.question_text, COALESCE(GROUP_CONCAT(choice.choice_text, ' '), '') "
+            'FROM polls_question AS question LEFT JOIN polls_choice AS choice ON choice.question_id = question.id '
+            'GROUP BY question.id'
+        )
+
+
+def drop_fts_table(apps, schema_editor):
+    """Drop the FTS5 table."""
+    if schema_editor.connection.vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute('DROP TABLE IF EXISTS polls_question_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0011_question_keyset_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.25 on 2026-10-18 02:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polls', '0012_question_fts'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['question_text'], name='polls_question_text_idx'),
+        ),
+    ]
@@ -1,23 +1,174 @@
 """Question modeling management system."""
 
 import datetime
+import random
 from django.db import models
+from django.db.models import BooleanField, CharField, Case, Count, F, Min, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.conf import settings
 from django.utils import timezone
 from django.contrib import admin
 from django.contrib.auth.models import User
 
 
+STATUS_UPCOMING = 'upcoming'
+STATUS_OPEN = 'open'
+STATUS_CLOSED = 'closed'
+STATUS_CHOICES = [
+    (STATUS_UPCOMING, 'Upcoming'),
+    (STATUS_OPEN, 'Open'),
+    (STATUS_CLOSED, 'Closed'),
+]
+
+
+def status_at(pub_date, end_date, now):
+    """Return: the status at `now` of a question published at `pub_date` and closing after `end_date`."""
+    if now < pub_date:
+        return STATUS_UPCOMING
+    if now > end_date:
+        return STATUS_CLOSED
+    return STATUS_OPEN
+
+
+def next_transition(status, pub_date, end_date):
+    """Return: the first time a question with `status` changes to its next status, or None once closed."""
+    if status == STATUS_UPCOMING:
+        return pub_date
+    if status == STATUS_OPEN:
+        return end_date + datetime.timedelta(microseconds=1)
+    return None
+
+
+def shard_votes(choice='pk'):
+    """Return: the sum of the vote shards of the choice at `choice` of the outer query, 0 without shards."""
+    totals = ChoiceShard.objects.filter(
+        choice=OuterRef(choice)
+    ).order_by().values('choice').annotate(total=Sum('count')).values('total')
+    return Coalesce(Subquery(totals), 0)
+
+
+def tally_results(choices):
+    """Return: the total votes of `choices` and each choice with its percentage of the total."""
+    choices = list(choices)
+    total_votes = sum(choice['votes'] for choice in choices)
+    for choice in choices:
+        choice['percent'] = round(100 * choice['votes'] / total_votes, 1) if total_votes else 0.0
+    return {'total_votes': total_votes, 'choices': choices}
+
+
+class QuestionQuerySet(models.QuerySet):
+    """Queries on questions that take the current time as one value."""
+
+    def published(self, now):
+        """Return: questions published on or before `now`."""
+        return self.filter(pub_date__lte=now)
+
+    def with_is_open(self, now):
+        """Return: questions annotated with `is_open`, the SQL version of can_vote() at `now`."""
+        return self.annotate(is_open=Case(
+            When(pub_date__lte=now, end_date__gte=now, then=Value(True)),
+            default=Value(False),
+            output_field=BooleanField(),
+        ))
+
+    def with_status(self, now):
+        """Return: questions annotated with `current_status`, the status computed from the dates at `now`."""
+        return self.annotate(current_status=Case(
+            When(pub_date__gt=now, then=Value(STATUS_UPCOMING)),
+            When(end_date__lt=now, then=Value(STATUS_CLOSED)),
+            default=Value(STATUS_OPEN),
+            output_field=CharField(),
+        ))
+
+    def filter_status(self, status, now):
+        """Return: questions with `status` at `now`, filtered on the indexed dates."""
+        if status == STATUS_UPCOMING:
+            return self.filter(pub_date__gt=now)
+        if status == STATUS_CLOSED:
+            return self.filter(pub_date__lte=now, end_date__lt=now)
+        return self.filter(pub_date__lte=now, end_date__gte=now)
+
+    def stale_status(self, now):
+        """Return: questions whose stored status differs from the status of their dates at `now`."""
+        return self.exclude(status=STATUS_CLOSED).filter(
+            Q(status=STATUS_UPCOMING, pub_date__lte=now) | Q(end_date__lt=now)
+        )
+
+    def with_total_votes(self):
+        """Return: questions annotated with `total_votes`, the sum of their choice tallies and vote shards."""
+        totals = Choice.objects.filter(
+            question=OuterRef('pk')
+        ).order_by().values('question').annotate(total=Sum('vote_count')).values('total')
+        shards = ChoiceShard.objects.filter(
+            choice__question=OuterRef('pk')
+        ).order_by().values('choice__question').annotate(total=Sum('count')).values('total')
+        return self.annotate(total_votes=Coalesce(Subquery(totals), 0) + Coalesce(Subquery(shards), 0))
+
+    def next_status_change(self, now):
+        """Return: the earliest time after `now` that a question publishes or closes, or None."""
+        dates = self.aggregate(
+            next_pub=Min('pub_date', filter=Q(pub_date__gt=now)),
+            next_end=Min('end_date', filter=Q(end_date__gte=now)),
+        )
+        return min((date for date in dates.values() if date is not None), default=None)
+
+    def results_for(self, question_ids):
+        """Return: the results of each existing question in `question_ids`, by id, in one query."""
+        choices = {}
+        rows = self.filter(pk__in=question_ids).order_by('pk', 'choice__id').values_list(
+            'pk', 'choice__id', 'choice__choice_text', F('choice__vote_count') + shard_votes('choice__id'))
+        for question_id, choice_id, choice_text, votes in rows:
+            question_choices = choices.setdefault(question_id, [])
+            if choice_id is not None:
+                question_choices.append({'id': choice_id, 'choice_text': choice_text, 'votes': votes})
+        return {question_id: tally_results(rows) for question_id, rows in choices.items()}
+
+
 class Question(models.Model):
     """A Question model that has a question, publication date, and end date."""
 
     question_text = models.CharField(max_length=200)
-    pub_date = models.DateTimeField('date published')
-    end_date = models.DateTimeField('end date', default=timezone.now)
+    pub_date = models.DateTimeField('date published', db_index=True)
+    end_date = models.DateTimeField('end date', default=timezone.now, db_index=True)
+    status = models.CharField('status', max_length=8, choices=STATUS_CHOICES, default=STATUS_UPCOMING,
+                              db_index=True, editable=False)
+    sharded_votes = models.BooleanField(
+        'shard vote counters', default=False,
+        help_text='Spread the vote tally of each choice over several rows, for questions with many concurrent voters.')
+
+    objects = QuestionQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['pub_date', 'end_date'], name='polls_question_pub_end_idx'),
+            # Keyset pagination seeks on (pub_date, id), newest first.
+            models.Index(fields=['pub_date', 'id'], name='polls_question_pub_id_idx'),
+            # import_polls --upsert finds the existing questions by their text.
+            models.Index(fields=['question_text'], name='polls_question_text_idx'),
+        ]
 
     def __str__(self):
         """Return: Display the text of questions."""
         return self.question_text
 
+    def save(self, *args, **kwargs):
+        """Store the status of the dates before saving."""
+        self.status = status_at(self.pub_date, self.end_date, timezone.now())
+        super().save(*args, **kwargs)
+
+    def get_status(self, now=None):
+        """Return: the stored status, or the status of the dates once its next transition is due.
+
+        The stored status is kept up to date by the lifecycle scheduler; the dates
+        are the fallback when the scheduler has not applied a transition yet.
+        """
+        if now is None:
+            now = timezone.now()
+        transition = next_transition(self.status, self.pub_date, self.end_date)
+        if transition is not None and now >= transition:
+            return status_at(self.pub_date, self.end_date, now)
+        return self.status
+
     @admin.display(
         boolean=True,
         ordering='pub_date',
@@ -26,7 +177,7 @@ class Question(models.Model):
     def was_published_recently(self):
         """Return: True if the question is published within 1 day."""
         now = timezone.now()
-        return now - datetime.timedelta(days=1) <= self.pub_date <= now
+        return self.get_status(now) != STATUS_UPCOMING and now - datetime.timedelta(days=1) <= self.pub_date
 
     @admin.display(
         boolean=True,
@@ -35,7 +186,7 @@ class Question(models.Model):
     )
     def is_published(self):
         """Return: True if the current time is on or after questions publication time."""
-        return timezone.now() >= self.pub_date
+        return self.get_status() != STATUS_UPCOMING
 
     @admin.display(
         boolean=True,
@@ -44,17 +195,36 @@ class Question(models.Model):
     )
     def can_vote(self):
         """Return: True if the voting is currently in equal or after pub_date and not over end_date."""
-        return self.pub_date <= timezone.now() <= self.end_date
+        return self.get_status() == STATUS_OPEN
+
+    def vote_shards(self):
+        """Return: the number of counter rows per choice when the tallies are sharded, else None."""
+        if self.sharded_votes:
+            return getattr(settings, 'POLLS_VOTE_SHARDS', 8)
+        return None
+
+    def get_results(self):
+        """Return: the vote totals of this question as plain data in one query.
+
+        The result has the total number of votes and, for every choice,
+        its id, text, number of votes and percentage of the total.
+        """
+        return tally_results(
+            self.choice_set.order_by('id').values('id', 'choice_text', votes=F('vote_count') + shard_votes())
+        )
 
 
 class Choice(models.Model):
     """Choice model has two fields: the text of choice and a vote tally.
 
     Each Choice is related to the question.
+    The vote tally is a denormalized counter of the Vote rows for the choice;
+    on a question with sharded_votes part of it is spread over ChoiceShard rows.
     """
 
     question = models.ForeignKey(Question, on_delete=models.CASCADE)
     choice_text = models.CharField(max_length=200)
+    vote_count = models.PositiveIntegerField('vote count', default=0, editable=False)
 
     def __str__(self):
         """Return: Display choice text of each choice."""
@@ -62,15 +232,89 @@ class Choice(models.Model):
 
     @property
     def votes(self):
-        """Return sum of the vote for a choice."""
-        return Vote.objects.filter(choice=self).count()
+        """Return sum of the vote for a choice.
+
+        The shard rows are summed in Python when they were prefetched.
+        """
+        if 'choiceshard_set' in getattr(self, '_prefetched_objects_cache', {}):
+            return self.vote_count + sum(shard.count for shard in self.choiceshard_set.all())
+        return self.vote_count + (self.choiceshard_set.aggregate(total=Sum('count'))['total'] or 0)
+
+    @classmethod
+    def add_vote(cls, choice_id, amount=1, shards=None):
+        """Atomically add `amount` votes to the tally of a choice in the database.
+
+        With `shards`, the votes go to one of that many shard rows, picked at random,
+        so concurrent voters rarely wait on the same row.
+        """
+        if not shards:
+            cls.objects.filter(pk=choice_id).update(vote_count=F('vote_count') + amount)
+            return
+        shard = random.randrange(shards)
+        if not ChoiceShard.objects.filter(choice_id=choice_id, shard=shard).update(count=F('count') + amount):
+            ChoiceShard.objects.bulk_create([ChoiceShard(choice_id=choice_id, shard=shard)], ignore_conflicts=True)
+            ChoiceShard.objects.filter(choice_id=choice_id, shard=shard).update(count=F('count') + amount)
+
+    @classmethod
+    def fold_shards(cls, queryset=None):
+        """Move the votes of the shard rows of the choices in `queryset` into their tallies.
+
+        Return: the number of choices updated.
+        """
+        if queryset is None:
+            queryset = cls.objects.all()
+        shards = ChoiceShard.objects.filter(choice__in=queryset)
+        updated = cls.objects.filter(pk__in=shards.values('choice')).update(
+            vote_count=F('vote_count') + shard_votes())
+        ChoiceShard.objects.filter(choice__in=queryset).delete()
+        return updated
+
+    @classmethod
+    def rebuild_vote_counts(cls, queryset=None):
+        """Recount the tally of every choice in `queryset` from the Vote table, dropping its shard rows.
+
+        Return: the number of choices updated.
+        """
+        if queryset is None:
+            queryset = cls.objects.all()
+        ChoiceShard.objects.filter(choice__in=queryset).delete()
+        counts = Vote.objects.filter(
+            choice=OuterRef('pk')
+        ).order_by().values('choice').annotate(total=Count('pk')).values('total')
+        return queryset.update(vote_count=Coalesce(Subquery(counts), 0))
+
+
+class ChoiceShard(models.Model):
+    """One of the counter rows that share the vote tally of a choice on a question with sharded_votes."""
+
+    choice = models.ForeignKey(Choice, on_delete=models.CASCADE)
+    shard = models.PositiveSmallIntegerField()
+    # Can go below zero: a changed vote is taken back from any shard.
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['choice', 'shard'], name='polls_choiceshard_unique_choice_shard'),
+        ]
 
 
 class Vote(models.Model):
+    """A vote of a user for one choice of a question.
+
+    The question is stored with the vote so each user has at most one vote per question.
+    """
+
     choice = models.ForeignKey(Choice, on_delete=models.CASCADE)
+    question = models.ForeignKey(Question, on_delete=models.CASCADE)
     user = models.ForeignKey(User, on_delete=models.CASCADE, blank=True, null=True)
 
-    @property
-    def question(self):
-        """Get the question that this vote applies to."""
-        return self.choice.question
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'question'], name='polls_vote_unique_user_question'),
+        ]
+
+    def save(self, *args, **kwargs):
+        """Fill in the question of the choice before saving."""
+        if self.question_id is None:
+            self.question_id = self.choice.question_id
+        super().save(*args, **kwargs)
@@ -0,0 +1,87 @@
+"""Keyset (seek) pagination of questions on (pub_date, id), newest first, with opaque cursors."""
+import base64
+import datetime
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+
+def encode_cursor(question):
+    """Return: an opaque cursor that starts a page right after `question`."""
+    key = f'{question.pub_date.isoformat()}|{question.pk}'
+    return base64.urlsafe_b64encode(key.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return: the (pub_date, id) key of a cursor.
+
+    Raise: ValueError if the cursor was not made by encode_cursor().
+    """
+    try:
+        key = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        pub_date, pk = key.split('|')
+        pub_date, pk = datetime.datetime.fromisoformat(pub_date), int(pk)
+    except (ValueError, UnicodeDecodeError) as error:
+        raise ValueError(f'Invalid cursor {cursor!r}.') from error
+    if timezone.is_aware(pub_date) != settings.USE_TZ:
+        raise ValueError(f'Invalid cursor {cursor!r}.')
+    return pub_date, pk
+
+
+class KeysetPage:
+    """One page of a question queryset ordered newest first, read only when it is first used.
+
+    A page after a cursor is read with two index seeks: the questions sharing the
+    cursor's pub_date with a smaller id, then the older questions. Neither depends
+    on the depth of the page, even when many questions share one pub_date.
+    """
+
+    def __init__(self, queryset, cursor=None, size=5, until=None):
+        """Set the queryset, the cursor of the page (None for the first page) and the page size.
+
+        `until` is the newest pub_date listed. It is passed apart from the queryset
+        because the database seeks on one upper bound of pub_date: the cursor's, or
+        else this one.
+        """
+        self.key = decode_cursor(cursor) if cursor else None
+        if until is not None and (self.key is None or until < self.key[0]):
+            queryset = queryset.filter(pub_date__lte=until)
+        self.queryset = queryset.order_by('-pub_date', '-pk')
+        self.cursor = cursor
+        self.size = size
+
+    @cached_property
+    def _rows(self):
+        # One extra row tells whether there is a next page.
+        if self.key is None:
+            return list(self.queryset[:self.size + 1])
+        pub_date, pk = self.key
+        rows = list(self.queryset.filter(pub_date=pub_date, pk__lt=pk)[:self.size + 1])
+        if len(rows) <= self.size:
+            rows += self.queryset.filter(pub_date__lt=pub_date)[:self.size + 1 - len(rows)]
+        return rows
+
+    @property
+    def object_list(self):
+        """Return: the questions of the page."""
+        return self._rows[:self.size]
+
+    @property
+    def next_cursor(self):
+        """Return: the cursor of the next page, or None on the last page."""
+        if len(self._rows) > self.size:
+            return encode_cursor(self._rows[self.size - 1])
+        return None
+
+    def __iter__(self):
+        """Iterate over the questions of the page."""
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        """Return: the question or slice of questions at `index` on the page."""
+        return self.object_list[index]
+
+    def __len__(self):
+        """Return: the number of questions on the page."""
+        return len(self.object_list)
@@ -0,0 +1,144 @@
+"""Query and timing measurements shared by the request middleware and the benchmarks."""
+import threading
+import time
+from collections import deque
+
+# Upper bounds in milliseconds of the request time histogram buckets.
+HISTOGRAM_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+def percentile(values, pct):
+    """Return: the nearest-rank `pct` percentile of `values`, or None if there are none."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+class QueryProfiler:
+    """Database execute wrapper that counts and times the SQL queries it runs."""
+
+    def __init__(self):
+        """Start with no queries."""
+        self.reset()
+
+    def reset(self):
+        """Forget the queries measured so far."""
+        self.count = 0
+        self.seconds = 0.0
+        self.slowest_seconds = 0.0
+        self.slowest_sql = None
+
+    def __call__(self, execute, sql, params, many, context):
+        """Run one query and record its time."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.seconds += elapsed
+            if elapsed >= self.slowest_seconds:
+                self.slowest_seconds = elapsed
+                self.slowest_sql = sql
+
+
+class TemplateProfiler:
+    """Time the template loading and rendering done by each thread while it is installed.
+
+    The Django template backend is wrapped, so a template is timed once however
+    many templates it includes or extends, and loading counts along with
+    rendering, which shows the parsing that the cached loader saves.
+    """
+
+    def __init__(self):
+        """Start with no time measured in any thread."""
+        self._local = threading.local()
+        self._originals = None
+
+    @property
+    def seconds(self):
+        """Return: the seconds this thread spent loading and rendering templates since the last reset()."""
+        return getattr(self._local, 'seconds', 0.0)
+
+    def reset(self):
+        """Forget the time measured by this thread."""
+        self._local.seconds = 0.0
+
+    def _timed(self, method):
+        profiler = self
+
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                profiler._local.seconds = profiler.seconds + time.perf_counter() - started
+        return timed
+
+    def __enter__(self):
+        """Wrap the template loading and rendering of the Django backend."""
+        from django.template.backends import django as backend
+        self._originals = (backend.DjangoTemplates.get_template, backend.Template.render)
+        backend.DjangoTemplates.get_template = self._timed(self._originals[0])
+        backend.Template.render = self._timed(self._originals[1])
+        return self
+
+    def __exit__(self, *exc_info):
+        """Put the original methods back."""
+        from django.template.backends import django as backend
+        backend.DjangoTemplates.get_template, backend.Template.render = self._originals
+
+
+class ViewStats:
+    """Rolling per-view samples of request time, query count and SQL time."""
+
+    def __init__(self, window=1000):
+        """Keep the last `window` requests of each view."""
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples = {}
+        self._totals = {}
+
+    def record(self, view_name, seconds, queries, sql_seconds):
+        """Add the measurements of one request to `view_name`."""
+        with self._lock:
+            samples = self._samples.get(view_name)
+            if samples is None:
+                samples = self._samples[view_name] = deque(maxlen=self.window)
+            samples.append((seconds * 1000, queries, sql_seconds * 1000))
+            self._totals[view_name] = self._totals.get(view_name, 0) + 1
+
+    def clear(self):
+        """Forget every sample."""
+        with self._lock:
+            self._samples.clear()
+            self._totals.clear()
+
+    def snapshot(self):
+        """Return: JSON-ready statistics and a time histogram for each view."""
+        with self._lock:
+            samples = {name: list(rows) for name, rows in self._samples.items()}
+            totals = dict(self._totals)
+        report = {}
+        for name, rows in sorted(samples.items()):
+            times = [row[0] for row in rows]
+            queries = [row[1] for row in rows]
+            histogram = dict.fromkeys([f'le_{bound}ms' for bound in HISTOGRAM_BUCKETS] + ['gt_max'], 0)
+            for ms in times:
+                bucket = next((f'le_{bound}ms' for bound in HISTOGRAM_BUCKETS if ms <= bound), 'gt_max')
+                histogram[bucket] += 1
+            report[name] = {
+                'requests': totals[name],
+                'window': len(rows),
+                'p50_ms': round(percentile(times, 50), 3),
+                'p95_ms': round(percentile(times, 95), 3),
+                'p99_ms': round(percentile(times, 99), 3),
+                'max_ms': round(max(times), 3),
+                'mean_queries': round(sum(queries) / len(queries), 2),
+                'max_queries': max(queries),
+                'mean_sql_ms': round(sum(row[2] for row in rows) / len(rows), 3),
+                'histogram': histogram,
+            }
+        return report
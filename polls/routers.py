@@ -0,0 +1,108 @@
+"""Database routing of the read-heavy poll pages to read replicas."""
+import contextlib
+import contextvars
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+PIN_SESSION_KEY = 'polls_primary_until'
+
+_use_replica = contextvars.ContextVar('polls_use_replica', default=False)
+
+
+def pin_to_primary(request):
+    """Send the reads of this user to the primary for the read-your-writes window."""
+    request.session[PIN_SESSION_KEY] = time.time() + getattr(settings, 'POLLS_READ_YOUR_WRITES_SECONDS', 10)
+
+
+def is_pinned(request):
+    """Return: True if the user wrote recently and must read from the primary."""
+    session = getattr(request, 'session', None)
+    if session is None:
+        return False
+    return session.get(PIN_SESSION_KEY, 0) > time.time()
+
+
+@contextlib.contextmanager
+def read_from_primary():
+    """Send the poll model reads inside the block to the primary, even on a replica view.
+
+    Used for the reads whose result is cached under the current version: a lagging
+    replica read after a version bump would stay cached under the new version.
+    """
+    token = _use_replica.set(False)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+class ReplicaRoutingMiddleware:
+    """Let the poll models read from a replica while a read-only poll page is handled.
+
+    The pages are named by POLLS_REPLICA_VIEWS. Users inside their read-your-writes
+    window keep reading from the primary.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        """Read the replica views from the settings."""
+        self.get_response = get_response
+        self.views = set(getattr(settings, 'POLLS_REPLICA_VIEWS', ()))
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        """Handle the request, then stop using the replica."""
+        if iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        token = _use_replica.set(False)
+        try:
+            return self.get_response(request)
+        finally:
+            _use_replica.reset(token)
+
+    async def __acall__(self, request):
+        """Handle the request without leaving the event loop, then stop using the replica."""
+        token = _use_replica.set(False)
+        try:
+            return await self.get_response(request)
+        finally:
+            _use_replica.reset(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        """Use a replica for a read-only poll page unless the user is pinned to the primary."""
+        if request.resolver_match.view_name in self.views and not is_pinned(request):
+            _use_replica.set(True)
+
+
+class ReadReplicaRouter:
+    """Route poll model reads to POLLS_READ_DATABASES during replica views, every write to the primary."""
+
+    def db_for_read(self, model, **hints):
+        """Return: a random read database for a poll model on a replica view, else the default.
+
+        The default is named rather than left to Django, which would read the
+        related objects of an object loaded from a replica from that replica too.
+        """
+        if model._meta.app_label != 'polls':
+            return None
+        replicas = getattr(settings, 'POLLS_READ_DATABASES', [])
+        if replicas and _use_replica.get():
+            return random.choice(replicas)
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        """Return: the primary, even for objects that were read from a replica."""
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """Allow relations between objects of the primary and its replicas."""
+        databases = {'default', *getattr(settings, 'POLLS_READ_DATABASES', [])}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
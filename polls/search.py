@@ -0,0 +1,279 @@
+"""Full-text search of questions by their text and the text of their choices.
+
+On SQLite with FTS5 the index is the polls_question_fts virtual table, one row per
+question. On other databases it is an inverted index kept in this process. Both
+rank the matches, match every word of the query as a prefix, and are kept up to
+date by the model signals.
+"""
+import bisect
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models.expressions import RawSQL
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Choice, Question
+
+FTS_TABLE = 'polls_question_fts'
+
+# A word of the question text counts this much more than a word of a choice.
+QUESTION_WEIGHT = 2.0
+
+_WORD = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """Return: the lowercase words of `text`."""
+    return _WORD.findall(text.lower())
+
+
+def fts_table_exists(conn=connection):
+    """Return: True if the migrations made the FTS5 table, which they do on SQLite with FTS5."""
+    return conn.vendor == 'sqlite' and FTS_TABLE in conn.introspection.table_names()
+
+
+def question_documents(question_ids=None):
+    """Return: an iterator over (question id, question text, choice texts) for `question_ids`, or every question."""
+    questions = Question.objects.order_by('pk')
+    choices = Choice.objects.order_by('question_id', 'pk')
+    if question_ids is not None:
+        questions = questions.filter(pk__in=question_ids)
+        choices = choices.filter(question_id__in=question_ids)
+    texts = defaultdict(list)
+    for question_id, choice_text in choices.values_list('question_id', 'choice_text').iterator():
+        texts[question_id].append(choice_text)
+    for question_id, question_text in questions.values_list('pk', 'question_text').iterator():
+        yield question_id, question_text, ' '.join(texts.get(question_id, ()))
+
+
+class FtsSearchBackend:
+    """Search the FTS5 table, ranked by bm25 with the question text weighted above the choices."""
+
+    def match_expression(self, query):
+        """Return: the FTS5 MATCH expression with every word of `query` as a quoted prefix, or None."""
+        words = tokenize(query)
+        if not words:
+            return None
+        return ' '.join(f'"{word}"*' for word in words)
+
+    def search(self, query, limit=20, now=None):
+        """Return: the ids of the questions matching `query`, best first."""
+        match = self.match_expression(query)
+        if match is None:
+            return []
+        sql = (f'SELECT fts.rowid FROM {FTS_TABLE} AS fts JOIN polls_question AS question '
+               f'ON question.id = fts.rowid WHERE {FTS_TABLE} MATCH %s')
+        params = [match]
+        if now is not None:
+            sql += ' AND question.pub_date <= %s'
+            params.append(connection.ops.adapt_datetimefield_value(now))
+        sql += f' ORDER BY bm25({FTS_TABLE}, {QUESTION_WEIGHT}, 1.0) LIMIT %s'
+        params.append(limit)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [row[0] for row in cursor.fetchall()]
+
+    def filter(self, queryset, query):
+        """Return: the questions of `queryset` matching `query`, in one query."""
+        match = self.match_expression(query)
+        if match is None:
+            return queryset
+        return queryset.filter(pk__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match]))
+
+    def update(self, question_ids):
+        """Index the current text of `question_ids`, dropping the questions that no longer exist."""
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(pk,) for pk in question_ids])
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, question_text, choice_text) VALUES (%s, %s, %s)',
+                list(question_documents(question_ids)),
+            )
+
+    def rebuild(self):
+        """Index every question again; return: the number of questions indexed."""
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, question_text, choice_text) '
+                "SELECT question.id, question.question_text, COALESCE(GROUP_CONCAT(choice.choice_text, ' '), '') "
+                'FROM polls_question AS question LEFT JOIN polls_choice AS choice ON choice.question_id = question.id '
+                'GROUP BY question.id'
+            )
+            cursor.execute(f'SELECT COUNT(*) FROM {FTS_TABLE}')
+            return cursor.fetchone()[0]
+
+
+class InvertedIndexBackend:
+    """Search an inverted index held in this process, ranked by TF-IDF.
+
+    The index is built from the database on the first search. Changes saved in
+    this process update it in place; a committed change bumps a cache version
+    that makes the other processes rebuild before their next search.
+    """
+
+    VERSION_KEY = 'polls:search-index-version'
+
+    def __init__(self):
+        """Start with an empty index that is built on first use."""
+        self._lock = threading.RLock()
+        self._postings = {}
+        self._documents = {}
+        self._words = []
+        self._version = None
+
+    def _add(self, question_id, question_text, choice_text):
+        weights = Counter()
+        for word in tokenize(question_text):
+            weights[word] += QUESTION_WEIGHT
+        for word in tokenize(choice_text):
+            weights[word] += 1.0
+        self._documents[question_id] = weights
+        for word, weight in weights.items():
+            self._postings.setdefault(word, {})[question_id] = weight
+
+    def _remove(self, question_id):
+        for word in self._documents.pop(question_id, {}):
+            postings = self._postings[word]
+            del postings[question_id]
+            if not postings:
+                del self._postings[word]
+
+    def _ensure_current(self):
+        version = cache.get(self.VERSION_KEY, 0)
+        if self._version is None or version != self._version:
+            self.rebuild(bump=False)
+            self._version = version
+
+    def rebuild(self, bump=True):
+        """Build the index again from the database; return: the number of questions indexed."""
+        with self._lock:
+            self._postings, self._documents = {}, {}
+            for document in question_documents():
+                self._add(*document)
+            self._words = sorted(self._postings)
+            if bump:
+                self._version = self._bump()
+            return len(self._documents)
+
+    def _bump(self):
+        """Move the shared version on; return: the new version."""
+        try:
+            return cache.incr(self.VERSION_KEY)
+        except ValueError:
+            cache.add(self.VERSION_KEY, 1, None)
+            return cache.get(self.VERSION_KEY, 0)
+
+    def _expand(self, word):
+        """Return: the indexed words that start with `word`."""
+        start = bisect.bisect_left(self._words, word)
+        matches = []
+        for indexed in self._words[start:]:
+            if not indexed.startswith(word):
+                break
+            matches.append(indexed)
+        return matches
+
+    def scores(self, query):
+        """Return: the TF-IDF score of every question matching all the words of `query`, by id."""
+        words = tokenize(query)
+        if not words:
+            return {}
+        with self._lock:
+            self._ensure_current()
+            total = len(self._documents) or 1
+            scores = None
+            for word in words:
+                word_scores = Counter()
+                for indexed in self._expand(word):
+                    postings = self._postings[indexed]
+                    idf = math.log(1 + total / len(postings))
+                    for question_id, weight in postings.items():
+                        word_scores[question_id] += weight * idf
+                if scores is None:
+                    scores = word_scores
+                else:
+                    # Every word of the query must match.
+                    scores = {pk: score + word_scores[pk] for pk, score in scores.items() if pk in word_scores}
+            return dict(scores)
+
+    def search(self, query, limit=20, now=None):
+        """Return: the ids of the questions matching `query`, best first."""
+        scores = self.scores(query)
+        if now is not None:
+            published = set(Question.objects.filter(pk__in=list(scores)).published(
+                now).values_list('pk', flat=True))
+            scores = {pk: score for pk, score in scores.items() if pk in published}
+        return sorted(scores, key=lambda pk: (-scores[pk], pk))[:limit]
+
+    def filter(self, queryset, query):
+        """Return: the questions of `queryset` matching `query`."""
+        if not tokenize(query):
+            return queryset
+        return queryset.filter(pk__in=list(self.scores(query)))
+
+    def update(self, question_ids):
+        """Index the current text of `question_ids`, dropping the questions that no longer exist.
+
+        An index not built yet is left for its first search, but the shared version
+        is still bumped once the change commits, so other processes rebuild theirs.
+        """
+        with self._lock:
+            indexed = self._version is not None
+            if indexed:
+                for question_id in question_ids:
+                    self._remove(question_id)
+                for document in question_documents(question_ids):
+                    self._add(*document)
+                self._words = sorted(self._postings)
+
+        def bump():
+            version = self._bump()
+            with self._lock:
+                # Keep this index only when no other process bumped the version in between.
+                if indexed and self._version is not None and version == self._version + 1:
+                    self._version = version
+        transaction.on_commit(bump)
+
+
+_backend = None
+
+
+def get_backend():
+    """Return: the backend of POLLS_SEARCH_BACKEND: 'fts5', 'python', or 'auto' for FTS5 where its table exists."""
+    global _backend
+    if _backend is None:
+        choice = getattr(settings, 'POLLS_SEARCH_BACKEND', 'auto')
+        if choice == 'fts5' or (choice == 'auto' and fts_table_exists()):
+            _backend = FtsSearchBackend()
+        else:
+            _backend = InvertedIndexBackend()
+    return _backend
+
+
+def search(query, limit=20, now=None):
+    """Return: at most `limit` questions matching `query`, best first; with `now`, only those published by then."""
+    question_ids = get_backend().search(query, limit, now)
+    questions = Question.objects.in_bulk(question_ids)
+    return [questions[pk] for pk in question_ids if pk in questions]
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def on_question_change(instance, update_fields=None, **kwargs):
+    """Index the new text of a saved question, or drop a deleted one."""
+    if update_fields is None or 'question_text' in update_fields:
+        get_backend().update([instance.pk])
+
+
+@receiver(post_save, sender=Choice)
+@receiver(post_delete, sender=Choice)
+def on_choice_change(instance, update_fields=None, **kwargs):
+    """Index the choices of the question of a saved or deleted choice."""
+    if update_fields is None or 'choice_text' in update_fields:
+        get_backend().update([instance.question_id])
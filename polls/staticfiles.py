@@ -0,0 +1,194 @@
+"""Production static files: hashed and precompressed at collectstatic time, served with far-future caching."""
+import gzip
+import json
+import mimetypes
+import os
+import re
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; without it only gzip copies are written.
+    brotli = None
+
+# Text files worth compressing; images and fonts are compressed by their format.
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.txt', '.html', '.json', '.xml', '.map', '.ico')
+# Files smaller than this gain too little from compression to be worth a second request path.
+MIN_COMPRESS_SIZE = 256
+# Cache-Control of a file whose name has a content hash: its content never changes.
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# Content-Encoding of each precompressed copy, by suffix, best first.
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+_VARIANT = re.compile(r'-\d+w$')
+
+
+def compress_file(path):
+    """Write gzip and, when brotli is installed, brotli copies of `path` next to it.
+
+    A copy that does not save at least 5% is not written.
+    Return: the paths written.
+    """
+    with open(path, 'rb') as source:
+        data = source.read()
+    if len(data) < MIN_COMPRESS_SIZE:
+        return []
+    compressors = {'.gz': lambda data: gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        compressors['.br'] = lambda data: brotli.compress(data, quality=11)
+    written = []
+    for suffix, compress in compressors.items():
+        compressed = compress(data)
+        if len(compressed) <= len(data) * 0.95:
+            with open(path + suffix, 'wb') as target:
+                target.write(compressed)
+            written.append(path + suffix)
+    return written
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Manifest storage with content-hashed names that also writes compressed copies of the hashed text files."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        """Hash the files and rewrite their references, then compress the hashed text files."""
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in sorted(set(self.hashed_files.values())):
+            if name.endswith(COMPRESSIBLE_EXTENSIONS):
+                for path in compress_file(self.path(name)):
+                    yield name, os.path.relpath(path, self.location), True
+
+
+def image_variants(path, widths, quality=80):
+    """Write resized JPEG and WebP variants of the image at `path` next to it.
+
+    Each width below the image width gets `<name>-<width>w.jpg` and
+    `<name>-<width>w.webp`; an image no wider than the largest width also gets a
+    `<name>.webp` at full size. Needs Pillow.
+    Return: the paths written.
+    """
+    from PIL import Image
+
+    root = os.path.splitext(path)[0]
+    written = []
+    with Image.open(path) as image:
+        image = image.convert('RGB')
+        for width in sorted(widths):
+            if width >= image.width:
+                continue
+            resized = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+            written.append(_save(resized, f'{root}-{width}w.jpg', quality))
+            written.append(_save(resized, f'{root}-{width}w.webp', quality))
+        if image.width <= max(widths, default=0):
+            written.append(_save(image, f'{root}.webp', quality))
+    return written
+
+
+def _save(image, path, quality):
+    if path.endswith('.webp'):
+        image.save(path, 'WEBP', quality=quality, method=6)
+    else:
+        image.save(path, 'JPEG', quality=quality, optimize=True, progressive=True)
+    return path
+
+
+def is_source_image(name):
+    """Return: True if `name` is a JPEG or PNG image and not a variant written by image_variants()."""
+    root, extension = os.path.splitext(name)
+    return extension.lower() in ('.jpg', '.jpeg', '.png') and not _VARIANT.search(root)
+
+
+class StaticFilesMiddleware:
+    """Serve the files collected in STATIC_ROOT before the rest of the middleware runs.
+
+    A file whose name is in the staticfiles manifest, which has a content hash,
+    is cached by clients for a year; other files for POLLS_STATIC_MAX_AGE seconds.
+    The brotli or gzip copy is sent to a client that accepts it. Requests for
+    files that are not collected go on to the views, as with DEBUG and runserver.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        """Read the static URL, the collected files directory and the max-age of unhashed files."""
+        self.get_response = get_response
+        self.prefix = settings.STATIC_URL
+        self.root = settings.STATIC_ROOT
+        self.max_age = getattr(settings, 'POLLS_STATIC_MAX_AGE', 60)
+        self._manifest = (None, frozenset())
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        """Answer a request for a collected file, or pass the request on."""
+        if iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        if self.is_static(request):
+            response = self.serve(request, request.path_info[len(self.prefix):])
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        """Answer a request for a collected file from a thread, or pass the request on in the event loop."""
+        if self.is_static(request):
+            response = await sync_to_async(self.serve)(request, request.path_info[len(self.prefix):])
+            if response is not None:
+                return response
+        return await self.get_response(request)
+
+    def is_static(self, request):
+        """Return: True if `request` reads a file under STATIC_URL and there is a STATIC_ROOT to read it from."""
+        return bool(self.root) and request.method in ('GET', 'HEAD') and request.path_info.startswith(self.prefix)
+
+    def hashed_names(self):
+        """Return: the hashed names in the manifest, read again when collectstatic rewrote it."""
+        path = os.path.join(self.root, ManifestStaticFilesStorage.manifest_name)
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            return frozenset()
+        if self._manifest[0] != mtime:
+            with open(path) as manifest:
+                self._manifest = (mtime, frozenset(json.load(manifest).get('paths', {}).values()))
+        return self._manifest[1]
+
+    def serve(self, request, name):
+        """Return: the response for the collected file `name`, or None if there is no such file."""
+        try:
+            path = safe_join(self.root, name)
+        except SuspiciousFileOperation:
+            return None
+        if not os.path.isfile(path):
+            return None
+        accepted = {token.split(';')[0].strip() for token in request.headers.get('Accept-Encoding', '').split(',')}
+        copies = [(encoding, path + suffix) for encoding, suffix in ENCODINGS if os.path.isfile(path + suffix)]
+        encoding, served = next(((encoding, copy) for encoding, copy in copies if encoding in accepted), (None, path))
+        mtime = os.stat(path).st_mtime
+        if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'), mtime):
+            response = HttpResponseNotModified()
+        else:
+            content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+            response = FileResponse(open(served, 'rb'), content_type=content_type)
+            # FileResponse names the file it sends, which is the compressed copy's name.
+            del response['Content-Disposition']
+            response['Last-Modified'] = http_date(mtime)
+            if encoding:
+                response['Content-Encoding'] = encoding
+        if copies:
+            response['Vary'] = 'Accept-Encoding'
+        if name in self.hashed_names():
+            response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        else:
+            response['Cache-Control'] = f'public, max-age={self.max_age}'
+        return response
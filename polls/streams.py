@@ -0,0 +1,182 @@
+"""Server-sent events stream of live poll results, served by the ASGI application.
+
+One broadcaster per question checks the results version in the cache at most
+POLLS_STREAM_MAX_RATE times a second and sends new results to every subscriber,
+so the number of checks does not grow with the number of clients. Votes from
+other worker processes are only seen with a shared cache backend.
+
+The streams are answered in front of the Django application, so no Django
+middleware runs for them: ALLOWED_HOSTS is not checked, and they are not
+throttled, profiled or given the security headers. They only read the public
+results of a question; put host checks and connection limits in the proxy.
+"""
+import asyncio
+import json
+import logging
+import re
+
+from django.conf import settings
+
+from . import caching
+from .async_views import run_sync
+
+logger = logging.getLogger(__name__)
+
+STREAM_PATH = re.compile(r'^/polls/(?P<question_id>\d+)/stream/$')
+
+
+class ResultsBroadcaster:
+    """Send the results of one question to its subscribers whenever the results version changes."""
+
+    def __init__(self, question_id, version, min_interval):
+        """Start from the results `version` that the subscribers have already seen."""
+        self.question_id = question_id
+        self.version = version
+        self.min_interval = min_interval
+        self.subscribers = set()
+        self.checks = 0
+        self.updates = 0
+        self.errors = 0
+        self.task = None
+
+    def subscribe(self):
+        """Return: a queue that receives the results events of the question."""
+        queue = asyncio.Queue(maxsize=1)
+        self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        """Stop sending events to `queue`."""
+        self.subscribers.discard(queue)
+
+    def publish(self, event):
+        """Put `event` on every subscriber queue, replacing an event the client has not read yet."""
+        for queue in self.subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    async def run(self):
+        """Check for new results until the last subscriber leaves.
+
+        A check that fails is logged and tried again after the next interval.
+        """
+        while self.subscribers:
+            await asyncio.sleep(self.min_interval)
+            self.checks += 1
+            try:
+                await self.check()
+            except Exception:
+                self.errors += 1
+                logger.exception('Results stream of question %s failed to check for new results', self.question_id)
+
+    async def check(self):
+        """Publish the results of the question if its results version changed."""
+        version = await run_sync(caching.results_version)(self.question_id)
+        if version == self.version:
+            return
+        results = (await run_sync(caching.get_many_results)([self.question_id])).get(self.question_id)
+        self.version = version
+        if results is None:
+            return
+        self.updates += 1
+        self.publish(format_event({'id': self.question_id, **results}))
+
+
+_broadcasters = {}
+
+
+def get_broadcaster(question_id, version):
+    """Return: the running broadcaster of a question, starting one if needed."""
+    broadcaster = _broadcasters.get(question_id)
+    if broadcaster is None or broadcaster.task is None or broadcaster.task.done():
+        max_rate = getattr(settings, 'POLLS_STREAM_MAX_RATE', 2)
+        broadcaster = ResultsBroadcaster(question_id, version, 1 / max_rate)
+        _broadcasters[question_id] = broadcaster
+    return broadcaster
+
+
+def leave_broadcaster(broadcaster, queue):
+    """Unsubscribe `queue`, and forget the broadcaster once its last subscriber has left."""
+    broadcaster.unsubscribe(queue)
+    if not broadcaster.subscribers and _broadcasters.get(broadcaster.question_id) is broadcaster:
+        del _broadcasters[broadcaster.question_id]
+
+
+def format_event(data, event='results'):
+    """Return: the bytes of one server-sent event with JSON `data`."""
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'.encode()
+
+
+async def _send_response(send, status, headers, body=b'', more_body=False):
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body, 'more_body': more_body})
+
+
+async def results_stream(scope, receive, send, question_id):
+    """Stream the results of a question as server-sent events until the client disconnects.
+
+    The stream ends if the broadcaster of the question stops, and the client's
+    EventSource connects again to a new one.
+    """
+    if scope['method'] != 'GET':
+        await _send_response(send, 405, [(b'allow', b'GET')])
+        return
+    # The version is read before the results, so a vote in between is sent again rather than missed.
+    versions = await run_sync(caching.results_versions)([question_id])
+    results = (await run_sync(caching.get_many_results)([question_id], versions)).get(question_id)
+    if results is None:
+        await _send_response(send, 404, [(b'content-type', b'text/plain')], b'No such question.')
+        return
+    headers = [
+        (b'content-type', b'text/event-stream'),
+        (b'cache-control', b'no-cache'),
+        (b'x-accel-buffering', b'no'),
+    ]
+    await _send_response(send, 200, headers, format_event({'id': question_id, **results}), more_body=True)
+
+    broadcaster = get_broadcaster(question_id, versions[question_id])
+    queue = broadcaster.subscribe()
+    if broadcaster.task is None or broadcaster.task.done():
+        broadcaster.task = asyncio.ensure_future(broadcaster.run())
+    heartbeat = getattr(settings, 'POLLS_STREAM_HEARTBEAT', 15)
+    disconnect = asyncio.ensure_future(_wait_for_disconnect(receive))
+    try:
+        while not disconnect.done():
+            next_event = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait({next_event, disconnect, broadcaster.task}, timeout=heartbeat,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            if next_event in done:
+                await send({'type': 'http.response.body', 'body': next_event.result(), 'more_body': True})
+                continue
+            next_event.cancel()
+            if broadcaster.task in done and not disconnect.done():
+                logger.warning('Results stream of question %s ended: its broadcaster stopped', question_id)
+                await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+                break
+            if not done:
+                await send({'type': 'http.response.body', 'body': b': heartbeat\n\n', 'more_body': True})
+    except OSError:
+        logger.info('Results stream of question %s closed by the client', question_id)
+    finally:
+        leave_broadcaster(broadcaster, queue)
+        disconnect.cancel()
+
+
+async def _wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+def stream_application(django_application):
+    """Return: an ASGI application that serves the results streams and passes the rest to Django.
+
+    The streams bypass the Django middleware; see the module docstring.
+    """
+    async def application(scope, receive, send):
+        match = STREAM_PATH.match(scope.get('path', '')) if scope['type'] == 'http' else None
+        if match:
+            await results_stream(scope, receive, send, int(match['question_id']))
+        else:
+            await django_application(scope, receive, send)
+    return application
@@ -0,0 +1,11 @@
+"""URL configuration that serves the async poll views, for the async view tests."""
+from django.urls import include, path
+
+from mysite import views
+from polls.urls import async_urlpatterns
+
+urlpatterns = [
+    path('polls/', include((async_urlpatterns, 'polls'))),
+    path('accounts/', include('django.contrib.auth.urls')),
+    path('signup/', views.signup, name='signup'),
+]
@@ -0,0 +1,94 @@
+"""Tests of the Question admin changelist."""
+import datetime
+
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.urls import reverse
+
+from polls.admin import EstimatedCountPaginator
+from polls.models import Question, Choice
+
+
+def create_question(question_text, start, end, votes=0):
+    """Create a question published `start` days from now with one choice of `votes` votes."""
+    question = Question.objects.create(question_text=question_text,
+                                       pub_date=timezone.now() + datetime.timedelta(days=start),
+                                       end_date=timezone.now() + datetime.timedelta(days=end))
+    Choice.objects.create(question=question, choice_text="Choice", vote_count=votes)
+    return question
+
+
+class QuestionAdminTests(TestCase):
+    """Tests for the annotated QuestionAdmin changelist."""
+
+    def setUp(self):
+        """Log in as an admin and create an upcoming, an open and a closed question."""
+        User.objects.create_superuser(username="admin", password="Vote4me!", email="admin@nowhere.com")
+        self.client.login(username="admin", password="Vote4me!")
+        create_question("Upcoming question", start=2, end=5)
+        create_question("Open question", start=-1, end=1, votes=7)
+        create_question("Closed question", start=-5, end=-2, votes=3)
+        self.url = reverse('admin:polls_question_changelist')
+
+    def test_status_and_total_votes(self):
+        """Each row shows its status and total votes from the SQL annotations."""
+        response = self.client.get(self.url)
+        rows = {q.question_text: (q.current_status, q.total_votes) for q in response.context['cl'].result_list}
+        self.assertEqual(rows, {
+            "Upcoming question": ('upcoming', 0),
+            "Open question": ('open', 7),
+            "Closed question": ('closed', 3),
+        })
+
+    def test_published_and_voting_columns(self):
+        """The published recently, published and can vote columns come from the SQL status and sort in SQL."""
+        Question.objects.create(question_text="Fresh question", pub_date=timezone.now() - datetime.timedelta(hours=1),
+                                end_date=timezone.now() + datetime.timedelta(days=1))
+        response = self.client.get(self.url)
+        for header in ("Published recently ?", "IS PUBLISHED", "CAN VOTE"):
+            self.assertContains(response, header)
+        model_admin = admin.site._registry[Question]
+        columns = list(model_admin.list_display)
+        expected = {
+            'was_published_recently': {"Fresh question"},
+            'is_published': {"Fresh question", "Open question", "Closed question"},
+            'can_vote': {"Fresh question", "Open question"},
+        }
+        for name, flagged in expected.items():
+            response = self.client.get(self.url, {'o': f'-{1 + columns.index(name)}'})
+            rows = response.context['cl'].result_list
+            flags = [getattr(model_admin, name)(question) for question in rows]
+            self.assertEqual(flags, sorted(flags, reverse=True))
+            self.assertEqual({question.question_text for question, flag in zip(rows, flags) if flag}, flagged)
+
+    def test_status_filter(self):
+        """The status filter runs in the database."""
+        response = self.client.get(self.url, {'status': 'closed'})
+        self.assertEqual([q.question_text for q in response.context['cl'].result_list], ["Closed question"])
+
+    def test_sort_by_total_votes(self):
+        """The total votes column can be sorted in SQL."""
+        column = 1 + list(admin.site._registry[Question].list_display).index('total_votes')
+        response = self.client.get(self.url, {'o': f'-{column}'})
+        self.assertEqual([q.question_text for q in response.context['cl'].result_list][0], "Open question")
+
+    def test_query_count_does_not_grow_with_rows(self):
+        """The changelist does no per-row queries."""
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+        for n in range(10):
+            create_question(f"Extra question {n}", start=-1, end=1)
+        with self.assertNumQueries(len(queries)):
+            self.client.get(self.url)
+
+    def test_estimated_count(self):
+        """Above the exact count limit the paginator uses the estimate."""
+        paginator = EstimatedCountPaginator(Question.objects.order_by('pk'), 100)
+        paginator.exact_count_limit = 0
+        Question.objects.filter(question_text="Upcoming question").delete()
+        self.assertEqual(paginator.count, Question.objects.order_by('-pk').first().pk)
@@ -0,0 +1,81 @@
+"""Testing the async poll views with the async test client."""
+import datetime
+from urllib.parse import urlencode
+
+from asgiref.sync import sync_to_async
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.handlers.base import BaseHandler
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from django.urls import reverse
+
+from polls.middleware import view_stats
+from polls.models import Question, Choice, Vote
+
+
+@override_settings(ROOT_URLCONF='polls.tests.async_urls')
+class AsyncViewTests(TransactionTestCase):
+    """Tests for the async index, detail, results and vote views.
+
+    The async views query from pool threads, so the test data must be committed.
+    """
+
+    def setUp(self):
+        """Set up a user and an open question with two choices."""
+        cache.clear()
+        self.user = User.objects.create_user(username="testuser", password="Fat-Chance!")
+        self.question = Question.objects.create(question_text="Async question",
+                                                pub_date=timezone.now() - datetime.timedelta(days=1),
+                                                end_date=timezone.now() + datetime.timedelta(days=1))
+        self.choice = Choice.objects.create(question=self.question, choice_text="Async choice")
+
+    async def test_index(self):
+        """The async index lists the published question."""
+        response = await self.async_client.get(reverse('polls:index'))
+        self.assertContains(response, "Async question")
+
+    async def test_detail(self):
+        """The async detail page shows the choices of an open question."""
+        response = await self.async_client.get(reverse('polls:detail', args=(self.question.id,)))
+        self.assertContains(response, "Async choice")
+
+    async def test_detail_is_profiled(self):
+        """The queries an async view runs in the pool threads count toward its request profile."""
+        view_stats.clear()
+        await self.async_client.get(reverse('polls:detail', args=(self.question.id,)))
+        self.assertGreater(view_stats.snapshot()['polls:detail']['max_queries'], 0)
+
+    async def test_results(self):
+        """The async results page shows the vote totals."""
+        response = await self.async_client.get(reverse('polls:results', args=(self.question.id,)))
+        self.assertContains(response, "Total")
+
+    async def test_vote_requires_login(self):
+        """An anonymous vote is redirected to the login page."""
+        response = await self.async_client.post(reverse('polls:vote', args=(self.question.id,)),
+                                                {'choice': self.choice.id})
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response.url.startswith('/accounts/login/'))
+
+    async def test_vote(self):
+        """A logged in user can vote through the async view."""
+        await sync_to_async(self.async_client.force_login)(self.user)
+        response = await self.async_client.post(reverse('polls:vote', args=(self.question.id,)),
+                                                urlencode({'choice': self.choice.id}),
+                                                content_type='application/x-www-form-urlencoded')
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response.url, reverse('polls:results', args=(self.question.id,)))
+        vote = await sync_to_async(Vote.objects.get)(user=self.user)
+        self.assertEqual(vote.choice_id, self.choice.id)
+
+
+class AsyncMiddlewareTests(SimpleTestCase):
+    """Tests that the middleware of the polls keeps an ASGI request in the event loop."""
+
+    @override_settings(DEBUG=True)
+    def test_middleware_chain_is_not_adapted(self):
+        """No middleware is wrapped in sync_to_async when the handler is async, which Django logs with DEBUG."""
+        with self.assertNoLogs('django.request', 'DEBUG'):
+            BaseHandler().load_middleware(is_async=True)
@@ -0,0 +1,39 @@
+"""Tests of the benchmark seeding and runner."""
+from django.core.cache import cache
+from django.test import TestCase
+
+from polls.benchmark.runner import BenchmarkRunner
+from polls.benchmark.seed import seed_dataset
+from polls.models import Choice, Vote
+from polls.profiling import percentile
+
+
+class BenchmarkTests(TestCase):
+    """Tests for the benchmark dataset and report."""
+
+    def setUp(self):
+        """Start without cached pages so every endpoint queries the database."""
+        cache.clear()
+
+    def test_percentile(self):
+        """percentile() uses the nearest rank."""
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertIsNone(percentile([], 50))
+
+    def test_seed_dataset(self):
+        """Seeding makes one vote per user per question with matching tallies."""
+        created = seed_dataset(questions=3, choices=4, votes=5, open_ratio=1.0, seed=1)
+        self.assertEqual(created, {'users': 5, 'questions': 3, 'choices': 12, 'votes': 15})
+        self.assertEqual(sum(Choice.objects.values_list('vote_count', flat=True)), Vote.objects.count())
+
+    def test_runner_report(self):
+        """The runner reports latency percentiles and query counts for every endpoint."""
+        seed_dataset(questions=2, choices=2, votes=2, open_ratio=1.0, seed=1)
+        report = BenchmarkRunner(requests=3, seed=1).run()
+        self.assertEqual(set(report), {'index', 'detail', 'results', 'vote'})
+        for stats in report.values():
+            self.assertEqual((stats['requests'], stats['errors']), (3, 0))
+            self.assertGreater(stats['queries_per_request'], 0)
+        self.assertGreater(report['detail']['render_mean_ms'], 0)
@@ -0,0 +1,104 @@
+"""Tests of the process-local choice map."""
+import datetime
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from polls import caching, choicemap
+from polls.models import Choice, Question
+
+
+class ChoiceMapTests(TestCase):
+    """Tests for ChoiceMap and its signal eviction."""
+
+    def setUp(self):
+        """Create two questions with choices and an empty map."""
+        cache.clear()
+        choicemap.get_choice_map().clear()
+        self.first = Question.objects.create(question_text="First?", pub_date=timezone.now())
+        self.yes = Choice.objects.create(question=self.first, choice_text="Yes")
+        self.second = Question.objects.create(question_text="Second?", pub_date=timezone.now())
+        Choice.objects.create(question=self.second, choice_text="No")
+
+    def test_lru_bound(self):
+        """The least recently used question is dropped above max_size."""
+        choice_map = choicemap.ChoiceMap(max_size=1)
+        self.assertEqual(choice_map.get(self.first.id, 1), {self.yes.id: "Yes"})
+        with self.assertNumQueries(0):
+            choice_map.get(self.first.id, 1)
+        choice_map.get(self.second.id, 1)
+        self.assertEqual(choice_map.stats(), {'size': 1, 'max_size': 1, 'hits': 1, 'misses': 2})
+        with self.assertNumQueries(1):
+            choice_map.get(self.first.id, 1)
+
+    def test_changes_evict(self):
+        """A committed choice evicts its question, and a new version from another process is read again."""
+        choicemap.question_choices(self.first.id)
+        self.yes.choice_text = "Sure"
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.yes.save()
+        self.assertEqual(choicemap.get_choice_map().stats()['size'], 1)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(choicemap.question_choices(self.first.id), {self.yes.id: "Sure"})
+        Choice.objects.filter(pk=self.yes.pk).update(choice_text="Yep")
+        caching.bump_choices_version(self.first.id)
+        self.assertEqual(choicemap.question_choices(self.first.id), {self.yes.id: "Yep"})
+
+    def test_entries_expire(self):
+        """An entry older than the ttl is read again even at the same version."""
+        choice_map = choicemap.ChoiceMap(ttl=60)
+        choice_map.get(self.first.id, 1)
+        Choice.objects.filter(pk=self.yes.pk).update(choice_text="Yep")
+        now = choicemap.time.monotonic()
+        with mock.patch.object(choicemap.time, 'monotonic', return_value=now + 59):
+            self.assertEqual(choice_map.get(self.first.id, 1), {self.yes.id: "Yes"})
+        with mock.patch.object(choicemap.time, 'monotonic', return_value=now + 61):
+            self.assertEqual(choice_map.get(self.first.id, 1), {self.yes.id: "Yep"})
+
+    def test_get_choice(self):
+        """get_choice() only accepts the ids of the choices of the question."""
+        self.assertEqual(choicemap.get_choice(self.first, str(self.yes.id)).choice_text, "Yes")
+        for choice_id in ('abc', None, self.second.choice_set.get().id):
+            with self.assertRaises(Choice.DoesNotExist):
+                choicemap.get_choice(self.first, choice_id)
+
+
+@override_settings(POLLS_THROTTLE_RATES={})
+class ChoiceMapViewTests(TestCase):
+    """Tests for the detail and vote views reading the choice map."""
+
+    def setUp(self):
+        """Create an open question with a choice and log a voter in."""
+        cache.clear()
+        choicemap.get_choice_map().clear()
+        now = timezone.now()
+        self.question = Question.objects.create(question_text="Open?", pub_date=now,
+                                                end_date=now + datetime.timedelta(days=1))
+        self.choice = Choice.objects.create(question=self.question, choice_text="Yes")
+        self.client.force_login(User.objects.create_user(username="voter", password="Vote4me!"))
+
+    def test_vote_validates_from_map(self):
+        """After the detail page, a vote reads no choice from the database to validate it."""
+        self.client.get(reverse('polls:detail', args=(self.question.id,)))
+        url = reverse('polls:vote', args=(self.question.id,))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url, {'choice': self.choice.id})
+        self.assertRedirects(response, reverse('polls:results', args=(self.question.id,)),
+                             fetch_redirect_response=False)
+        self.assertFalse([query['sql'] for query in queries if query['sql'].startswith('SELECT')
+                          and 'FROM "polls_choice"' in query['sql']])
+        self.assertEqual(choicemap.get_choice_map().stats()['hits'], 1)
+        self.assertEqual(self.question.get_results()['total_votes'], 1)
+
+    def test_unknown_choice_redisplays_form(self):
+        """A vote for a choice id that is not a number or not of the question shows the form again."""
+        url = reverse('polls:vote', args=(self.question.id,))
+        for choice_id in ('abc', self.choice.id + 100):
+            self.assertContains(self.client.post(url, {'choice': choice_id}), "You didn&#x27;t select a choice.")
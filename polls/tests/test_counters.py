@@ -0,0 +1,93 @@
+"""Tests of the sharded vote counters."""
+import datetime
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from polls import counters
+from polls.models import Choice, ChoiceShard, Question
+
+
+@override_settings(POLLS_VOTE_SHARDS=4, POLLS_SHARD_VOTE_RATE=0, POLLS_THROTTLE_RATES={})
+class ShardedCounterTests(TestCase):
+    """Tests for votes counted in shard rows."""
+
+    def setUp(self):
+        """Create an open question with sharded counters and two choices."""
+        cache.clear()
+        self.question = Question.objects.create(question_text="Hot question", sharded_votes=True,
+                                                pub_date=timezone.now() - datetime.timedelta(days=1),
+                                                end_date=timezone.now() + datetime.timedelta(days=1))
+        self.yes = Choice.objects.create(question=self.question, choice_text="Yes", vote_count=2)
+        self.no = Choice.objects.create(question=self.question, choice_text="No")
+
+    def test_shards_are_summed_on_read(self):
+        """Votes spread over the shards are added to the tally everywhere the results are read."""
+        for _ in range(20):
+            Choice.add_vote(self.yes.id, shards=4)
+        self.assertLessEqual(ChoiceShard.objects.filter(choice=self.yes).count(), 4)
+        results = self.question.get_results()
+        self.assertEqual([choice['votes'] for choice in results['choices']], [22, 0])
+        self.assertEqual(Question.objects.results_for([self.question.id])[self.question.id], results)
+        self.assertEqual(Question.objects.with_total_votes().get(pk=self.question.pk).total_votes, 22)
+        self.assertEqual(self.yes.votes, 22)
+
+    def test_votes_counts_leftover_shards(self):
+        """Choice.votes adds shard rows left on an unsharded question, without a query when they were prefetched."""
+        Choice.add_vote(self.yes.id, shards=4)
+        Question.objects.filter(pk=self.question.pk).update(sharded_votes=False)
+        choices = list(Question.objects.get(pk=self.question.pk).choice_set.order_by('id'))
+        self.assertEqual([choice.votes for choice in choices], [3, 0])
+        choices = list(self.question.choice_set.order_by('id').prefetch_related('choiceshard_set'))
+        with self.assertNumQueries(0):
+            self.assertEqual([choice.votes for choice in choices], [3, 0])
+
+    def test_vote_view_uses_shards(self):
+        """Votes and changed votes on a sharded question keep the totals right."""
+        user = User.objects.create_user(username="voter", password="Vote4me!")
+        self.client.force_login(user)
+        url = reverse('polls:vote', args=(self.question.id,))
+        self.client.post(url, {'choice': self.no.id})
+        self.client.post(url, {'choice': self.yes.id})
+        self.assertTrue(ChoiceShard.objects.filter(choice__question=self.question).exists())
+        self.assertEqual([choice['votes'] for choice in self.question.get_results()['choices']], [3, 0])
+
+    def test_fold_and_rebuild_remove_shards(self):
+        """Folding moves the shard votes into the tally; a rebuild recounts from the votes."""
+        for _ in range(5):
+            Choice.add_vote(self.no.id, shards=4)
+        Choice.fold_shards(self.question.choice_set.all())
+        self.assertFalse(ChoiceShard.objects.exists())
+        self.no.refresh_from_db()
+        self.assertEqual(self.no.vote_count, 5)
+        Choice.add_vote(self.no.id, shards=4)
+        Choice.rebuild_vote_counts()
+        self.assertFalse(ChoiceShard.objects.exists())
+        self.assertEqual([choice['votes'] for choice in self.question.get_results()['choices']], [0, 0])
+
+
+class AutomaticShardingTests(TestCase):
+    """Tests for sharding the counters of a question above the vote rate."""
+
+    def setUp(self):
+        """Create a question with single counters."""
+        cache.clear()
+        self.question = Question.objects.create(question_text="Getting hot", pub_date=timezone.now())
+
+    @override_settings(POLLS_SHARD_VOTE_RATE=2)
+    def test_sharded_above_rate(self):
+        """The vote that goes over the rate switches the question to sharded counters."""
+        with mock.patch('polls.counters.time.time', return_value=1000.5):
+            self.assertEqual([counters.note_vote(self.question) for _ in range(3)], [False, False, True])
+        self.question.refresh_from_db()
+        self.assertTrue(self.question.sharded_votes)
+
+    @override_settings(POLLS_SHARD_VOTE_RATE=0)
+    def test_rate_zero_never_shards(self):
+        """A rate of 0 leaves the sharding to the admin flag."""
+        for _ in range(10):
+            self.assertFalse(counters.note_vote(self.question))
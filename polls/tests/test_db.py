@@ -0,0 +1,19 @@
+"""Tests of the SQLite connection tuning."""
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from polls.db import apply_sqlite_pragmas
+
+
+class SqlitePragmaTests(TestCase):
+    """Tests for apply_sqlite_pragmas."""
+
+    @override_settings(SQLITE_PRAGMAS={'cache_size': -1234, 'busy_timeout': 4321})
+    def test_pragmas_are_applied(self):
+        """Every pragma of the profile is set on the connection."""
+        apply_sqlite_pragmas(sender=connection.__class__, connection=connection)
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], -1234)
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 4321)
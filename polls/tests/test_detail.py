@@ -1,11 +1,12 @@
 """Testing the Question model."""
 import datetime
 
+from django.core.cache import cache
 from django.test import TestCase
 from django.utils import timezone
 from django.urls import reverse
 
-from polls.models import Question
+from polls.models import Choice, Question
 
 
 def create_question(question_text, start, end):
@@ -39,3 +40,24 @@ class QuestionDetailViewTests(TestCase):
         response = self.client.get(url)
         index_response = self.client.get(response.url)
         self.assertContains(index_response, past_question.question_text, status_code=200)
+
+    def test_choice_list_is_cached(self):
+        """The choice list is rendered from the cache until a choice is saved or deleted."""
+        cache.clear()
+        question = create_question(question_text='Cached choices.', start=-1, end=1)
+        choice = Choice.objects.create(question=question, choice_text='First')
+        url = reverse('polls:detail', args=(question.id,))
+        self.assertContains(self.client.get(url), 'First')
+        with self.assertNumQueries(1):
+            self.assertContains(self.client.get(url), 'First')
+        choice.choice_text = 'Renamed'
+        with self.captureOnCommitCallbacks() as callbacks:
+            choice.save()
+        # Until the save commits, a reader would cache the old list under a new version.
+        self.assertContains(self.client.get(url), 'First')
+        for callback in callbacks:
+            callback()
+        self.assertContains(self.client.get(url), 'Renamed')
+        with self.captureOnCommitCallbacks(execute=True):
+            choice.delete()
+        self.assertNotContains(self.client.get(url), 'Renamed')
@@ -0,0 +1,58 @@
+"""Tests of the streaming export."""
+import datetime
+import json
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+from django.urls import reverse
+
+from polls.models import Question, Choice, Vote
+
+
+class ExportTests(TestCase):
+    """Tests for the export_data view."""
+
+    def setUp(self):
+        """Set up a staff user and two questions with a vote each."""
+        self.staff = User.objects.create_user(username="staff", password="Vote4me!", is_staff=True)
+        self.questions = []
+        for days in (10, 1):
+            question = Question.objects.create(question_text=f"Question {days}",
+                                               pub_date=timezone.now() - datetime.timedelta(days=days),
+                                               end_date=timezone.now() + datetime.timedelta(days=1))
+            choice = Choice.objects.create(question=question, choice_text=f"Choice {days}")
+            Vote.objects.create(user=self.staff, choice=choice)
+            self.questions.append(question)
+        self.client.login(username="staff", password="Vote4me!")
+
+    def export(self, **params):
+        """Return: the lines of the streamed export."""
+        response = self.client.get(reverse('export_data'), params)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode().splitlines()
+
+    def test_votes_csv(self):
+        """The CSV export has a header and one row per vote."""
+        lines = self.export(kind='votes', format='csv')
+        self.assertEqual(lines[0], 'vote_id,question_id,choice_id,choice_text,username')
+        self.assertEqual(len(lines), 3)
+
+    def test_results_ndjson_with_filters(self):
+        """Question and date filters limit the NDJSON results export."""
+        since = (timezone.now() - datetime.timedelta(days=5)).date().isoformat()
+        rows = [json.loads(line) for line in self.export(kind='results', format='ndjson', since=since)]
+        self.assertEqual([row['question_id'] for row in rows], [self.questions[1].id])
+        rows = self.export(kind='results', format='ndjson', question=self.questions[0].id)
+        self.assertEqual(json.loads(rows[0])['choice_text'], "Choice 10")
+
+    def test_bad_parameters(self):
+        """An unknown format or a bad date is a 400."""
+        self.assertEqual(self.client.get(reverse('export_data'), {'format': 'xml'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('export_data'), {'since': 'soon'}).status_code, 400)
+
+    def test_export_is_admin_only(self):
+        """Users who are not staff can not export."""
+        User.objects.create_user(username="user", password="Vote4me!")
+        self.client.login(username="user", password="Vote4me!")
+        self.assertEqual(self.client.get(reverse('export_data')).status_code, 302)
@@ -0,0 +1,86 @@
+"""Tests of the import_polls command."""
+import io
+import json
+import os
+import tempfile
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.utils import timezone
+
+from polls.models import Question, Choice
+
+RECORDS = [
+    {'question_text': 'Imported 1', 'pub_date': '2021-01-01T00:00:00', 'end_date': '2021-02-01T00:00:00',
+     'choices': ['Yes', 'No']},
+    {'question_text': 'Imported 2', 'pub_date': '2021-01-01T00:00:00', 'end_date': '2021-02-01T00:00:00',
+     'choices': ['Red', 'Green', 'Blue']},
+]
+
+
+class ImportPollsTests(TestCase):
+    """Tests for import_polls."""
+
+    def setUp(self):
+        """Make a directory for the import files."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write(self, name, content):
+        """Return: the path of a new import file with `content`."""
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w') as import_file:
+            import_file.write(content)
+        return path
+
+    def run_import(self, *args):
+        """Run import_polls quietly."""
+        call_command('import_polls', *args, batch_size=1, stdout=io.StringIO())
+
+    def test_import_json(self):
+        """Questions and choices in a JSON file are inserted."""
+        self.run_import(self.write('polls.json', json.dumps(RECORDS)))
+        self.assertEqual(Question.objects.count(), 2)
+        self.assertEqual(list(Question.objects.get(question_text='Imported 2').choice_set.values_list(
+            'choice_text', flat=True).order_by('id')), ['Red', 'Green', 'Blue'])
+
+    def test_import_csv(self):
+        """CSV rows list the choices separated by |."""
+        path = self.write('polls.csv', 'question_text,pub_date,end_date,choices\n'
+                                       'CSV question,2021-01-01 00:00,2021-02-01 00:00,A|B\n')
+        self.run_import(path)
+        self.assertEqual(Choice.objects.filter(question__question_text='CSV question').count(), 2)
+
+    def test_upsert(self):
+        """Upsert updates the dates of a question with the same text and adds its new choices."""
+        self.run_import(self.write('polls.json', json.dumps(RECORDS)))
+        changed = [dict(RECORDS[0], end_date='2021-03-01T00:00:00', choices=['Yes', 'No', 'Maybe'])]
+        self.run_import(self.write('changed.json', json.dumps(changed)), '--upsert')
+        question = Question.objects.get(question_text='Imported 1')
+        self.assertEqual(Question.objects.count(), 2)
+        self.assertEqual(timezone.localtime(question.end_date).month, 3)
+        self.assertEqual(question.choice_set.count(), 3)
+
+    def test_dry_run(self):
+        """A dry run writes nothing."""
+        self.run_import(self.write('polls.json', json.dumps(RECORDS)), '--dry-run')
+        self.assertEqual(Question.objects.count(), 0)
+
+    def test_invalid_records(self):
+        """Invalid records stop the import with every error listed."""
+        bad = [{'question_text': '', 'pub_date': 'soon', 'end_date': '2021-01-01T00:00:00', 'choices': []}]
+        with self.assertRaises(CommandError) as raised:
+            self.run_import(self.write('bad.json', json.dumps(bad)))
+        self.assertIn('question_text', str(raised.exception))
+        self.assertIn('pub_date', str(raised.exception))
+        self.assertEqual(Question.objects.count(), 0)
+
+    def test_choices_must_be_a_list_of_strings(self):
+        """A choices value that is a string, or a list holding other values, is rejected."""
+        for choices in ("Yes", ["Yes", 2], {"a": "Yes"}):
+            record = dict(RECORDS[0], choices=choices)
+            with self.subTest(choices=choices), self.assertRaises(CommandError) as raised:
+                self.run_import(self.write('bad.json', json.dumps([record])))
+            self.assertIn('choices must be a list of strings', str(raised.exception))
+        self.assertEqual(Question.objects.count(), 0)
@@ -1,10 +1,12 @@
 """Testing the Question Index View model."""
 import datetime
 
+from django.core.cache import cache
 from django.test import TestCase
 from django.utils import timezone
 from django.urls import reverse
 
+from polls import caching
 from polls.models import Question
 
 
@@ -21,6 +23,10 @@ def create_question(question_text, start, end):
 class QuestionIndexViewTests(TestCase):
     """Tests for Question Index View."""
 
+    def setUp(self):
+        """Start every test without a cached index fragment."""
+        cache.clear()
+
     def test_no_questions(self):
         """If no questions exist, an appropriate message is displayed."""
         response = self.client.get(reverse('polls:index'))
@@ -63,3 +69,40 @@ class QuestionIndexViewTests(TestCase):
             response.context['latest_question_list'],
             ['<Question: Past question 2.>', '<Question: Past question 1.>']
         )
+
+    def test_open_status_is_annotated(self):
+        """Each listed question carries is_open computed in SQL."""
+        create_question(question_text="Open question.", start=-1, end=1)
+        create_question(question_text="Closed question.", start=-5, end=-2)
+        response = self.client.get(reverse('polls:index'))
+        self.assertEqual(
+            [(q.question_text, q.is_open) for q in response.context['latest_question_list']],
+            [("Open question.", True), ("Closed question.", False)]
+        )
+
+    def test_fragment_is_cached(self):
+        """The second request reuses the cached fragment without listing the questions."""
+        create_question(question_text="Past question.", start=-30, end=-15)
+        self.client.get(reverse('polls:index'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('polls:index'))
+        self.assertContains(response, "Past question.")
+
+    def test_new_question_invalidates_fragment(self):
+        """Saving a question replaces the cached fragment."""
+        self.client.get(reverse('polls:index'))
+        with self.captureOnCommitCallbacks(execute=True):
+            create_question(question_text="New question.", start=-1, end=1)
+        response = self.client.get(reverse('polls:index'))
+        self.assertContains(response, "New question.")
+
+    def test_cache_timeout_ends_at_next_status_change(self):
+        """The fragment expires when the next question publishes or closes."""
+        now = timezone.now()
+        create_question(question_text="Open question.", start=-1, end=2)
+        create_question(question_text="Future question.", start=1, end=3)
+        Question.objects.filter(question_text="Future question.").update(
+            pub_date=now + datetime.timedelta(seconds=90)
+        )
+        cache.clear()
+        self.assertEqual(caching.index_cache_timeout(now), 90)
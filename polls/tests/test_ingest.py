@@ -0,0 +1,112 @@
+"""Tests of the buffered vote writer."""
+import datetime
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from polls.ingest import VoteWriter
+from polls import caching
+from polls.models import Question, Choice, ChoiceShard, Vote
+
+
+class VoteWriterTests(TestCase):
+    """Tests for VoteWriter batching and coalescing."""
+
+    def setUp(self):
+        """Set up two users and a question with two choices."""
+        self.users = [User.objects.create_user(username=f"voter{n}", password="Vote4me!") for n in range(2)]
+        self.question = Question.objects.create(question_text="Buffered question",
+                                                pub_date=timezone.now(),
+                                                end_date=timezone.now() + datetime.timedelta(days=1))
+        self.first = Choice.objects.create(question=self.question, choice_text="First")
+        self.second = Choice.objects.create(question=self.question, choice_text="Second")
+        self.writer = VoteWriter(batch_size=10, interval=0.01, retries=2, retry_delay=0)
+
+    def test_repeated_votes_are_coalesced(self):
+        """Only the last vote of a user on a question in a batch is written."""
+        self.writer.submit(self.users[0].id, self.question.id, self.first.id)
+        self.writer.submit(self.users[0].id, self.question.id, self.second.id)
+        self.writer.submit(self.users[1].id, self.question.id, self.first.id)
+        self.writer.flush()
+        self.assertEqual(
+            set(Vote.objects.values_list('user_id', 'choice_id')),
+            {(self.users[0].id, self.second.id), (self.users[1].id, self.first.id)}
+        )
+        self.first.refresh_from_db()
+        self.second.refresh_from_db()
+        self.assertEqual((self.first.votes, self.second.votes), (1, 1))
+        stats = self.writer.stats()
+        self.assertEqual((stats['batches'], stats['votes_received'], stats['votes_written']), (1, 3, 2))
+
+    @override_settings(POLLS_VOTE_SHARDS=4, POLLS_SHARD_VOTE_RATE=0)
+    def test_sharded_question_counts_in_shards(self):
+        """Votes on a question with sharded counters go to its shard rows, and its results version moves on."""
+        Question.objects.filter(pk=self.question.pk).update(sharded_votes=True)
+        version = caching.results_version(self.question.id)
+        for user in self.users:
+            self.writer.submit(user.id, self.question.id, self.first.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.writer.flush()
+        self.first.refresh_from_db()
+        self.assertEqual((self.first.vote_count, self.first.votes), (0, 2))
+        self.assertTrue(ChoiceShard.objects.filter(choice=self.first).exists())
+        self.assertNotEqual(caching.results_version(self.question.id), version)
+
+    @override_settings(POLLS_VOTE_SHARDS=4, POLLS_SHARD_VOTE_RATE=1)
+    def test_busy_question_becomes_sharded(self):
+        """A batch over the shard vote rate switches its question to sharded counters, as the vote view does."""
+        cache.clear()
+        for user in self.users:
+            self.writer.submit(user.id, self.question.id, self.first.id)
+        self.writer.flush()
+        self.question.refresh_from_db()
+        self.assertTrue(self.question.sharded_votes)
+        self.assertEqual(self.question.get_results()['total_votes'], 2)
+
+    def test_changed_vote_moves_tally(self):
+        """A later batch updates the existing vote and moves the tally."""
+        self.writer.submit(self.users[0].id, self.question.id, self.first.id)
+        self.writer.flush()
+        self.writer.submit(self.users[0].id, self.question.id, self.second.id)
+        self.writer.flush()
+        self.first.refresh_from_db()
+        self.second.refresh_from_db()
+        self.assertEqual((self.first.votes, self.second.votes), (0, 1))
+        self.assertEqual(Vote.objects.get(user=self.users[0]).choice, self.second)
+
+    def test_flush_splits_batches(self):
+        """Votes beyond batch_size are written in more than one batch."""
+        self.writer.batch_size = 1
+        for user in self.users:
+            self.writer.submit(user.id, self.question.id, self.first.id)
+        self.writer.flush()
+        self.assertEqual(self.writer.stats()['batches'], 2)
+        self.assertEqual(Vote.objects.count(), 2)
+
+    def test_failed_batch_is_retried(self):
+        """A batch that fails once is written on the next attempt."""
+        self.writer.submit(self.users[0].id, self.question.id, self.first.id)
+        with mock.patch.object(Choice, 'add_vote', side_effect=[Exception('locked'), None]) as add_vote:
+            self.writer.flush()
+        self.assertEqual(add_vote.call_count, 2)
+        self.assertEqual(Vote.objects.get(user=self.users[0]).choice, self.first)
+        stats = self.writer.stats()
+        self.assertEqual((stats['retries'], stats['votes_written'], stats['votes_dropped']), (1, 1, 0))
+
+    def test_batch_is_dropped_and_counted_after_retries(self):
+        """A batch that keeps failing is dropped after the retries, and its votes are counted."""
+        for user in self.users:
+            self.writer.submit(user.id, self.question.id, self.first.id)
+        with mock.patch.object(Choice, 'add_vote', side_effect=Exception('locked')) as add_vote, \
+                self.assertLogs('polls.ingest', 'ERROR'):
+            self.writer.flush()
+        self.assertEqual(add_vote.call_count, 3)
+        self.assertFalse(Vote.objects.exists())
+        stats = self.writer.stats()
+        self.assertEqual(
+            (stats['votes_received'], stats['votes_written'], stats['votes_dropped'], stats['failed_batches']),
+            (2, 0, 2, 1)
+        )
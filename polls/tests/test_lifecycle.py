@@ -0,0 +1,111 @@
+"""Tests of the stored question status and the lifecycle scheduler."""
+import datetime
+import io
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from polls import caching
+from polls.lifecycle import LifecycleScheduler, apply_transitions, status_changed
+from polls.models import STATUS_CLOSED, STATUS_OPEN, STATUS_UPCOMING, Question
+
+
+def create_question(question_text, start, end):
+    """Create a question published `start` seconds from now and closing `end` seconds from now."""
+    now = timezone.now()
+    return Question.objects.create(question_text=question_text,
+                                   pub_date=now + datetime.timedelta(seconds=start),
+                                   end_date=now + datetime.timedelta(seconds=end))
+
+
+class QuestionStatusTests(TestCase):
+    """Tests for the status stored on save and read by the model methods."""
+
+    def test_status_stored_on_save(self):
+        """Saving a question stores the status of its dates."""
+        self.assertEqual(create_question("Upcoming", 60, 120).status, STATUS_UPCOMING)
+        self.assertEqual(create_question("Open", -60, 60).status, STATUS_OPEN)
+        self.assertEqual(create_question("Closed", -120, -60).status, STATUS_CLOSED)
+
+    def test_methods_fall_back_to_dates_when_status_is_stale(self):
+        """can_vote() and is_published() follow the dates once a transition is due but not applied."""
+        question = create_question("Stale", 60, 120)
+        Question.objects.filter(pk=question.pk).update(pub_date=timezone.now() - datetime.timedelta(seconds=1))
+        question.refresh_from_db()
+        self.assertEqual(question.status, STATUS_UPCOMING)
+        self.assertTrue(question.is_published())
+        self.assertTrue(question.can_vote())
+
+
+class ApplyTransitionsTests(TestCase):
+    """Tests for apply_transitions."""
+
+    def setUp(self):
+        """Listen to status_changed."""
+        self.changes = []
+
+        def listener(question_ids, old_status, status, **kwargs):
+            self.changes.append((sorted(question_ids), old_status, status))
+        status_changed.connect(listener, sender=Question, weak=False)
+        self.addCleanup(status_changed.disconnect, listener, sender=Question)
+
+    def test_transitions_at_boundaries(self):
+        """Questions open at pub_date and close just after end_date, sending one signal per kind."""
+        first = create_question("First", 60, 120)
+        second = Question.objects.create(question_text="Second", pub_date=first.pub_date,
+                                         end_date=first.end_date + datetime.timedelta(seconds=60))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(apply_transitions(first.pub_date - datetime.timedelta(microseconds=1)), 0)
+            self.assertEqual(apply_transitions(first.pub_date), 2)
+        self.assertEqual(self.changes, [([first.pk, second.pk], STATUS_UPCOMING, STATUS_OPEN)])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(apply_transitions(first.end_date), 0)
+            self.assertEqual(apply_transitions(first.end_date + datetime.timedelta(microseconds=1)), 1)
+        self.assertEqual(self.changes[-1], ([first.pk], STATUS_OPEN, STATUS_CLOSED))
+
+    def test_transition_invalidates_index(self):
+        """A status change bumps the index cache version."""
+        question = create_question("Question", 60, 120)
+        version = caching.index_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            apply_transitions(question.pub_date)
+        self.assertNotEqual(caching.index_version(), version)
+
+    def test_command_once(self):
+        """run_lifecycle --once stores the status of stale questions."""
+        question = create_question("Question", 60, 120)
+        Question.objects.filter(pk=question.pk).update(pub_date=timezone.now() - datetime.timedelta(seconds=1))
+        out = io.StringIO()
+        call_command('run_lifecycle', '--once', stdout=out)
+        question.refresh_from_db()
+        self.assertEqual(question.status, STATUS_OPEN)
+        self.assertIn('1 questions', out.getvalue())
+
+
+class LifecycleSchedulerTests(TestCase):
+    """Tests for the min-heap scheduler."""
+
+    def test_run_pending_in_due_order(self):
+        """Transitions inside the window are applied when due and opened questions are scheduled to close."""
+        now = timezone.now()
+        scheduler = LifecycleScheduler(horizon=600)
+        question = create_question("Question", 60, 120)
+        create_question("Later", 3600, 7200)
+        scheduler.run_pending(now)
+        self.assertEqual(scheduler.next_due(), question.pub_date)
+        self.assertEqual(scheduler.run_pending(question.pub_date - datetime.timedelta(seconds=1)), 0)
+        self.assertEqual(scheduler.run_pending(question.pub_date), 1)
+        self.assertEqual(scheduler.next_due(), question.end_date + datetime.timedelta(microseconds=1))
+        self.assertEqual(scheduler.run_pending(question.end_date + datetime.timedelta(seconds=1)), 1)
+        question.refresh_from_db()
+        self.assertEqual(question.status, STATUS_CLOSED)
+
+    def test_saved_question_is_scheduled(self):
+        """A question saved after the heap is loaded is scheduled when due inside the window."""
+        scheduler = LifecycleScheduler(horizon=600)
+        scheduler.run_pending(timezone.now())
+        self.assertEqual(scheduler.next_due(), scheduler._loaded_until)
+        question = create_question("Question", 60, 120)
+        scheduler.schedule(question)
+        self.assertEqual(scheduler.next_due(), question.pub_date)
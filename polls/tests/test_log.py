@@ -0,0 +1,90 @@
+"""Tests of the queued log handler and the JSON log format."""
+import json
+import logging
+
+from django.test import TestCase
+from django.urls import reverse
+
+from polls import log
+
+
+class ListHandler(logging.Handler):
+    """Keep the handled records in a list."""
+
+    def __init__(self):
+        """Start with no records."""
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        """Keep `record`."""
+        self.records.append(record)
+
+
+class BackgroundQueueHandlerTests(TestCase):
+    """Tests for BackgroundQueueHandler."""
+
+    def test_records_reach_the_handlers(self):
+        """Records queued in the calling thread are written by the listener, with lazy arguments formatted."""
+        target = ListHandler()
+        handler = log.BackgroundQueueHandler([target])
+        logger = logging.getLogger('polls.tests.queue')
+        logger.addHandler(handler)
+        logger.propagate = False
+        try:
+            logger.warning('Vote %s for question %s', 3, 7)
+        finally:
+            logger.removeHandler(handler)
+            handler.close()
+        self.assertEqual([record.getMessage() for record in target.records], ['Vote 3 for question 7'])
+
+    def test_exception_reaches_the_formatter(self):
+        """The traceback of a logged exception is written out by the JSON formatter of the listener."""
+        target = ListHandler()
+        handler = log.BackgroundQueueHandler([target])
+        logger = logging.getLogger('polls.tests.queue')
+        logger.addHandler(handler)
+        logger.propagate = False
+        try:
+            try:
+                raise ValueError('bad vote')
+            except ValueError:
+                logger.exception('Vote %s failed', 3)
+        finally:
+            logger.removeHandler(handler)
+            handler.close()
+        data = json.loads(log.JsonFormatter().format(target.records[0]))
+        self.assertEqual(data['message'], 'Vote 3 failed')
+        self.assertIn('ValueError: bad vote', data['exception'])
+
+    def test_full_queue_drops_records(self):
+        """A record that does not fit in the queue is dropped instead of blocking."""
+        handler = log.BackgroundQueueHandler([ListHandler()], queue_size=1)
+        handler.listener = object()  # as if started, so nothing drains the queue
+        record = logging.LogRecord('polls', logging.INFO, __file__, 1, 'message', None, None)
+        handler.enqueue(record)
+        handler.enqueue(record)
+        self.assertEqual(handler.dropped, 1)
+
+
+class JsonFormatterTests(TestCase):
+    """Tests for the request fields and the JSON formatter."""
+
+    def test_request_fields(self):
+        """A record inside a request carries its id and the milliseconds since it started."""
+        token = log.start_request('abc123')
+        try:
+            record = logging.LogRecord('polls', logging.INFO, __file__, 1, 'Voted %s', (1,), None)
+            log.RequestContextFilter().filter(record)
+        finally:
+            log.end_request(token)
+        data = json.loads(log.JsonFormatter().format(record))
+        self.assertEqual(data['message'], 'Voted 1')
+        self.assertEqual(data['request_id'], 'abc123')
+        self.assertGreaterEqual(data['latency_ms'], 0)
+
+    def test_response_has_request_id(self):
+        """The response carries the request id sent by the client, or a new one."""
+        response = self.client.get(reverse('polls:index'), HTTP_X_REQUEST_ID='from-proxy')
+        self.assertEqual(response['X-Request-ID'], 'from-proxy')
+        self.assertEqual(len(self.client.get(reverse('polls:index'))['X-Request-ID']), 32)
@@ -0,0 +1,74 @@
+"""Tests of the keyset pagination of the index and of questions.json."""
+import datetime
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from polls.models import Question
+from polls.pagination import decode_cursor, encode_cursor
+
+
+class KeysetPaginationTests(TestCase):
+    """Tests for paging through questions with cursors."""
+
+    def setUp(self):
+        """Create seven published questions, three of them sharing a pub_date, and an upcoming one."""
+        cache.clear()
+        now = timezone.now()
+        self.shared = now - datetime.timedelta(days=3)
+        for n in range(7):
+            pub_date = self.shared if n in (2, 3, 4) else now - datetime.timedelta(days=7 - n)
+            Question.objects.create(question_text=f"Question {n}", pub_date=pub_date,
+                                    end_date=now + datetime.timedelta(days=1 if n % 2 else -1))
+        Question.objects.create(question_text="Upcoming", pub_date=now + datetime.timedelta(days=1),
+                                end_date=now + datetime.timedelta(days=2))
+
+    def walk(self, **params):
+        """Return: the question texts of every page of questions.json, page by page."""
+        pages, cursor = [], ''
+        while True:
+            data = self.client.get(reverse('polls:questions_json'), {**params, 'cursor': cursor}).json()
+            pages.append([question['question_text'] for question in data['questions']])
+            cursor = data['next_cursor']
+            if not cursor:
+                return pages
+
+    def test_cursor_round_trip(self):
+        """A cursor holds the pub_date and id of the last question of a page."""
+        question = Question.objects.first()
+        self.assertEqual(decode_cursor(encode_cursor(question)), (question.pub_date, question.pk))
+        with self.assertRaises(ValueError):
+            decode_cursor('not a cursor')
+
+    def test_pages_cover_every_question_once(self):
+        """Pages are newest first, with ties on pub_date broken by id, and skip nothing."""
+        self.assertEqual(self.walk(limit=2), [
+            ["Question 6", "Question 5"], ["Question 4", "Question 3"],
+            ["Question 2", "Question 1"], ["Question 0"],
+        ])
+
+    def test_status_filter(self):
+        """The status parameter lists the open, closed or upcoming questions."""
+        self.assertEqual(self.walk(limit=2, status='open'), [["Question 5", "Question 3"], ["Question 1"]])
+        self.assertEqual(self.walk(status='upcoming'), [["Upcoming"]])
+
+    def test_invalid_parameters(self):
+        """An unknown status, a bad cursor or limit is a 400."""
+        url = reverse('polls:questions_json')
+        self.assertEqual(self.client.get(url, {'status': 'archived'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'cursor': 'bogus'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'limit': '1000'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('polls:index'), {'cursor': 'bogus'}).status_code, 400)
+
+    def test_index_links_to_older_polls(self):
+        """The index shows the newest five questions and links to the next page."""
+        response = self.client.get(reverse('polls:index'))
+        self.assertEqual(len(response.context['latest_question_list']), 5)
+        cursor = response.context['latest_question_list'].next_cursor
+        self.assertContains(response, f'cursor={cursor}')
+        response = self.client.get(reverse('polls:index'), {'cursor': cursor})
+        self.assertEqual([question.question_text for question in response.context['latest_question_list']],
+                         ["Question 1", "Question 0"])
+        self.assertContains(response, "Newest polls")
@@ -0,0 +1,48 @@
+"""Tests of the request profiling middleware and statistics endpoint."""
+import datetime
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.urls import reverse
+
+from polls.middleware import view_stats
+from polls.models import Question
+
+
+class RequestProfileTests(TestCase):
+    """Tests for RequestProfileMiddleware and the profile_stats view."""
+
+    def setUp(self):
+        """Start without samples and with a question to look at."""
+        view_stats.clear()
+        self.question = Question.objects.create(question_text="Profiled question",
+                                                pub_date=timezone.now() - datetime.timedelta(days=1),
+                                                end_date=timezone.now() + datetime.timedelta(days=1))
+
+    def test_requests_are_recorded_per_view(self):
+        """Each request adds a sample with its query count to its view."""
+        self.client.get(reverse('polls:results', args=(self.question.id,)))
+        stats = view_stats.snapshot()['polls:results']
+        self.assertEqual(stats['requests'], 1)
+        self.assertGreater(stats['max_queries'], 0)
+        self.assertEqual(sum(stats['histogram'].values()), 1)
+
+    @override_settings(POLLS_SLOW_REQUEST_QUERIES=0)
+    def test_request_over_threshold_is_logged(self):
+        """A request over the query threshold is logged with its slowest query."""
+        with self.assertLogs('polls.middleware', 'WARNING') as logs:
+            self.client.get(reverse('polls:results', args=(self.question.id,)))
+        self.assertIn('polls:results', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
+
+    def test_stats_endpoint_is_admin_only(self):
+        """Only staff can read the statistics."""
+        User.objects.create_user(username="user", password="Vote4me!")
+        User.objects.create_user(username="staff", password="Vote4me!", is_staff=True)
+        self.client.login(username="user", password="Vote4me!")
+        self.assertEqual(self.client.get(reverse('profile_stats')).status_code, 302)
+        self.client.login(username="staff", password="Vote4me!")
+        response = self.client.get(reverse('profile_stats'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('views', response.json())
@@ -0,0 +1,187 @@
+"""Testing the Question Results View."""
+import datetime
+import tempfile
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from django.urls import reverse
+
+from polls import caching
+from polls.models import Question, Choice, Vote
+
+
+def create_question(question_text, choices):
+    """Create an open question with the given number of `choices`."""
+    pub_date = timezone.now() - datetime.timedelta(days=1)
+    end_date = timezone.now() + datetime.timedelta(days=5)
+    question = Question.objects.create(question_text=question_text, pub_date=pub_date, end_date=end_date)
+    for n in range(1, choices + 1):
+        Choice.objects.create(question=question, choice_text=f"Choice {n}")
+    return question
+
+
+class QuestionResultsViewTests(TestCase):
+    """Tests for Question Results View."""
+
+    def setUp(self):
+        """Start every test with an empty cache."""
+        cache.clear()
+
+    def test_results_show_totals_and_percent(self):
+        """The results page shows the votes, percentages and total of each choice."""
+        question = create_question("Results question.", choices=2)
+        first = question.choice_set.order_by('id').first()
+        for n in range(3):
+            user = User.objects.create_user(username=f"voter{n}", password="Vote4me!")
+            Vote.objects.create(user=user, choice=first)
+        Choice.rebuild_vote_counts()
+        response = self.client.get(reverse('polls:results', args=(question.id,)))
+        self.assertEqual(response.context['results']['total_votes'], 3)
+        self.assertEqual(
+            [(c['votes'], c['percent']) for c in response.context['results']['choices']],
+            [(3, 100.0), (0, 0.0)]
+        )
+        self.assertContains(response, "100.0%")
+
+    def test_results_query_count_does_not_grow_with_choices(self):
+        """The results page uses a fixed number of queries whatever the number of choices."""
+        small = create_question("Small question.", choices=2)
+        large = create_question("Large question.", choices=20)
+        with self.assertNumQueries(2):
+            self.client.get(reverse('polls:results', args=(small.id,)))
+        with self.assertNumQueries(2):
+            self.client.get(reverse('polls:results', args=(large.id,)))
+
+
+class ResultsCacheTests(TestCase):
+    """Tests for the versioned results cache."""
+
+    def setUp(self):
+        """Start every test with an empty cache and zero counters."""
+        cache.clear()
+        caching.reset_cache_stats()
+        self.question = create_question("Cached question.", choices=2)
+        self.user = User.objects.create_user(username="voter", password="Vote4me!")
+
+    def test_second_request_hits_cache(self):
+        """The second results request is served from the cache without a choice query."""
+        url = reverse('polls:results', args=(self.question.id,))
+        self.client.get(url)
+        with self.assertNumQueries(1):
+            self.client.get(url)
+        self.assertEqual(caching.cache_stats(), {'hits': 1, 'misses': 1})
+
+    def test_vote_invalidates_cache(self):
+        """Recording a vote bumps the version so the next request sees the new total."""
+        url = reverse('polls:results', args=(self.question.id,))
+        self.client.get(url)
+        self.client.login(username="voter", password="Vote4me!")
+        choice = self.question.choice_set.first()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('polls:vote', args=(self.question.id,)), {'choice': choice.id})
+        response = self.client.get(url)
+        self.assertEqual(response.context['results']['total_votes'], 1)
+
+    def test_choice_edit_invalidates_cache(self):
+        """Editing a choice, as the admin does, bumps the results version."""
+        version = caching.results_version(self.question.id)
+        choice = self.question.choice_set.first()
+        choice.choice_text = "Renamed"
+        with self.captureOnCommitCallbacks(execute=True):
+            choice.save()
+        self.assertNotEqual(caching.results_version(self.question.id), version)
+
+    def test_choice_edit_bumps_version_on_commit(self):
+        """The version stays until the edit commits, so no reader caches the old rows under the new one."""
+        version = caching.results_version(self.question.id)
+        with self.captureOnCommitCallbacks() as callbacks:
+            Choice.objects.create(question=self.question, choice_text="Added")
+            self.assertEqual(caching.results_version(self.question.id), version)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(caching.results_version(self.question.id), version)
+
+    def test_file_based_cache(self):
+        """The results cache also works with the file-based backend."""
+        with tempfile.TemporaryDirectory() as location:
+            backend = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}
+            with self.settings(CACHES={'default': backend}):
+                caching.get_results(self.question)
+                caching.get_results(self.question)
+                caching.bump_results_version(self.question.id)
+                caching.get_results(self.question)
+        self.assertEqual(caching.cache_stats(), {'hits': 1, 'misses': 2})
+
+
+class ResultsJsonTests(TestCase):
+    """Tests for the JSON results API."""
+
+    def setUp(self):
+        """Start with an empty cache and two questions."""
+        cache.clear()
+        self.first = create_question("First JSON question.", choices=2)
+        self.second = create_question("Second JSON question.", choices=3)
+
+    def test_results_json(self):
+        """The JSON results have the choices, counts and total of the question."""
+        response = self.client.get(reverse('polls:results_json', args=(self.first.id,)))
+        data = response.json()
+        self.assertEqual(data['id'], self.first.id)
+        self.assertEqual(data['total_votes'], 0)
+        self.assertEqual([c['choice_text'] for c in data['choices']], ["Choice 1", "Choice 2"])
+        self.assertTrue(response.has_header('ETag'))
+
+    def test_matching_etag_returns_304_without_queries(self):
+        """A request with the current ETag gets a 304 and no database work."""
+        url = reverse('polls:results_json', args=(self.first.id,))
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_new_vote_changes_etag(self):
+        """Bumping the results version makes the old ETag stale."""
+        url = reverse('polls:results_json', args=(self.first.id,))
+        etag = self.client.get(url)['ETag']
+        caching.bump_results_version(self.first.id)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_unknown_question_is_404(self):
+        """Results of a question that does not exist are a 404."""
+        response = self.client.get(reverse('polls:results_json', args=(self.second.id + 100,)))
+        self.assertEqual(response.status_code, 404)
+
+    def test_unknown_question_gets_no_cache_key(self):
+        """A request for a question that does not exist is a 404 without a version key in the cache."""
+        missing_id = self.second.id + 100
+        response = self.client.get(reverse('polls:results_json', args=(missing_id,)),
+                                   HTTP_IF_NONE_MATCH='"stale"')
+        self.assertEqual(response.status_code, 404)
+        self.assertIsNone(cache.get(f'polls:results-version:{missing_id}'))
+
+    def test_version_keys_expire(self):
+        """Version keys are stored with the finite POLLS_CACHE_VERSION_TIMEOUT."""
+        add = mock.Mock(wraps=cache.add)
+        with self.settings(POLLS_CACHE_VERSION_TIMEOUT=60), mock.patch.object(caching.cache, 'add', add):
+            caching.results_version(self.first.id)
+        self.assertEqual(add.call_args.args[2], 60)
+
+    def test_batch_results_in_one_query(self):
+        """The batch results of many questions are computed in one query, after one looking up the unknown id."""
+        missing_id = self.second.id + 100
+        caching.results_versions([self.first.id, self.second.id])
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('polls:batch_results_json'),
+                                       {'ids': f'{self.first.id},{self.second.id},{missing_id}'})
+        data = response.json()
+        self.assertEqual([r['id'] for r in data['results']], [self.first.id, self.second.id])
+        self.assertEqual([len(r['choices']) for r in data['results']], [2, 3])
+        self.assertEqual(data['missing'], [missing_id])
+
+    def test_batch_results_rejects_bad_ids(self):
+        """Ids that are not numbers are a 400."""
+        response = self.client.get(reverse('polls:batch_results_json'), {'ids': '1,abc'})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,137 @@
+"""Tests of the read replica routing."""
+import datetime
+
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.cache import cache
+from django.db import connections
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
+
+from polls import routers
+from polls.models import Question, Choice
+
+REPLICAS = ['replica1', 'replica2']
+
+
+@override_settings(POLLS_READ_DATABASES=REPLICAS)
+class ReadReplicaRouterTests(TestCase):
+    """Tests for ReadReplicaRouter and ReplicaRoutingMiddleware."""
+
+    def setUp(self):
+        """Set up a router and a middleware around a view that routes one read."""
+        self.router = routers.ReadReplicaRouter()
+        self.middleware = routers.ReplicaRoutingMiddleware(self.handle)
+
+    def handle(self, request):
+        """Stand in for the request handler: run process_view, then route a poll model read."""
+        self.middleware.process_view(request, request.resolver_match.func, (), {})
+        return self.router.db_for_read(Question)
+
+    def read_database(self, path, session=None):
+        """Return: the database a poll model read goes to while handling a GET of `path`."""
+        request = RequestFactory().get(path)
+        request.resolver_match = resolve(path)
+        request.session = session if session is not None else SessionStore()
+        return self.middleware(request)
+
+    def test_read_views_use_replica(self):
+        """Index, detail and results reads go to a replica."""
+        for path in (reverse('polls:index'), reverse('polls:detail', args=(1,)),
+                     reverse('polls:results', args=(1,))):
+            self.assertIn(self.read_database(path), ['replica1', 'replica2'])
+
+    def test_other_views_use_primary(self):
+        """Reads outside the replica views and outside requests go to the primary."""
+        self.assertEqual(self.read_database(reverse('polls:vote', args=(1,))), 'default')
+        self.assertEqual(self.router.db_for_read(Question), 'default')
+
+    def test_writes_use_primary(self):
+        """Writes go to the primary even for objects read from a replica."""
+        question = Question(question_text="Replica question")
+        question._state.db = 'replica1'
+        self.assertEqual(self.router.db_for_write(Question, instance=question), 'default')
+
+    def test_vote_pins_user_to_primary(self):
+        """After voting, the user's reads go to the primary."""
+        User.objects.create_user(username="voter", password="Vote4me!")
+        question = Question.objects.create(question_text="Pinned question",
+                                           pub_date=timezone.now() - datetime.timedelta(days=1),
+                                           end_date=timezone.now() + datetime.timedelta(days=1))
+        choice = Choice.objects.create(question=question, choice_text="Choice")
+        self.client.login(username="voter", password="Vote4me!")
+        self.client.post(reverse('polls:vote', args=(question.id,)), {'choice': choice.id})
+        session = self.client.session
+        self.assertIn(routers.PIN_SESSION_KEY, session)
+        self.assertEqual(self.read_database(reverse('polls:results', args=(question.id,)), session), 'default')
+
+
+@override_settings(POLLS_READ_DATABASES=REPLICAS)
+class ReplicaReadTests(TransactionTestCase):
+    """Tests of which database serves the reads of whole requests, with test mirrors as replicas.
+
+    The mirrors are other connections to the test database, so the data must be committed.
+    """
+
+    # Every alias once setUpClass() has added the mirrors; the test runner, which looks
+    # before that, only sets up and checks the default database.
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        """Declare the replicas as mirrors of the test database before the test databases are checked."""
+        for alias in REPLICAS:
+            connections.settings[alias] = {**connections['default'].settings_dict, 'TEST': {'MIRROR': 'default'}}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Close and forget the mirrors."""
+        super().tearDownClass()
+        for alias in REPLICAS:
+            connections[alias].close()
+            del connections[alias]
+            del connections.settings[alias]
+
+    def setUp(self):
+        """Set up an open question with a choice and an empty cache."""
+        cache.clear()
+        self.question = Question.objects.create(question_text="Replica question",
+                                                pub_date=timezone.now() - datetime.timedelta(days=1),
+                                                end_date=timezone.now() + datetime.timedelta(days=1))
+        Choice.objects.create(question=self.question, choice_text="Choice")
+
+    def get(self, path):
+        """Return: the SQL run on each database while getting `path`, by alias."""
+        contexts = {alias: CaptureQueriesContext(connections[alias]) for alias in self.databases}
+        for context in contexts.values():
+            context.__enter__()
+        try:
+            self.client.get(path)
+        finally:
+            for context in contexts.values():
+                context.__exit__(None, None, None)
+        return {alias: [query['sql'] for query in context.captured_queries] for alias, context in contexts.items()}
+
+    def test_question_read_from_replica(self):
+        """The detail page reads the question and its choices from a replica."""
+        queries = self.get(reverse('polls:detail', args=(self.question.id,)))
+        replica_sql = queries['replica1'] + queries['replica2']
+        self.assertTrue(any('"polls_question"' in sql for sql in replica_sql))
+        self.assertFalse(any('"polls_question"' in sql for sql in queries['default']))
+
+    def test_cached_results_read_from_primary(self):
+        """The results that go into the cache are read from the primary, the question from a replica."""
+        queries = self.get(reverse('polls:results', args=(self.question.id,)))
+        replica_sql = queries['replica1'] + queries['replica2']
+        self.assertTrue(any('"polls_question"' in sql for sql in replica_sql))
+        self.assertFalse(any('"polls_choice"' in sql for sql in replica_sql))
+        self.assertTrue(any('"polls_choice"' in sql for sql in queries['default']))
+
+    def test_results_json_read_from_primary(self):
+        """The JSON results, also cached, are read from the primary."""
+        queries = self.get(reverse('polls:results_json', args=(self.question.id,)))
+        self.assertTrue(any('"polls_choice"' in sql for sql in queries['default']))
+        self.assertFalse(any('"polls_choice"' in sql for sql in queries['replica1'] + queries['replica2']))
@@ -0,0 +1,128 @@
+"""Tests of the full-text search of questions and choices."""
+import datetime
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from polls import search
+from polls.models import Choice, Question
+
+
+class SearchBackendMixin:
+    """Tests run against each search backend.
+
+    The test classes that mix this in define make_backend(), which returns the backend under test.
+    """
+
+    def setUp(self):
+        """Create questions whose words appear in their text or only in their choices."""
+        cache.clear()
+        now = timezone.now()
+        self.pizza = Question.objects.create(question_text="Favourite pizza topping?", pub_date=now)
+        Choice.objects.create(question=self.pizza, choice_text="Pineapple")
+        Choice.objects.create(question=self.pizza, choice_text="Mushroom")
+        self.fruit = Question.objects.create(question_text="Best fruit?", pub_date=now)
+        Choice.objects.create(question=self.fruit, choice_text="Pineapple")
+        Choice.objects.create(question=self.fruit, choice_text="Mango")
+        self.later = Question.objects.create(question_text="Pineapple on pizza?",
+                                             pub_date=now + datetime.timedelta(days=1))
+        self.backend = self.make_backend()
+
+    def test_ranked_prefix_matches(self):
+        """Prefixes match whole words, and a match in the question text ranks above one in a choice."""
+        ranked = self.backend.search('pineap')
+        self.assertEqual(ranked[0], self.later.pk)
+        self.assertCountEqual(ranked[1:], [self.pizza.pk, self.fruit.pk])
+        self.assertEqual(self.backend.search('piz pine', now=timezone.now()), [self.pizza.pk])
+        self.assertEqual(self.backend.search('"*)('), [])
+
+    def test_index_follows_saves_and_deletes(self):
+        """Saved and deleted questions and choices update the index."""
+        self.backend.search('mango')
+        choice = self.fruit.choice_set.get(choice_text="Mango")
+        choice.choice_text = "Papaya"
+        choice.save()
+        self.assertEqual(self.backend.search('mango'), [])
+        self.assertEqual(self.backend.search('papaya'), [self.fruit.pk])
+        self.fruit.delete()
+        self.assertEqual(self.backend.search('papaya'), [])
+
+    def test_filter(self):
+        """filter() narrows a queryset to the matching questions."""
+        queryset = self.backend.filter(Question.objects.all(), 'mush')
+        self.assertEqual(list(queryset), [self.pizza])
+        self.assertEqual(self.backend.filter(queryset, '  '), queryset)
+
+
+class FtsSearchBackendTests(SearchBackendMixin, TestCase):
+    """Tests for the SQLite FTS5 backend."""
+
+    def make_backend(self):
+        """Return: the FTS5 backend, after checking that the migrations made its table."""
+        self.assertTrue(search.fts_table_exists())
+        self.assertIsInstance(search.get_backend(), search.FtsSearchBackend)
+        return search.get_backend()
+
+    def test_rebuild(self):
+        """A rebuild indexes every question again."""
+        self.assertEqual(self.backend.rebuild(), 3)
+        self.assertEqual(self.backend.search('mango'), [self.fruit.pk])
+
+
+class InvertedIndexBackendTests(SearchBackendMixin, TestCase):
+    """Tests for the in-process inverted index."""
+
+    def make_backend(self):
+        """Return: a new in-process index, made the configured backend so the signals update it."""
+        patcher = mock.patch.object(search, '_backend', search.InvertedIndexBackend())
+        self.addCleanup(patcher.stop)
+        return patcher.start()
+
+    def test_other_process_change_rebuilds(self):
+        """A bumped version, as left by another process, makes the index rebuild before searching."""
+        self.backend.search('mango')
+        Question.objects.filter(pk=self.fruit.pk).update(question_text="Best berry?")
+        cache.set(search.InvertedIndexBackend.VERSION_KEY, 'other')
+        self.assertEqual(self.backend.search('berry'), [self.fruit.pk])
+
+    def test_unbuilt_index_bumps_on_commit(self):
+        """A change indexed by a process without an index still makes the others rebuild, once it commits."""
+        self.backend.search('mango')
+        other = search.InvertedIndexBackend()
+        Question.objects.filter(pk=self.fruit.pk).update(question_text="Best berry?")
+        with self.captureOnCommitCallbacks() as callbacks:
+            other.update([self.fruit.pk])
+        self.assertEqual(self.backend.search('berry'), [])
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.backend.search('berry'), [self.fruit.pk])
+
+
+class SearchViewTests(TestCase):
+    """Tests for the public search page and the admin search."""
+
+    def setUp(self):
+        """Create a published and an upcoming question."""
+        now = timezone.now()
+        self.published = Question.objects.create(question_text="Which editor?", pub_date=now,
+                                                 end_date=now + datetime.timedelta(days=1))
+        Choice.objects.create(question=self.published, choice_text="Vim")
+        Question.objects.create(question_text="Which editor next year?", pub_date=now + datetime.timedelta(days=1))
+
+    def test_search_page_lists_published_matches(self):
+        """The search page lists the published questions matching the query."""
+        response = self.client.get(reverse('polls:search'), {'q': 'edit'})
+        self.assertQuerysetEqual(response.context['questions'], [self.published])
+        self.assertContains(response, reverse('polls:detail', args=(self.published.id,)))
+        self.assertContains(self.client.get(reverse('polls:search'), {'q': 'emacs'}), 'No polls match')
+
+    def test_admin_search(self):
+        """The admin search box searches the choices too."""
+        admin = User.objects.create_superuser(username="admin", password="Admin4me!")
+        self.client.force_login(admin)
+        response = self.client.get(reverse('admin:polls_question_changelist'), {'q': 'vim'})
+        self.assertQuerysetEqual(response.context['cl'].result_list, [self.published])
@@ -0,0 +1,98 @@
+"""Tests of the static file pipeline."""
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from django.test import TestCase, override_settings
+from django.utils.http import http_date
+
+from polls import staticfiles
+
+STATIC_ROOT = tempfile.mkdtemp()
+CSS = b'body { background: white; }\n' * 40
+
+
+@override_settings(STATIC_ROOT=STATIC_ROOT, STATIC_URL='/static/', POLLS_STATIC_MAX_AGE=60)
+class StaticFilesMiddlewareTests(TestCase):
+    """Tests for serving the collected files."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Collect a stylesheet under its original and hashed names, with compressed copies of the hashed one."""
+        super().setUpClass()
+        os.makedirs(os.path.join(STATIC_ROOT, 'polls'), exist_ok=True)
+        for name in ('style.css', 'style.0123abcd.css'):
+            with open(os.path.join(STATIC_ROOT, 'polls', name), 'wb') as stylesheet:
+                stylesheet.write(CSS)
+        cls.written = staticfiles.compress_file(os.path.join(STATIC_ROOT, 'polls', 'style.0123abcd.css'))
+        with open(os.path.join(STATIC_ROOT, 'staticfiles.json'), 'w') as manifest:
+            json.dump({'paths': {'polls/style.css': 'polls/style.0123abcd.css'}, 'version': '1.0'}, manifest)
+
+    @classmethod
+    def tearDownClass(cls):
+        """Remove the collected files."""
+        shutil.rmtree(STATIC_ROOT)
+        super().tearDownClass()
+
+    def test_hashed_file_is_immutable_and_compressed(self):
+        """A hashed file is cached for a year and sent in the encoding the client accepts."""
+        response = self.client.get('/static/polls/style.0123abcd.css', HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Cache-Control'], staticfiles.IMMUTABLE_CACHE_CONTROL)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), CSS)
+        self.assertEqual(b''.join(self.client.get('/static/polls/style.0123abcd.css').streaming_content), CSS)
+
+    @unittest.skipIf(staticfiles.brotli is None, 'brotli is not installed')
+    def test_brotli_preferred(self):
+        """A client that accepts brotli gets the brotli copy."""
+        response = self.client.get('/static/polls/style.0123abcd.css', HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+
+    def test_unhashed_file_and_revalidation(self):
+        """A file without a hash is cached briefly, and answers 304 when it has not changed."""
+        response = self.client.get('/static/polls/style.css')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=60')
+        self.assertNotIn('Content-Encoding', response)
+        response = self.client.get('/static/polls/style.css', HTTP_IF_MODIFIED_SINCE=http_date())
+        self.assertEqual(response.status_code, 304)
+
+    def test_missing_and_outside_files_pass_on(self):
+        """Files that are not collected, or outside STATIC_ROOT, are left to the views."""
+        self.assertEqual(self.client.get('/static/polls/missing.css').status_code, 404)
+        self.assertEqual(self.client.get('/static/../polls/style.css').status_code, 404)
+
+
+class CompressAndVariantTests(TestCase):
+    """Tests for the compressed copies and the image variants."""
+
+    def setUp(self):
+        """Make a scratch directory."""
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_small_files_are_not_compressed(self):
+        """A file under MIN_COMPRESS_SIZE gets no compressed copies."""
+        path = os.path.join(self.directory, 'tiny.css')
+        with open(path, 'w') as tiny:
+            tiny.write('a{}')
+        self.assertEqual(staticfiles.compress_file(path), [])
+
+    def test_image_variants(self):
+        """Narrower widths get JPEG and WebP variants, and an image within the widths a full-size WebP."""
+        try:
+            from PIL import Image
+        except ImportError:
+            self.skipTest('Pillow is not installed')
+        path = os.path.join(self.directory, 'bg.jpg')
+        Image.new('RGB', (800, 400), 'white').save(path)
+        written = staticfiles.image_variants(path, [400, 1600])
+        self.assertEqual([os.path.basename(name) for name in written], ['bg-400w.jpg', 'bg-400w.webp', 'bg.webp'])
+        with Image.open(written[0]) as variant:
+            self.assertEqual(variant.size, (400, 200))
+        self.assertFalse(staticfiles.is_source_image('bg-400w.jpg'))
+        self.assertTrue(staticfiles.is_source_image('bg.jpg'))
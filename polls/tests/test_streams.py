@@ -0,0 +1,103 @@
+"""Tests of the server-sent events results stream."""
+import asyncio
+import datetime
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.test import TransactionTestCase, override_settings
+from django.utils import timezone
+
+from polls import caching, streams
+from polls.benchmark.streams import StreamClient, run_stream_load
+from polls.models import Question, Choice
+from polls.streams import ResultsBroadcaster, stream_application
+
+
+@override_settings(POLLS_STREAM_MAX_RATE=100)
+class ResultsStreamTests(TransactionTestCase):
+    """Tests for the results stream and its shared broadcaster.
+
+    The stream reads from pool threads, so the test data must be committed.
+    """
+
+    def setUp(self):
+        """Set up a question with two choices."""
+        cache.clear()
+        self.question = Question.objects.create(question_text="Streamed question",
+                                                pub_date=timezone.now() - datetime.timedelta(days=1),
+                                                end_date=timezone.now() + datetime.timedelta(days=1))
+        Choice.objects.create(question=self.question, choice_text="First")
+        Choice.objects.create(question=self.question, choice_text="Second")
+
+    async def test_stream_pushes_new_results(self):
+        """Subscribers get the current results, then new results after a vote."""
+        report = await run_stream_load(self.question.id, subscribers=20, updates=2)
+        self.assertEqual(report['broadcaster_updates'], 2)
+
+    async def test_unknown_question_is_404(self):
+        """The stream of a question that does not exist is a 404."""
+        stop = asyncio.Event()
+        client = StreamClient(stop)
+        scope = {'type': 'http', 'method': 'GET', 'path': f'/polls/{self.question.id + 100}/stream/'}
+        await stream_application(None)(scope, client.receive, client.send)
+        self.assertEqual(client.status, 404)
+
+    async def test_other_paths_go_to_django(self):
+        """Requests for other paths are passed to the Django application."""
+        paths = []
+
+        async def django_application(scope, receive, send):
+            paths.append(scope['path'])
+
+        await stream_application(django_application)({'type': 'http', 'path': '/polls/'}, None, None)
+        self.assertEqual(paths, ['/polls/'])
+
+    @override_settings(POLLS_STREAM_MAX_RATE=2)
+    async def test_updates_are_coalesced(self):
+        """Many version bumps between two checks send one update."""
+        stop = asyncio.Event()
+        client = StreamClient(stop)
+        scope = {'type': 'http', 'method': 'GET', 'path': f'/polls/{self.question.id}/stream/'}
+        task = asyncio.ensure_future(stream_application(None)(scope, client.receive, client.send))
+        await client.connected.wait()
+        for _ in range(5):
+            await sync_to_async(caching.bump_results_version)(self.question.id)
+        await client.received.wait()
+        stop.set()
+        await task
+        self.assertEqual(client.events, 2)
+
+    async def test_broadcaster_is_forgotten_after_last_subscriber(self):
+        """The broadcaster of a question is removed when its last client disconnects."""
+        await run_stream_load(self.question.id, subscribers=3, updates=1)
+        self.assertNotIn(self.question.id, streams._broadcasters)
+
+    async def test_failed_check_is_retried(self):
+        """A check that raises is logged and the broadcaster keeps checking."""
+        broadcaster = ResultsBroadcaster(self.question.id, None, 0)
+        queue = broadcaster.subscribe()
+        outcomes = [Exception('cache down'), None]
+
+        async def check():
+            outcome = outcomes.pop(0)
+            if outcome is not None:
+                raise outcome
+            broadcaster.unsubscribe(queue)
+
+        with mock.patch.object(broadcaster, 'check', check), self.assertLogs('polls.streams', 'ERROR'):
+            await asyncio.wait_for(broadcaster.run(), timeout=5)
+        self.assertEqual((broadcaster.checks, broadcaster.errors), (2, 1))
+
+    async def test_stream_ends_when_broadcaster_stops(self):
+        """The stream of a client is closed if its broadcaster stops, instead of hanging."""
+        stop = asyncio.Event()
+        client = StreamClient(stop)
+        scope = {'type': 'http', 'method': 'GET', 'path': f'/polls/{self.question.id}/stream/'}
+        task = asyncio.ensure_future(stream_application(None)(scope, client.receive, client.send))
+        await client.connected.wait()
+        streams._broadcasters[self.question.id].task.cancel()
+        with self.assertLogs('polls.streams', 'WARNING'):
+            await asyncio.wait_for(task, timeout=5)
+        self.assertFalse(stop.is_set())
+        self.assertNotIn(self.question.id, streams._broadcasters)
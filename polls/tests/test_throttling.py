@@ -0,0 +1,127 @@
+"""Tests of the vote and login rate limiting."""
+import datetime
+import threading
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from polls import throttling
+from polls.models import Choice, Question
+
+
+class TakeTokenTests(TestCase):
+    """Tests for the cache token bucket."""
+
+    def setUp(self):
+        """Start from an empty cache."""
+        cache.clear()
+
+    def test_bucket_empties_and_refills(self):
+        """An empty bucket answers with the seconds until a token is free, and refills one token at a time."""
+        start = 6000.0
+        for _ in range(3):
+            self.assertEqual(throttling.take_token('bucket', 3, 60, now=start), 0)
+        # 3 tokens a minute come back one every 20 seconds.
+        self.assertEqual(throttling.take_token('bucket', 3, 60, now=start), 20)
+        self.assertEqual(throttling.take_token('bucket', 3, 60, now=start + 5), 15)
+        self.assertEqual(throttling.take_token('bucket', 3, 60, now=start + 20), 0)
+        self.assertEqual(throttling.take_token('bucket', 3, 60, now=start + 20), 20)
+
+    def test_bucket_refills_up_to_capacity(self):
+        """Tokens do not build up past the capacity however long the bucket is idle."""
+        start = 6000.0
+        self.assertEqual(throttling.take_token('bucket', 3, 60, now=start), 0)
+        for _ in range(3):
+            self.assertEqual(throttling.take_token('bucket', 3, 60, now=start + 3600), 0)
+        self.assertEqual(throttling.take_token('bucket', 3, 60, now=start + 3600), 20)
+
+    def test_concurrent_takes_never_overdraw(self):
+        """Threads taking from one bucket at once get exactly its tokens."""
+        taken = []
+        threads = [threading.Thread(target=lambda: taken.append(throttling.take_token('bucket', 5, 3600, now=1.0)))
+                   for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(taken.count(0), 5)
+
+    def test_refused_bucket_takes_from_none(self):
+        """When one bucket is empty, the tokens of the others are not taken."""
+        throttling.take_token('user', 1, 60, now=6000.0)
+        self.assertEqual(throttling.take_tokens(['ip', 'user'], 1, 60, now=6000.0), (60, 'user'))
+        self.assertEqual(throttling.take_token('ip', 1, 60, now=6000.0), 0)
+
+    def test_busy_lock_refuses(self):
+        """A bucket whose lock is held elsewhere is refused instead of taken without the lock."""
+        cache.add('bucket:lock', 1, throttling.LOCK_TIMEOUT)
+        self.assertEqual(throttling.take_token('bucket', 3, 60), throttling.LOCK_TIMEOUT)
+        cache.delete('bucket:lock')
+        self.assertEqual(throttling.take_token('bucket', 3, 60), 0)
+
+    def test_parse_rate(self):
+        """Rates are a count per second, minute, hour or day."""
+        self.assertEqual(throttling.parse_rate('30/m'), (30, 60))
+        self.assertEqual(throttling.parse_rate('1000/hour'), (1000, 3600))
+        self.assertIsNone(throttling.parse_rate(''))
+
+
+@override_settings(POLLS_THROTTLE_RATES={'polls:vote': '2/m', 'login': '2/m'})
+class ThrottleMiddlewareTests(TestCase):
+    """Tests for the 429 answers of ThrottleMiddleware."""
+
+    def setUp(self):
+        """Create a user and an open question, and clear the buckets and counters."""
+        cache.clear()
+        throttling.reset_throttle_stats()
+        self.user = User.objects.create_user(username="voter", password="Vote4me!")
+        self.question = Question.objects.create(question_text="Throttled?",
+                                                pub_date=timezone.now() - datetime.timedelta(days=1),
+                                                end_date=timezone.now() + datetime.timedelta(days=1))
+        self.choice = Choice.objects.create(question=self.question, choice_text="Yes")
+
+    def test_vote_throttled_before_view(self):
+        """The vote over the rate gets 429 with Retry-After after reading only the session."""
+        self.client.login(username="voter", password="Vote4me!")
+        url = reverse('polls:vote', args=(self.question.id,))
+        for _ in range(2):
+            self.assertEqual(self.client.post(url, {'choice': self.choice.id}).status_code, 302)
+        with self.assertNumQueries(1):
+            response = self.client.post(url, {'choice': self.choice.id})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(int(response['Retry-After']), 30)
+        self.assertEqual(throttling.throttle_stats(), {'polls:vote:ip': 1})
+
+    def test_vote_throttled_by_user_across_sessions(self):
+        """A logged in user shares one bucket across sessions and addresses."""
+        url = reverse('polls:vote', args=(self.question.id,))
+        for n in range(3):
+            client = Client()
+            client.login(username="voter", password="Vote4me!")
+            response = client.post(url, {'choice': self.choice.id}, REMOTE_ADDR=f'10.0.0.{n}')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(throttling.throttle_stats(), {'polls:vote:user': 1})
+
+    def test_login_throttled_by_username(self):
+        """Failed logins for one username are throttled even from different addresses."""
+        url = reverse('login')
+        for n in range(2):
+            self.client.post(url, {'username': "voter", 'password': "wrong"}, REMOTE_ADDR=f'10.0.0.{n}')
+        response = self.client.post(url, {'username': "voter", 'password': "wrong"}, REMOTE_ADDR='10.0.0.9')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(throttling.throttle_stats(), {'login:user': 1})
+
+    def test_login_form_not_throttled(self):
+        """Showing the login form uses up no token."""
+        for _ in range(5):
+            self.assertEqual(self.client.get(reverse('login')).status_code, 200)
+        response = self.client.post(reverse('login'), {'username': "voter", 'password': "Vote4me!"})
+        self.assertEqual(response.status_code, 302)
+
+    def test_other_views_not_throttled(self):
+        """Views without a rate are never throttled."""
+        for _ in range(5):
+            self.assertEqual(self.client.get(reverse('polls:index')).status_code, 200)
@@ -1,18 +1,22 @@
 """Tests of authentication Vote."""
+import io
 import django.test
 import datetime
 from django.urls import reverse
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
 from django.utils import timezone
 
-from polls.models import Question, Choice
+from polls.models import Question, Choice, Vote
 
 
 class VoteModelTests(django.test.TestCase):
 
     def setUp(self):
-        """Set up a user and question for the test."""
+        """Set up a user and question for the test, with empty throttle buckets."""
         super().setUp()
+        cache.clear()
         self.username = "testuser"
         self.password = "Fat-Chance!"
         self.user1 = User.objects.create_user(
@@ -48,3 +52,69 @@ class VoteModelTests(django.test.TestCase):
         form_data = {"choice": f"{choice.id}"}
         response = self.client.post(vote_url, form_data)
         self.assertEqual(response.status_code, 302)
+
+    def test_vote_updates_choice_tally(self):
+        """Voting adds one to the tally of the selected choice."""
+        self.client.login(username=self.username, password=self.password)
+        choice = self.question.choice_set.first()
+        vote_url = reverse('polls:vote', args=[self.question.id])
+        self.client.post(vote_url, {"choice": choice.id})
+        choice.refresh_from_db()
+        self.assertEqual(choice.votes, 1)
+
+    def test_vote_without_choice_redisplays_form(self):
+        """A vote without a choice shows the detail form again with an error."""
+        self.client.login(username=self.username, password=self.password)
+        response = self.client.post(reverse('polls:vote', args=[self.question.id]), {})
+        self.assertContains(response, "You didn&#x27;t select a choice.")
+        self.assertContains(response, "Choice 1")
+
+    def test_change_vote_moves_tally(self):
+        """Changing a vote moves one vote from the old choice to the new one."""
+        self.client.login(username=self.username, password=self.password)
+        first, second = self.question.choice_set.all()[:2]
+        vote_url = reverse('polls:vote', args=[self.question.id])
+        self.client.post(vote_url, {"choice": first.id})
+        self.client.post(vote_url, {"choice": second.id})
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.votes, 0)
+        self.assertEqual(second.votes, 1)
+
+    def test_rebuild_vote_counts(self):
+        """The rebuild_vote_counts command recounts tallies from the Vote table."""
+        choice = self.question.choice_set.first()
+        Vote.objects.create(user=self.user1, choice=choice)
+        Choice.objects.update(vote_count=42)
+        call_command('rebuild_vote_counts', stdout=io.StringIO())
+        self.assertEqual(
+            list(self.question.choice_set.order_by('id').values_list('vote_count', flat=True)),
+            [1, 0, 0]
+        )
+
+    def test_one_vote_per_question(self):
+        """A user keeps one vote on each question they voted on."""
+        self.client.login(username=self.username, password=self.password)
+        other = Question.objects.create(question_text="Second Poll Question",
+                                        pub_date=self.question.pub_date, end_date=self.question.end_date)
+        other_choice = Choice.objects.create(choice_text="Other", question=other)
+        choice = self.question.choice_set.first()
+        self.client.post(reverse('polls:vote', args=[self.question.id]), {"choice": choice.id})
+        self.client.post(reverse('polls:vote', args=[other.id]), {"choice": other_choice.id})
+        self.assertEqual(
+            set(Vote.objects.filter(user=self.user1).values_list('question_id', 'choice_id')),
+            {(self.question.id, choice.id), (other.id, other_choice.id)}
+        )
+
+
+class InitialDataTests(django.test.TestCase):
+    """Tests of the initial data fixtures."""
+
+    def test_loaddata(self):
+        """The users and polls fixtures load, with tallies matching their votes."""
+        call_command('loaddata', 'users', 'polls', stdout=io.StringIO())
+        vote = Vote.objects.get()
+        self.assertEqual(vote.question_id, vote.choice.question_id)
+        self.assertEqual(list(Choice.objects.order_by('id').values_list('vote_count', flat=True)), [0, 0, 1, 0, 0, 0])
+        for question in Question.objects.all():
+            self.assertEqual(question.status, question.get_status())
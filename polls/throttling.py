@@ -0,0 +1,177 @@
+"""Rate limiting of the vote and login endpoints with token buckets kept in the Django cache."""
+import contextlib
+import hashlib
+import logging
+import math
+import threading
+import time
+from collections import Counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from . import views
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+# Seconds a bucket lock is kept if its holder never releases it, and the longest wait for it.
+LOCK_TIMEOUT = 1
+LOCK_WAIT = 0.05
+
+_rejected = Counter()
+_rejected_lock = threading.Lock()
+
+
+def parse_rate(rate):
+    """Return: the (requests, seconds) of a rate such as '30/m', or None for an empty rate."""
+    if not rate:
+        return None
+    count, _, period = rate.partition('/')
+    return int(count), PERIODS[period[:1].lower()]
+
+
+def throttle_stats():
+    """Return: the rejected requests by endpoint and by key kind."""
+    with _rejected_lock:
+        return {f'{view_name}:{kind}': count for (view_name, kind), count in sorted(_rejected.items())}
+
+
+def reset_throttle_stats():
+    """Reset the rejected request counters."""
+    with _rejected_lock:
+        _rejected.clear()
+
+
+@contextlib.contextmanager
+def _bucket_locks(keys):
+    """Hold the locks of the buckets `keys`, shared by every process using the cache.
+
+    Each lock is a cache key taken with the atomic add(), in sorted order so two
+    requests never wait on each other. It expires after LOCK_TIMEOUT seconds if
+    its holder dies. Yield: None once every lock is held, or the first bucket
+    whose lock was not free within LOCK_WAIT seconds.
+    """
+    held = []
+    try:
+        for key in sorted(set(keys)):
+            lock_key = f'{key}:lock'
+            deadline = time.monotonic() + LOCK_WAIT
+            locked = cache.add(lock_key, 1, LOCK_TIMEOUT)
+            while not locked and time.monotonic() < deadline:
+                time.sleep(0.001)
+                locked = cache.add(lock_key, 1, LOCK_TIMEOUT)
+            if not locked:
+                yield key
+                return
+            held.append(lock_key)
+        yield None
+    finally:
+        cache.delete_many(held)
+
+
+def take_tokens(keys, capacity, period, now=None):
+    """Take a token from every bucket in `keys`, or from none of them if one is empty.
+
+    Each bucket holds `capacity` tokens and refills them over `period` seconds. It
+    is one cache value, its tokens and the time they were counted, refilled at
+    capacity/period tokens a second up to `capacity`. The buckets are read and
+    written under their locks, so concurrent requests take their tokens one at a
+    time; a bucket whose lock stays busy is refused rather than taken without it.
+    A bucket left alone for `period` seconds is full again and expires.
+    Return: (0, None) if the tokens were taken, else the seconds to wait and the first bucket refused.
+    """
+    if now is None:
+        now = time.time()
+    rate = capacity / period
+    with _bucket_locks(keys) as busy:
+        if busy is not None:
+            return LOCK_TIMEOUT, busy
+        stored = cache.get_many(keys)
+        tokens = {}
+        for key in keys:
+            left, counted = stored.get(key, (capacity, now))
+            tokens[key] = min(capacity, left + max(0.0, now - counted) * rate)
+        refused = [key for key in keys if tokens[key] < 1]
+        if not refused:
+            cache.set_many({key: (left - 1, now) for key, left in tokens.items()}, math.ceil(period))
+            return 0, None
+    # Refused requests do not use up tokens, so every bucket is left as it was.
+    return max(max(1, math.ceil((1 - tokens[key]) / rate)) for key in refused), refused[0]
+
+
+def take_token(key, capacity, period, now=None):
+    """Take a token from the bucket `key`, as take_tokens() does.
+
+    Return: 0 if a token was taken, else the seconds until one is free.
+    """
+    return take_tokens([key], capacity, period, now)[0]
+
+
+def request_keys(request):
+    """Return: the (kind, value) pairs a request is throttled by: its client IP and its user.
+
+    The user is the username submitted to the login form, or else the id of the
+    logged in user, read from the session without loading the user.
+    """
+    keys = [('ip', views.get_client_ip(request))]
+    session = getattr(request, 'session', None)
+    user_id = session.get(SESSION_KEY) if session is not None else None
+    if request.method == 'POST' and request.resolver_match.view_name == 'login' and request.POST.get('username'):
+        keys.append(('user', hashlib.sha1(request.POST['username'].encode()).hexdigest()))
+    elif user_id is not None:
+        keys.append(('user', f'id:{user_id}'))
+    return keys
+
+
+class ThrottleMiddleware:
+    """Answer 429 with Retry-After to clients over the rate of an endpoint, before the view runs.
+
+    The rates are set by view name in POLLS_THROTTLE_RATES and apply to each
+    client IP and each user separately. Only POST requests are throttled, so
+    showing a form never uses up a token.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        """Read the rates from the settings."""
+        self.get_response = get_response
+        self.rates = {view_name: parse_rate(rate)
+                      for view_name, rate in getattr(settings, 'POLLS_THROTTLE_RATES', {}).items()}
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        """Handle the request."""
+        if iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        """Handle the request without leaving the event loop."""
+        return await self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        """Return: a 429 response if a bucket of the request is empty, else None."""
+        view_name = request.resolver_match.view_name
+        rate = self.rates.get(view_name)
+        if rate is None or request.method != 'POST':
+            return None
+        capacity, period = rate
+        kinds = {f'polls:throttle:{view_name}:{kind}:{value}': kind for kind, value in request_keys(request)}
+        retry_after, refused = take_tokens(list(kinds), capacity, period)
+        if not retry_after:
+            return None
+        kind = kinds[refused]
+        with _rejected_lock:
+            _rejected[view_name, kind] += 1
+        logger.warning('Throttled %s on %s by %s for %d s', views.get_client_ip(request), view_name, kind, retry_after)
+        response = HttpResponse('Too many requests, try again later.', status=429, content_type='text/plain')
+        response['Retry-After'] = str(retry_after)
+        return response
@@ -1,12 +1,28 @@
 """URL generation system to link to other pages of the web app."""
+from django.conf import settings
 from django.urls import path
 
-from . import views
+from . import async_views, views
 
 app_name = 'polls'
-urlpatterns = [
+sync_urlpatterns = [
     path('', views.IndexView.as_view(), name='index'),
     path('<int:question_id>/', views.detail, name='detail'),
     path('<int:pk>/results/', views.ResultsView.as_view(), name='results'),
     path('<int:question_id>/vote/', views.vote, name='vote'),
+    path('<int:pk>/results.json', views.results_json, name='results_json'),
+    path('results.json', views.batch_results_json, name='batch_results_json'),
+    path('questions.json', views.questions_json, name='questions_json'),
+    path('search/', views.search, name='search'),
 ]
+async_urlpatterns = [
+    path('', async_views.index, name='index'),
+    path('<int:question_id>/', async_views.detail, name='detail'),
+    path('<int:pk>/results/', async_views.results, name='results'),
+    path('<int:question_id>/vote/', async_views.vote, name='vote'),
+    path('<int:pk>/results.json', views.results_json, name='results_json'),
+    path('results.json', views.batch_results_json, name='batch_results_json'),
+    path('questions.json', views.questions_json, name='questions_json'),
+    path('search/', views.search, name='search'),
+]
+urlpatterns = async_urlpatterns if settings.POLLS_ASYNC_VIEWS else sync_urlpatterns
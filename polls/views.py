@@ -1,30 +1,84 @@
 """Web page view management system."""
 from django.shortcuts import get_object_or_404, render, redirect
-from django.http import HttpResponseRedirect
+from django.http import Http404, HttpResponseBadRequest, HttpResponseRedirect, JsonResponse, StreamingHttpResponse
 from django.urls import reverse
+from django.db import transaction
 from django.views import generic
 from django.utils import timezone
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from .models import Choice, Question, Vote
+from django.contrib.admin.views.decorators import staff_member_required
+from django.conf import settings
+from django.core.exceptions import BadRequest
+from .models import STATUS_CHOICES, STATUS_CLOSED, STATUS_OPEN, STATUS_UPCOMING, Choice, Question, Vote
+from .pagination import KeysetPage
+from . import caching, choicemap, counters, export, ingest, routers, search as search_index, throttling
+from .middleware import view_stats
 from django.contrib.auth.signals import user_logged_in, user_logged_out, user_login_failed
 from django.dispatch import receiver
+from django.views.decorators.http import etag, require_GET
+import functools
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+def question_page(status, cursor, now, size):
+    """Return: a lazy page of published questions, or of the questions with `status`, annotated with is_open.
+
+    The conditions are those of QuestionQuerySet.filter_status(), with the
+    publication bound left to the page so it can seek on a single bound.
+    Raise: ValueError for an unknown status or an invalid cursor.
+    """
+    queryset = Question.objects.with_is_open(now)
+    until = now
+    if status == STATUS_UPCOMING:
+        queryset, until = queryset.filter(pub_date__gt=now), None
+    elif status == STATUS_OPEN:
+        queryset = queryset.filter(end_date__gte=now)
+    elif status == STATUS_CLOSED:
+        queryset = queryset.filter(end_date__lt=now)
+    elif status:
+        raise ValueError(f'Unknown status {status!r}.')
+    return KeysetPage(queryset, cursor or None, size, until=until)
+
+
 class IndexView(generic.ListView):
-    """Display all questions in the system according to publication date."""
+    """Display all questions in the system according to publication date, a page at a time."""
 
     template_name = 'polls/index.html'
     context_object_name = 'latest_question_list'
 
     def get_queryset(self):
-        """Return: the last five published questions."""
-        return Question.objects.filter(
-            pub_date__lte=timezone.now()
-        ).order_by('-pub_date')[:5]
+        """Return: the page of questions of the `status` and `cursor` parameters, newest first."""
+        self.now = timezone.now()
+        self.status = self.request.GET.get('status', '')
+        self.cursor = self.request.GET.get('cursor', '')
+        try:
+            return question_page(self.status, self.cursor, self.now, getattr(settings, 'POLLS_INDEX_PAGE_SIZE', 5))
+        except ValueError as error:
+            raise BadRequest(error)
+
+    def get_context_data(self, **kwargs):
+        """Add the status filter, the cursor and the version and timeout of the cached question list fragment."""
+        context = super().get_context_data(**kwargs)
+        context['status'] = self.status
+        context['cursor'] = self.cursor
+        context['statuses'] = STATUS_CHOICES
+        context['index_version'] = caching.index_version()
+        context['index_cache_timeout'] = caching.index_cache_timeout(self.now)
+        return context
+
+
+def detail_context(question, **extra):
+    """Return: the context of detail.html for `question` and the `extra` variables.
+
+    The choices come from the choice map, and only when the cached choice list
+    fragment has to be rendered.
+    """
+    context = {'question': question, **caching.choices_cache_context(question.id), **extra}
+    context['choices'] = functools.partial(choicemap.question_choices, question.id, context['choices_version'])
+    return context
 
 
 def detail(request, question_id):
@@ -37,10 +91,7 @@ def detail(request, question_id):
     if not question.can_vote():
         messages.error(request, "This question is not allowed to vote.")
         return redirect(reverse('polls:index'))
-    context = {
-        "question": question,
-    }
-    return render(request, 'polls/detail.html', context)
+    return render(request, 'polls/detail.html', detail_context(question))
 
 
 class ResultsView(generic.DetailView):
@@ -49,6 +100,121 @@ class ResultsView(generic.DetailView):
     model = Question
     template_name = 'polls/results.html'
 
+    def get_context_data(self, **kwargs):
+        """Add the precomputed vote totals so the template does no queries."""
+        context = super().get_context_data(**kwargs)
+        context['results'] = caching.get_results(self.object)
+        return context
+
+
+def parse_question_ids(request):
+    """Return: the question ids in the `ids` query parameter, or None if it is invalid."""
+    try:
+        question_ids = list(dict.fromkeys(int(pk) for pk in request.GET.get('ids', '').split(',') if pk))
+    except ValueError:
+        return None
+    if not question_ids or len(question_ids) > getattr(settings, 'POLLS_BATCH_RESULTS_LIMIT', 100):
+        return None
+    return question_ids
+
+
+def _results_etag(request, pk):
+    # The view reuses the versions read for the ETag instead of reading them again.
+    request.results_versions = caching.results_versions([pk])
+    return caching.results_etag([pk], request.results_versions)
+
+
+@require_GET
+@etag(_results_etag)
+def results_json(request, pk):
+    """Return the choices, vote counts and total of a question as JSON.
+
+    A request whose If-None-Match has the current ETag gets a 304 without the
+    results being computed. An unknown question is a 404 and gets no cache key.
+    """
+    results = caching.get_many_results([pk], request.results_versions).get(pk)
+    if results is None:
+        raise Http404('No Question matches the given query.')
+    return JsonResponse({'id': pk, **results})
+
+
+def _batch_results_etag(request):
+    question_ids = parse_question_ids(request)
+    if not question_ids:
+        return None
+    request.results_versions = caching.results_versions(question_ids)
+    return caching.results_etag(question_ids, request.results_versions)
+
+
+@require_GET
+@etag(_batch_results_etag)
+def batch_results_json(request):
+    """Return the results of every question in the `ids` query parameter as JSON."""
+    question_ids = parse_question_ids(request)
+    if question_ids is None:
+        return JsonResponse({'error': 'ids must be a comma separated list of question ids.'}, status=400)
+    results = caching.get_many_results(question_ids, request.results_versions)
+    return JsonResponse({
+        'results': [{'id': pk, **results[pk]} for pk in question_ids if pk in results],
+        'missing': [pk for pk in question_ids if pk not in results],
+    })
+
+
+@require_GET
+def questions_json(request):
+    """Return a page of questions, newest first, as JSON.
+
+    Query parameters: status (upcoming, open or closed; default the published
+    questions), cursor (the next_cursor of the previous page) and limit.
+    """
+    limit = request.GET.get('limit', '')
+    max_limit = getattr(settings, 'POLLS_LIST_PAGE_MAX', 100)
+    if limit and not (limit.isdigit() and 0 < int(limit) <= max_limit):
+        return JsonResponse({'error': f'limit must be between 1 and {max_limit}.'}, status=400)
+    now = timezone.now()
+    try:
+        page = question_page(request.GET.get('status', ''), request.GET.get('cursor', ''), now,
+                             int(limit) if limit else getattr(settings, 'POLLS_LIST_PAGE_SIZE', 20))
+        questions = [{
+            'id': question.id,
+            'question_text': question.question_text,
+            'pub_date': question.pub_date,
+            'end_date': question.end_date,
+            'is_open': question.is_open,
+        } for question in page]
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    return JsonResponse({'questions': questions, 'next_cursor': page.next_cursor})
+
+
+def search(request):
+    """Display the published questions whose text or choices match the `q` parameter, best match first."""
+    query = request.GET.get('q', '').strip()
+    now = timezone.now()
+    questions = search_index.search(query, getattr(settings, 'POLLS_SEARCH_LIMIT', 20), now) if query else []
+    return render(request, 'polls/search.html', {'query': query, 'questions': questions})
+
+
+def save_vote(user, question, selected_choice):
+    """Record the vote of a user for a choice, replacing their earlier vote on the question."""
+    if getattr(settings, 'POLLS_VOTE_BUFFER', False):
+        ingest.get_writer().submit(user.id, question.id, selected_choice.id)
+    else:
+        counters.note_vote(question)
+        with transaction.atomic():
+            # Write first so SQLite takes the write lock (waiting on busy_timeout)
+            # before the transaction reads, instead of failing to upgrade a read lock.
+            counters.add_votes(question, selected_choice.id)
+            vote, created = Vote.objects.select_for_update().get_or_create(
+                user=user, question=question, defaults={'choice': selected_choice}
+            )
+            if not created:
+                counters.add_votes(question, vote.choice_id, -1)
+                if vote.choice_id != selected_choice.id:
+                    vote.choice = selected_choice
+                    vote.save(update_fields=['choice'])
+            transaction.on_commit(lambda: caching.bump_results_version(question.id))
+
 
 @login_required(login_url='/accounts/login/')
 def vote(request, question_id):
@@ -61,28 +227,56 @@ def vote(request, question_id):
     question = get_object_or_404(Question, pk=question_id)
 
     try:
-        selected_choice = question.choice_set.get(pk=request.POST['choice'])
-        logger.info(f'{user} voted on {question}')
+        selected_choice = choicemap.get_choice(question, request.POST['choice'])
     except (KeyError, Choice.DoesNotExist):
         # Redisplay the question voting form.
-        return render(request, 'polls/detail.html', {
-            'question': question,
-            'error_message': "You didn't select a choice.",
-        })
+        return render(request, 'polls/detail.html', detail_context(
+            question, error_message="You didn't select a choice."))
     else:
-        if user.vote_set.filter(user=user).exists():
-            vote = user.vote_set.get(user=user)
-            vote.choice = selected_choice
-            vote.save()
-        else:
-            Vote.objects.create(user=user, choice=selected_choice)
-        logger.info(f"User {user.username} submit a vote for question {question.id} ")
+        save_vote(user, question, selected_choice)
+        routers.pin_to_primary(request)
+        logger.info('User %s submit a vote for question %s', user.username, question.id)
         # Always return an HttpResponseRedirect after successfully dealing
         # with POST data. This prevents data from being posted twice if a
         # user hits the Back button.
         return HttpResponseRedirect(reverse('polls:results', args=(question.id,)))
 
 
+@staff_member_required
+def profile_stats(request):
+    """Return the rolling per-view statistics and the cache, choice map, throttle and vote writer counters as JSON."""
+    return JsonResponse({
+        'views': view_stats.snapshot(),
+        'results_cache': caching.cache_stats(),
+        'choice_map': choicemap.get_choice_map().stats(),
+        'throttled': throttling.throttle_stats(),
+        'vote_writer': ingest.writer_stats(),
+    })
+
+
+@staff_member_required
+def export_data(request):
+    """Stream votes or per-choice results as CSV or NDJSON.
+
+    Query parameters: kind (votes or results), format (csv or ndjson),
+    question (repeatable id), since and until (question publication dates).
+    """
+    kind = request.GET.get('kind', 'votes')
+    fmt = request.GET.get('format', 'csv')
+    if kind not in export.KINDS or fmt not in export.FORMATS:
+        return HttpResponseBadRequest('Unknown export kind or format.')
+    try:
+        question_ids = [int(pk) for pk in request.GET.getlist('question')]
+        since = export.parse_boundary(request.GET.get('since'))
+        until = export.parse_boundary(request.GET.get('until'), end=True)
+    except ValueError as error:
+        return HttpResponseBadRequest(str(error))
+    response = StreamingHttpResponse(export.stream_export(kind, fmt, question_ids, since, until),
+                                     content_type=export.CONTENT_TYPES[fmt])
+    response['Content-Disposition'] = f'attachment; filename="polls-{kind}.{fmt}"'
+    return response
+
+
 def get_client_ip(request):
     """Get the visitor’s IP address using request headers."""
     x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
@@ -96,16 +290,16 @@ def get_client_ip(request):
 @receiver(user_logged_in)
 def on_login(user, request, **kwargs):
     """Log a message at info level when the user is login."""
-    logger.info(f'IP: {get_client_ip(request)} {user} just logged in.')
+    logger.info('IP: %s %s just logged in.', get_client_ip(request), user)
 
 
 @receiver(user_logged_out)
 def on_logout(user, request, **kwargs):
     """Log a message at info level when the user is logout."""
-    logger.info(f'IP: {get_client_ip(request)} {user.username} has logged out.')
+    logger.info('IP: %s %s has logged out.', get_client_ip(request), user.username)
 
 
 @receiver(user_login_failed)
 def login_fail(credentials, request, **kwargs):
     """Log a message at the warning level when the user failed login."""
-    logger.warning(f"IP: {get_client_ip(request)} Fail to log in for {credentials['username']}")
+    logger.warning('IP: %s Fail to log in for %s', get_client_ip(request), credentials['username'])